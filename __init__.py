@@ -4,10 +4,21 @@ A package for parsing for using definitions in a c header file.
 """
 
 
-from abstractstruct import *
-from userexceptions import *
-from ctypesstruct import *
-from writer import Writer
-from writerplus import WriterPlus
-from writer_ctypes import WriterCTypes
-from hparser import HeaderParser, import_cheader
+from .abstractstruct import *
+from .userexceptions import *
+from .ctypesstruct import *
+from .writer import Writer
+from .writerplus import WriterPlus
+from .writer_ctypes import WriterCTypes
+from .writer_numpy import WriterNumpy
+from .hparser import HeaderParser, import_cheader
+from .headercache import HeaderCache
+from .depgraph import DependencyGraph
+from .recordlog import RecordLog
+from .streamdecoder import StreamDecoder
+from .dispatch import Dispatcher
+from .pool import StructPool
+from .lazy import LazyRecord
+from .tablesink import TableSink
+from .decodecache import DecodeCache
+from .diagnostics import Diagnostics
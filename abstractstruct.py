@@ -9,6 +9,7 @@ from __future__ import unicode_literals
 
 import os
 import sys
+import struct
 import logging
 
 if __name__ == "__main__" and __package__ is None:
@@ -24,6 +25,53 @@ ENDIANNESS_BIG = '>'
 ENDIANNESS_NETWORK = '!'
 ENDIANNESS_NATIVE = '='
 
+# The forms of the records returned by decode_many().
+DECODE_LIST = 'list'
+DECODE_ITER = 'iter'
+DECODE_COLUMNS = 'columns'
+DECODE_DICTS = 'dicts'
+DECODE_FORMS = (DECODE_LIST, DECODE_ITER, DECODE_COLUMNS, DECODE_DICTS)
+
+# Prefixes each changed field in a delta from encode_delta().
+_DELTA_INDEX = struct.Struct(str('<H'))
+
+
+
+class StructLayout(object):
+    """
+    The struct formats of a generated class compiled for one endianness.
+    Layouts are shared by all the instances of a class through
+    AbstractStruct._get_layout().
+    """
+    
+    def __init__(self, endianness, fields):
+        """
+        Constructor
+        
+        <fields> is a list of (name, format, count) where format is either the
+        struct format of one element or the class of a nested struct.
+        """
+        super(StructLayout, self).__init__()
+        self.endianness = endianness
+        self.structs = {}
+        self.offsets = {}
+        # The (offset, size) of the packed bytes of each field in order.
+        self.spans = []
+        fmt = ''
+        offset = 0
+        for (name, field_format, count) in fields:
+            if isinstance(field_format, type):
+                field_format = field_format._get_layout(endianness).format
+            field_format = field_format*count
+            field_struct = struct.Struct(str(endianness + field_format))
+            self.structs[name] = field_struct
+            self.offsets[name] = offset
+            self.spans.append((offset, field_struct.size))
+            offset += field_struct.size
+            fmt += field_format
+        self.format = fmt
+        self.packing_struct = struct.Struct(str(endianness + fmt))
+        self.packed_size = self.packing_struct.size
 
 
 class AbstractStruct(object):
@@ -31,10 +79,30 @@ class AbstractStruct(object):
     Abstract class for implementing struct classes.
     """
     
+    # Subclasses which do not declare __slots__ still get a __dict__.
+    __slots__ = ()
+    
     _frozen = False
     
     _packed_size = None
     
+    # Generated classes which use layouts set these to their own dictionary
+    # and list of (name, format, count) tuples.
+    _layouts = None
+    _layout_fields = ()
+    
+    # The number of values in the flattened form of the class and the names
+    # of the fields which are neither arrays nor nested structs.
+    _flat_count = None
+    _scalar_fields = frozenset()
+    
+    # The pytables description cached by make_table_descriptor().
+    _table_descriptor = None
+    
+    # Generated classes with layouts set this to a classmethod building the
+    # dictionary of a record from its flattened values.
+    _dict_from_flat = None
+    
     def __init__(self):
         """Constructor"""
         super(AbstractStruct, self).__init__()
@@ -67,7 +135,7 @@ class AbstractStruct(object):
                     _newval = newval[i]
                     if not isstr(_newval):
                         raise ValueError("Incorrect value {} of type {}. Expected a str.".format(_newval, type(_newval)))
-                    obj[i] = str(_newval)
+                    obj[i] = _newval if isinstance(_newval, bytes) else str(_newval)
             elif hasattr(obj[0], '__getitem__'):
                 for idx in range(0, newval_len):
                     set_array(obj[idx], newval[idx])
@@ -89,6 +157,123 @@ class AbstractStruct(object):
         else:
             super(AbstractStruct,self).__setattr__(name, value)
     
+    @classmethod
+    def _get_layout(cls, endianness):
+        """
+        Returns the StructLayout of the class for <endianness>, creating it
+        on first use.
+        """
+        try:
+            return cls._layouts[endianness]
+        except KeyError:
+            layout = StructLayout(endianness, cls._layout_fields)
+            cls._layouts[endianness] = layout
+            return layout
+    
+    @classmethod
+    def decode_many(cls, buf, count=None, offset=0, form=DECODE_LIST, out=None, **kwargs):
+        """
+        Decodes <count> consecutive records from <buf> starting at <offset>,
+        or as many as fit if <count> is None. <kwargs> are passed to the
+        constructor of each record (eg. endianness). The records are decoded
+        into the existing instances in the list <out> if it is given, <count>
+        then defaulting to its length.
+        
+        The records are returned as a list, a generator (form='iter'), a
+        dictionary of field name to the list of its values (form='columns')
+        or a list of the to_dict() of each record (form='dicts').
+        Classes with a layout are unpacked with one struct call per record
+        and no records are constructed for columns of scalar fields or for
+        dictionaries.
+        """
+        if form not in DECODE_FORMS:
+            raise ValueError('Unknown form {}, expected one of {}.'.format(form, DECODE_FORMS))
+        proto = out[0] if out else cls(**kwargs)
+        size = proto.packed_size()
+        if out is not None and count is None:
+            count = len(out)
+        count = _record_count(len(buf), offset, size, count)
+        if out is not None and count > len(out):
+            raise ValueError('Cannot decode {} records into {} instances.'.format(count, len(out)))
+        layout = getattr(proto, '_layout', None)
+        if layout is None:
+            records = cls._deserialise_many(buf, count, offset, size, kwargs, out)
+            rows = None
+        else:
+            rows = _iter_unpack(layout.packing_struct, buf, offset, count)
+            if form == DECODE_DICTS and out is None and cls._dict_from_flat is not None:
+                return [cls._dict_from_flat(row, 0) for row in rows]
+            if form == DECODE_COLUMNS:
+                rows = list(rows)
+            records = cls._records_from_rows(rows, kwargs, out)
+        
+        if form == DECODE_ITER:
+            return records
+        elif form == DECODE_LIST:
+            return list(records)
+        elif form == DECODE_DICTS:
+            return [record.to_dict() for record in records]
+        
+        names = [field[0] for field in cls._fields_]
+        if rows is None or any(name not in cls._scalar_fields for name in names):
+            records = list(records)
+        columns = {}
+        idx = 0
+        for (name, field_format, field_count) in cls._layout_fields:
+            if name in cls._scalar_fields and rows is not None:
+                columns[name] = [row[idx] for row in rows]
+            if isinstance(field_format, type):
+                idx += field_count*field_format._flat_count
+            else:
+                idx += field_count
+        for name in names:
+            if name not in columns:
+                columns[name] = [getattr(record, name) for record in records]
+        return columns
+    
+    
+    @classmethod
+    def lazy(cls, buf, offset=0, **kwargs):
+        """
+        Returns a LazyRecord which decodes the fields of the record at
+        <offset> in <buf> only as they are accessed.
+        """
+        from .lazy import LazyRecord
+        return LazyRecord(cls, buf, offset, **kwargs)
+    
+    
+    @classmethod
+    def _records_from_rows(cls, rows, kwargs, out=None):
+        for (i, values) in enumerate(rows):
+            record = cls(**kwargs) if out is None else out[i]
+            record._set_flat_values(values, 0)
+            yield record
+    
+    
+    @classmethod
+    def _deserialise_many(cls, buf, count, offset, size, kwargs, out=None):
+        for i in range(count):
+            record = cls(**kwargs) if out is None else out[i]
+            record.deserialise_from(buf, offset + i*size)
+            yield record
+    
+    
+    @staticmethod
+    def _fill_array(array, values, start, dimensions):
+        """
+        Copies the flattened <values> from index <start> into the nested
+        lists of a multidimensional array in place.
+        Returns the index after the last value copied.
+        """
+        if len(dimensions) == 1:
+            end = start + dimensions[0]
+            array[:] = values[start:end]
+            return end
+        for row in array:
+            start = AbstractStruct._fill_array(row, values, start, dimensions[1:])
+        return start
+    
+    
     def __delattr__(self, key):
         """
         Overrides base class.
@@ -102,14 +287,26 @@ class AbstractStruct(object):
         """
         Checks if two class have the same data.
         """
+        if self is other:
+            return True
         if isinstance(other, AbstractStruct):
             return self.serialise()==other.serialise()
-        else:
-            return Exception("TODO")
+        return NotImplemented
     
     
     def __ne__(self, other):
-        return not self.__eq__(other)
+        equal = self.__eq__(other)
+        if equal is NotImplemented:
+            return equal
+        return not equal
+    
+    
+    def __hash__(self):
+        """
+        Hashes the packed bytes, so structs which are equal hash the same.
+        The hash changes if the struct is changed.
+        """
+        return hash(self.serialise())
     
     
     def freeze(self):
@@ -169,11 +366,104 @@ class AbstractStruct(object):
         raise NotImplementedError(sys._getframe().f_code.co_name + " is not supported.")
     
     
+    def _field_spans(self):
+        """
+        Returns the list of the (offset, size) of the packed bytes of each
+        field in _fields_ order.
+        """
+        layout = getattr(self, '_layout', None)
+        if layout is None:
+            raise NotImplementedError(sys._getframe().f_code.co_name + " is not supported.")
+        return layout.spans
+    
+    
+    def _same_format(self, other):
+        """
+        Returns True if <other> packs to the same layout as this struct, so
+        their packed images can be compared byte for byte.
+        """
+        return type(other) is type(self) and getattr(other, '_layout', None) is getattr(self, '_layout', None)
+    
+    
+    def _changed_spans(self, image, other_image):
+        """
+        Yields the (index, offset, size) of the fields which differ between
+        two packed images of the class.
+        """
+        if image == other_image:
+            return
+        for (idx, (offset, size)) in enumerate(self._field_spans()):
+            end = offset + size
+            if image[offset:end] != other_image[offset:end]:
+                yield (idx, offset, size)
+    
+    
+    def changed_fields(self, other):
+        """
+        Returns a bitmask of the fields of <other>, a struct of the same class
+        and endianness, which differ from this struct. Bit i is set if the
+        i'th field in _fields_ differs. The packed images are compared, so
+        nothing more is done when they are the same.
+        """
+        mask = 0
+        for (idx, offset, size) in self._changed_spans(self.serialise(), other.serialise()):
+            mask |= 1 << idx
+        return mask
+    
+    
+    def encode_delta(self, other):
+        """
+        Returns the changes from this struct to <other>, a struct of the same
+        class and endianness, as the index (a little endian uint16) and packed
+        bytes of each field which differs. The delta is empty if nothing does.
+        """
+        other_image = other.serialise()
+        pack = _DELTA_INDEX.pack
+        return b''.join([pack(idx) + other_image[offset:offset + size]
+                         for (idx, offset, size) in self._changed_spans(self.serialise(), other_image)])
+    
+    
+    def apply_delta(self, delta):
+        """
+        Applies a delta from encode_delta() to this struct and returns the
+        bitmask of the fields it set.
+        """
+        spans = self._field_spans()
+        image = bytearray(self.serialise())
+        index_size = _DELTA_INDEX.size
+        mask = 0
+        pos = 0
+        while pos < len(delta):
+            idx = _DELTA_INDEX.unpack_from(delta, pos)[0]
+            if idx >= len(spans):
+                raise ValueError('Delta sets field {} but {} has only {} fields.'.format(
+                    idx, type(self).__name__, len(spans)))
+            (offset, size) = spans[idx]
+            pos += index_size
+            if pos + size > len(delta):
+                raise ValueError('Delta is truncated in field {}.'.format(idx))
+            image[offset:offset + size] = delta[pos:pos + size]
+            pos += size
+            mask |= 1 << idx
+        if mask:
+            self.deserialise(image)
+        return mask
+    
+    
     def update(self, other, accessor='', verbose=False):
         """
         Tries to update the fields of this structure with those from other.
+        If <other> is a struct of the same class and endianness only the
+        fields whose packed bytes differ are compared and set.
         """
         updated = False
+        if self._same_format(other):
+            mask = self.changed_fields(other)
+            if mask:
+                for (idx, field) in enumerate(type(self)._fields_):
+                    if (mask >> idx) & 1:
+                        updated |= self.update_field(field[0], getattr(other, field[0]), accessor, verbose)
+            return updated
         for key, val in enum_fields(other):
             updated |= self.update_field(key, val, accessor, verbose)
         return updated
@@ -182,7 +472,11 @@ class AbstractStruct(object):
     def update_field(self, name, val, accessor='', verbose=False):
         """
         Updates the field in the structure named <name> only if is different.
+        The messages about the changes are only formatted if they are shown
+        or logged.
         """
+        show = verbose or _logger.isEnabledFor(logging.DEBUG)
+        
         def update_array(obj, newval, accessor, verbose):
             assert hasattr(obj, '__getitem__')
             updated = False
@@ -202,17 +496,21 @@ class AbstractStruct(object):
                         mlen = len(obj)
                     if obj[:]!=newval[:]:
                         updated = True
-                        msg = 'Updating string {}, from {}'.format(accessor, repr(obj[:].strip('\0')))
+                        if show:
+                            msg = 'Updating string {}, from {}'.format(accessor, repr(obj[:].strip('\0')))
                         obj[:] = newval[:]
-                        msg += ' to {}.'.format(repr(obj[:]).strip('\0'))
-                        show_it(msg)
+                        if show:
+                            msg += ' to {}.'.format(repr(obj[:]).strip('\0'))
+                            show_it(msg)
                 elif (obj[:mlen]!=newval[:mlen]):
                     updated = True
-                    msg = 'Updating array in field {}, from {}'.format(accessor, repr(obj[:]))
+                    if show:
+                        msg = 'Updating array in field {}, from {}'.format(accessor, repr(obj[:]))
                     obj[:mlen] = newval[:mlen]
-                    msg += ' to {}.'.format(repr(obj[:]))
-                    show_it(msg)
-                if mlen < len(newval):
+                    if show:
+                        msg += ' to {}.'.format(repr(obj[:]))
+                        show_it(msg)
+                if mlen < len(newval) and show:
                     msg = 'WARNING: Indexes {}:{} ignored of {} because out of range.'.format(
                         mlen, len(newval), type(self).__name__)
                     show_it(msg)
@@ -230,15 +528,18 @@ class AbstractStruct(object):
         elif hasattr(oldval, '__getitem__') and not isstr(oldval[:]):
             updated |= update_array(oldval, val, accessor+'.'+name, verbose=verbose)
         elif oldval is None:
-            msg = 'WARNING: Field "{}={}" could not be updated because it does not exist in "{}".'.format(
-                    name, repr(val), type(self).__name__)
-            show_it(msg)
+            if show:
+                msg = 'WARNING: Field "{}={}" could not be updated because it does not exist in "{}".'.format(
+                        name, repr(val), type(self).__name__)
+                show_it(msg)
         else:
             if oldval!=val:
                 updated = True
-                msg = 'Updating field {}={} to {}.'.format(name,repr(oldval), repr(val))
+                if show:
+                    msg = 'Updating field {}={} to {}.'.format(name,repr(oldval), repr(val))
                 setattr(self, name, val)
-                show_it(msg)
+                if show:
+                    show_it(msg)
         return updated
     
     
@@ -246,23 +547,53 @@ class AbstractStruct(object):
         """
         Convert to python objects - structs to dictionaries and arrays to lists.
         """
-        def convert_val(val):
-            if isinstance(val, AbstractStruct):
-                res = val.pythonise()
-            elif hasattr(val, '__getitem__'):
-                if isstr(val[:]):
-                    res = str(val[:])
-                else:
-                    res = list(convert_val(item) for item in val)
-            else:
-                res = val
-            return res
+        return self.to_dict()
+    
+    
+    def to_dict(self):
+        """
+        Returns the fields as a dictionary of python objects, with nested
+        structs as dictionaries and arrays as lists. Generated classes
+        override this with the fields spelled out.
+        """
         d = {}
         for field, val in enum_fields(self):
-            d[field] = convert_val(val)
+            d[field] = self._to_python(val)
         return d
     
     
+    @classmethod
+    def from_dict(cls, values, **kwargs):
+        """
+        Returns a new instance with the fields set from a dictionary like
+        that from to_dict(). Fields missing from <values> keep their
+        defaults. <kwargs> are passed to the constructor (eg. endianness).
+        """
+        record = cls(**kwargs)
+        record._set_dict(values)
+        return record
+    
+    
+    def _set_dict(self, values):
+        for key, val in values.items():
+            setattr(self, key, val)
+    
+    
+    @staticmethod
+    def _to_python(val):
+        """
+        Converts a field value to python objects.
+        """
+        if isinstance(val, AbstractStruct):
+            return val.to_dict()
+        elif hasattr(val, '__getitem__'):
+            if isstr(val[:]):
+                # Kept as bytes, which str() would turn into their repr under Python 3.
+                return val[:]
+            return [AbstractStruct._to_python(item) for item in val]
+        return val
+    
+    
     def __repr__(self):
         """
         Must be unambiguous.
@@ -289,6 +620,59 @@ class AbstractStruct(object):
         return disp_str
 
 
+class SlottedStruct(AbstractStruct):
+    """
+    Base class for generated struct classes which keep their fields in
+    __slots__. Instances have no __dict__ so they are always "frozen" against
+    new attributes and assigning a scalar field stores it straight into its
+    slot rather than going through AbstractStruct.__setattr__.
+    """
+    
+    __slots__ = ()
+    
+    _frozen = True
+    
+    def __setattr__(self, name, value, allow_private=False):
+        """
+        Overrides base class.
+        """
+        if name in self._scalar_fields:
+            object.__setattr__(self, name, value)
+        else:
+            AbstractStruct.__setattr__(self, name, value, allow_private)
+    
+    def freeze(self):
+        """
+        Slotted classes are always frozen.
+        """
+        pass
+
+
+def _record_count(buf_len, offset, size, count=None):
+    """
+    Returns the number of records of <size> bytes to decode from a buffer,
+    checking that <count> of them fit.
+    """
+    if count is None:
+        return max(buf_len - offset, 0)//size
+    if offset + count*size > buf_len:
+        raise ValueError('Buffer of {} bytes is too small for {} records of {} bytes at offset {}.'.format(
+            buf_len, count, size, offset))
+    return count
+
+
+def _iter_unpack(packing_struct, buf, offset, count):
+    """
+    Returns an iterator over the tuples unpacked from <count> consecutive
+    records of <packing_struct> in <buf>.
+    """
+    if hasattr(packing_struct, 'iter_unpack'):
+        return packing_struct.iter_unpack(memoryview(buf)[offset:offset + count*packing_struct.size])
+    size = packing_struct.size
+    unpack_from = packing_struct.unpack_from
+    return (unpack_from(buf, offset + i*size) for i in range(count))
+
+
 def _stringit(val, abreviate=False, fn=str):
     if hasattr(val, '__getitem__'):
         if abreviate and (len(val) > 8):
@@ -0,0 +1,82 @@
+"""
+asyncio adapters for the StreamDecoder, eg.:
+
+    reader, writer = await asyncio.open_connection(host, port)
+    async for record in decode_stream(reader, Sample_t):
+        ...
+
+This module needs python 3.7 or later and so is not imported by the package.
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import asyncio
+
+from .streamdecoder import StreamDecoder, DEFAULT_MAX_BUFFERED
+
+
+async def decode_stream(reader, cls, max_buffered=DEFAULT_MAX_BUFFERED, **kwargs):
+    """
+    Yields the records of <cls> read from an asyncio.StreamReader until the
+    end of the stream. Raises asyncio.IncompleteReadError if the stream ends
+    part way through a record.
+    """
+    decoder = StreamDecoder(cls, max_buffered, **kwargs)
+    while True:
+        data = await reader.read(decoder.space())
+        if not data:
+            break
+        decoder.feed(data)
+        for record in decoder.records():
+            yield record
+    if decoder.buffered():
+        raise asyncio.IncompleteReadError(b'', decoder.record_size)
+
+
+class DecoderProtocol(asyncio.BufferedProtocol):
+    """
+    A protocol which receives straight into the buffer of a StreamDecoder
+    and calls <callback> with the list of records completed by each read.
+    """
+    
+    def __init__(self, cls, callback, max_buffered=DEFAULT_MAX_BUFFERED, **kwargs):
+        """
+        Constructor
+        
+        The protocol must be created in the running event loop, as it is by
+        the protocol factories of loop.create_connection() and the like.
+        Its <closed> future is resolved when the connection is lost.
+        """
+        super(DecoderProtocol, self).__init__()
+        self.decoder = StreamDecoder(cls, max_buffered, **kwargs)
+        self.callback = callback
+        self.transport = None
+        self.closed = asyncio.get_running_loop().create_future()
+    
+    
+    def connection_made(self, transport):
+        self.transport = transport
+    
+    
+    def get_buffer(self, sizehint):
+        return self.decoder.get_buffer(sizehint)
+    
+    
+    def buffer_updated(self, nbytes):
+        self.decoder.buffer_updated(nbytes)
+        records = self.decoder.records()
+        if records:
+            self.callback(records)
+    
+    
+    def connection_lost(self, exc):
+        if not self.closed.done():
+            if exc is None and self.decoder.buffered():
+                exc = asyncio.IncompleteReadError(b'', self.decoder.record_size)
+            if exc is None:
+                self.closed.set_result(None)
+            else:
+                self.closed.set_exception(exc)
@@ -0,0 +1,303 @@
+"""
+Command line tool for converting many c header files to python modules in
+parallel, eg.:
+
+    python -m h2pyex.batch --jobs 8 -o generated include/
+
+With --incremental only the headers which changed (or include a header
+which changed) since the last run are regenerated and --watch keeps
+polling the headers and regenerating them as they change.
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import os
+import sys
+import time
+import argparse
+import collections
+
+if __name__ == "__main__" and __package__ is None:
+    from h2pyex import *
+    from h2pyex.abstractstruct import ENDIANNESS_NETWORK
+    from h2pyex.hparser import find_include
+    from h2pyex.depgraph import DependencyGraph
+else:
+    from .hparser import HeaderParser, find_include
+    from .diagnostics import Diagnostics
+    from .depgraph import DependencyGraph
+    from .writer import Writer
+    from .writerplus import WriterPlus
+    from .writer_ctypes import WriterCTypes
+    from .writer_numpy import WriterNumpy
+    from .abstractstruct import ENDIANNESS_NETWORK
+
+
+WRITERS = {
+    'Writer': Writer,
+    'WriterPlus': WriterPlus,
+    'WriterCTypes': WriterCTypes,
+    'WriterNumpy': WriterNumpy,
+}
+
+HEADER_EXTENSIONS = ('.h', '.hpp')
+
+DEPENDENCIES_FILENAME = '.h2pyex-deps.json'
+
+CompileResult = collections.namedtuple('CompileResult',
+    'header output seconds errors failure includes')
+
+
+def find_headers(paths=(), manifest=None):
+    """
+    Returns the header files in <paths> (files or directories searched
+    recursively) and those listed one per line in the <manifest> file.
+    """
+    headers = []
+    for path in paths:
+        if os.path.isdir(path):
+            for dirpath, dirnames, filenames in os.walk(path):
+                dirnames.sort()
+                for filename in sorted(filenames):
+                    if filename.endswith(HEADER_EXTENSIONS):
+                        headers.append(os.path.join(dirpath, filename))
+        else:
+            headers.append(path)
+    if manifest:
+        base = os.path.dirname(manifest)
+        with open(manifest, 'r') as f:
+            for line in f:
+                line = line.strip()
+                if line and not line.startswith('#'):
+                    headers.append(os.path.join(base, line))
+    return headers
+
+
+def common_root(headers):
+    """
+    Returns the deepest directory holding all the <headers>, or None if
+    there are none.
+    """
+    if not headers:
+        return None
+    paths = [os.path.dirname(os.path.abspath(header)).split(os.sep) for header in headers]
+    common = paths[0]
+    for path in paths[1:]:
+        size = 0
+        while size < min(len(common), len(path)) and common[size] == path[size]:
+            size += 1
+        common = common[:size]
+    return os.sep.join(common) or os.sep
+
+
+def module_path(header, output_dir, root=None):
+    """
+    Returns the path of the python module generated for <header>.
+    """
+    if root is None:
+        root = os.path.dirname(header)
+    relpath = os.path.relpath(os.path.splitext(header)[0] + '.py', root)
+    if relpath.startswith(os.pardir):
+        relpath = os.path.basename(relpath)
+    return os.path.join(output_dir, relpath)
+
+
+def compile_header(header, output, writer='WriterCTypes', **kwargs):
+    """
+    Converts a single header to a python module, returning a CompileResult.
+    The module file is only written once the whole header has been parsed.
+    """
+    start = time.time()
+    diagnostics = Diagnostics()
+    includes = []
+    try:
+        outdir = os.path.dirname(output)
+        if outdir and not os.path.isdir(outdir):
+            try:
+                os.makedirs(outdir)
+            except OSError:
+                if not os.path.isdir(outdir):
+                    raise
+        hr = HeaderParser(source=header, output=output, errstream=None, env={},
+                          diagnostics=diagnostics, writer_cls=WRITERS[writer], **kwargs)
+        hr.parse()
+        relative_to = os.path.dirname(os.path.abspath(header))
+        for filename in hr.includes:
+            path = find_include(filename, relative_to)
+            if path:
+                includes.append(path)
+        failure = None
+    except Exception as e:
+        failure = '{}: {}'.format(type(e).__name__, e)
+    return CompileResult(header, output, time.time() - start, len(diagnostics), failure, includes)
+
+
+def _compile_job(job):
+    header, output, kwargs = job
+    return compile_header(header, output, **kwargs)
+
+
+def compile_headers(headers, output_dir, root=None, jobs=1, callback=None, **kwargs):
+    """
+    Converts the list of headers using a pool of <jobs> processes.
+    <callback> is called with each result as it completes.
+    Returns the list of CompileResults.
+    Raises ValueError if two headers would be written to the same module.
+    """
+    work = [(header, module_path(header, output_dir, root), kwargs) for header in headers]
+    outputs = {}
+    for (header, output, options) in work:
+        other = outputs.setdefault(os.path.normcase(os.path.abspath(output)), header)
+        if other != header:
+            raise ValueError('{} and {} would both be written to {}.'.format(other, header, output))
+    results = []
+    if jobs == 1 or len(work) <= 1:
+        iterator = (_compile_job(job) for job in work)
+        pool = None
+    else:
+        import multiprocessing
+        pool = multiprocessing.Pool(jobs)
+        iterator = pool.imap_unordered(_compile_job, work)
+    try:
+        for result in iterator:
+            results.append(result)
+            if callback:
+                callback(result)
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+    return results
+
+
+def print_summary(results, stream=sys.stdout):
+    """
+    Prints a per-file timing and error summary.
+    """
+    failed = 0
+    total_time = 0.0
+    for (header, output, seconds, errors, failure, includes) in sorted(results):
+        total_time += seconds
+        if failure:
+            failed += 1
+            status = 'FAILED ' + failure
+        elif errors:
+            status = '{} error(s)'.format(errors)
+        else:
+            status = 'ok'
+        stream.write('{:8.3f}s  {}  {}\n'.format(seconds, header, status))
+    stream.write('{} header(s), {} failed, {:.3f}s total processing time.\n'.format(
+        len(results), failed, total_time))
+    return failed
+
+
+def _parse_args(argv):
+    parser = argparse.ArgumentParser(
+        description='Converts c header files to python modules.')
+    parser.add_argument('paths', nargs='*',
+        help='Header files or directories to search for headers.')
+    parser.add_argument('-m', '--manifest',
+        help='A file listing one header per line.')
+    parser.add_argument('-o', '--output-dir', default='.',
+        help='Directory to write the generated modules to.')
+    parser.add_argument('-j', '--jobs', type=int, default=None,
+        help='Number of worker processes (default: number of cpus).')
+    parser.add_argument('-w', '--writer', default='WriterCTypes', choices=sorted(WRITERS),
+        help='Writer used to generate the classes.')
+    parser.add_argument('-e', '--endianness', default=ENDIANNESS_NETWORK,
+        help='Default endianness (one of <, >, ! or =).')
+    parser.add_argument('-p', '--packing', type=int, default=1,
+        help='Structure packing.')
+    parser.add_argument('-D', '--define', action='append', default=[], metavar='NAME[=VALUE]',
+        help='Define a macro for the #if/#ifdef directives (may be repeated).')
+    parser.add_argument('--no-tables', action='store_true',
+        help='Do not generate the pytables descriptors.')
+    parser.add_argument('--slots', action='store_true',
+        help='Generate classes which keep their fields in __slots__ (Writer and WriterPlus).')
+    parser.add_argument('--expand-system-includes', action='store_true',
+        help='Parse the <...> includes into the generated modules.')
+    parser.add_argument('--mmap', action='store_true',
+        help='Read the headers through memory maps.')
+    parser.add_argument('-i', '--incremental', action='store_true',
+        help='Only regenerate the headers affected by changes since the last run.')
+    parser.add_argument('--watch', type=float, nargs='?', const=1.0, default=None, metavar='SECONDS',
+        help='Keep polling the headers for changes and regenerate them (implies --incremental).')
+    parser.add_argument('--deps',
+        help='Where the dependency graph is kept (default: {} in the output directory).'.format(DEPENDENCIES_FILENAME))
+    args = parser.parse_args(argv)
+    if not args.paths and not args.manifest:
+        parser.error('No headers given.')
+    return args
+
+
+def rebuild(headers, output_dir, graph, root=None, jobs=1, **kwargs):
+    """
+    Regenerates the outdated headers and updates the dependency graph.
+    Returns the list of CompileResults.
+    """
+    outdated = graph.outdated(headers)
+    results = compile_headers(outdated, output_dir, root=root, jobs=jobs, **kwargs)
+    for result in results:
+        if result.failure:
+            graph.remove(result.header)
+        else:
+            graph.update(result.header, result.includes, result.output)
+    return results
+
+
+def main(argv=None):
+    """
+    Entry point for the command line tool.
+    """
+    args = _parse_args(sys.argv[1:] if argv is None else argv)
+    jobs = args.jobs
+    if not jobs:
+        import multiprocessing
+        jobs = multiprocessing.cpu_count()
+    # The modules keep the paths of the headers relative to the directory
+    # given, or else to the deepest directory holding all of them.
+    root = args.paths[0] if len(args.paths) == 1 and os.path.isdir(args.paths[0]) else None
+    options = dict(writer=args.writer,
+                   default_endianness=args.endianness,
+                   packing=args.packing,
+                   tablesSupport=not args.no_tables,
+                   use_mmap=args.mmap)
+    if args.slots:
+        options['slots'] = True
+    if args.define:
+        options['defines'] = args.define
+    if args.expand_system_includes:
+        options['expand_system_includes'] = True
+    
+    if not (args.incremental or args.watch is not None):
+        headers = find_headers(args.paths, args.manifest)
+        results = compile_headers(headers, args.output_dir, root=root or common_root(headers), jobs=jobs,
+                                  **options)
+        failed = print_summary(results)
+        return 1 if failed else 0
+    
+    deps_path = args.deps or os.path.join(args.output_dir, DEPENDENCIES_FILENAME)
+    graph = DependencyGraph.load(deps_path)
+    while True:
+        headers = find_headers(args.paths, args.manifest)
+        results = rebuild(headers, args.output_dir, graph, root=root or common_root(headers), jobs=jobs,
+                          **options)
+        if results or args.watch is None:
+            if not os.path.isdir(args.output_dir):
+                os.makedirs(args.output_dir)
+            graph.save(deps_path)
+            failed = print_summary(results)
+            sys.stdout.flush()
+        if args.watch is None:
+            return 1 if failed else 0
+        try:
+            time.sleep(args.watch)
+        except KeyboardInterrupt:
+            return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,248 @@
+"""
+Benchmarks for the header parser and code generators using a synthetic
+header, eg.:
+
+    python -m h2pyex.benchmark --structs 500 -o results.json --baseline baseline.json
+
+Results are written as json and compared against a stored baseline. The
+exit status is non-zero if any timing regressed by more than the tolerance.
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import os
+import sys
+import json
+import argparse
+import platform
+import timeit
+from io import StringIO
+
+if __name__ == "__main__" and __package__ is None:
+    from h2pyex import *
+    from h2pyex.support import process_line_for_comments
+else:
+    from .support import process_line_for_comments
+    from .hparser import HeaderParser
+    from .writer import Writer
+    from .writerplus import WriterPlus
+    from .writer_ctypes import WriterCTypes
+
+
+WRITERS = (Writer, WriterPlus, WriterCTypes)
+
+_FIELD_TYPES = ('int8_t', 'uint8_t', 'int16_t', 'uint16_t', 'int32_t',
+                'uint32_t', 'int64_t', 'uint64_t', 'float', 'double')
+
+
+def make_synthetic_header(structs=100, defines=100, nesting=3, array_size=32,
+                          fields=8, comment_lines=2):
+    """
+    Returns the text of a header with <structs> structs of <fields> fields,
+    <defines> constants, chains of structs nested <nesting> deep, arrays of
+    <array_size> elements and blocks of <comment_lines> lines of comments.
+    """
+    lines = ['/**', ' Synthetic header generated for benchmarking h2pyex.', '*/', '']
+    lines.append('#define SYN_ARRAY_SIZE {}'.format(array_size))
+    for i in range(defines):
+        lines.append('/* Constant number {}. */'.format(i))
+        lines.append('#define SYN_CONST_{} (0x{:X} + {}) // Inline comment'.format(i, i, i*3))
+    lines.append('')
+    for i in range(structs):
+        lines.append('/**')
+        for j in range(comment_lines):
+            lines.append(' Line {} of the documentation for struct {}.'.format(j, i))
+        lines.append('*/')
+        lines.append('typedef struct {')
+        for j in range(fields):
+            typename = _FIELD_TYPES[(i + j) % len(_FIELD_TYPES)]
+            if j % 4 == 3:
+                lines.append('    // A pre comment')
+                lines.append('    {} f{}[SYN_ARRAY_SIZE]; // An array'.format(typename, j))
+            else:
+                lines.append('    {} f{}; // Field {}'.format(typename, j, j))
+        if i % 5 == 4:
+            lines.append('    char name[16];')
+        if nesting > 1 and i % nesting:
+            lines.append('    Syn{}_t nested;'.format(i-1))
+            if i % nesting == nesting-1:
+                lines.append('    Syn{}_t nesteds[2];'.format(i-1))
+        lines.append('}} Syn{}_t;'.format(i))
+        lines.append('')
+    return '\n'.join(lines) + '\n'
+
+
+def _best_time(fn, repeat):
+    return min(timeit.repeat(fn, number=1, repeat=repeat))
+
+
+def generate_source(header_text, writer_cls, **kwargs):
+    """
+    Returns the python code generated from <header_text>.
+    """
+    out = StringIO()
+    HeaderParser(source=StringIO(header_text), output=out, errstream=None, env={},
+                 writer_cls=writer_cls, **kwargs).parse()
+    return out.getvalue()
+
+
+class _RecordingWriter(object):
+    """
+    Stands in for a writer to record the calls made by the parser so the
+    parsing and the code generation can be timed separately.
+    """
+    
+    def __init__(self):
+        self.calls = []
+        self.output = StringIO()
+    
+    def putln(self, *args):
+        self.calls.append(('putln', args))
+    
+    def _put_comment(self, *args):
+        self.calls.append(('_put_comment', args))
+    
+    def write_typedef(self, *args):
+        self.calls.append(('write_typedef', args))
+    
+    def write_struct_class(self, *args):
+        self.calls.append(('write_struct_class', args))
+    
+    def finish(self):
+        self.calls.append(('finish', ()))
+    
+    def replay(self, writer):
+        for name, args in self.calls:
+            getattr(writer, name)(*args)
+
+
+def parse_header(header_text):
+    """
+    Parses <header_text> returning the writer calls made by the parser.
+    """
+    recorder = _RecordingWriter()
+    HeaderParser(source=StringIO(header_text), writer=recorder, errstream=None, env={}).parse()
+    return recorder
+
+
+def _exec_fn(code):
+    def fn():
+        exec(code, {})
+    return fn
+
+
+def run_benchmarks(header_text, repeat=3, writers=WRITERS, **kwargs):
+    """
+    Times the separate stages of converting <header_text>.
+    Returns a dictionary of benchmark name to best time in seconds.
+    """
+    results = {}
+    lines = header_text.splitlines(True)
+    
+    def comments():
+        inside_comment = inside_string = False
+        for line in lines:
+            (code, comment, inside_comment, inside_string) = \
+                process_line_for_comments(line, inside_comment, inside_string)
+    results['process_line_for_comments'] = _best_time(comments, repeat)
+    results['parse'] = _best_time(lambda: parse_header(header_text), repeat)
+    recorder = parse_header(header_text)
+    
+    for writer_cls in writers:
+        name = writer_cls.__name__
+        results['write.' + name] = _best_time(
+            lambda: recorder.replay(writer_cls(output=StringIO(), **kwargs)), repeat)
+        results['parse_and_write.' + name] = _best_time(
+            lambda: generate_source(header_text, writer_cls, **kwargs), repeat)
+        source = generate_source(header_text, writer_cls, **kwargs)
+        results['compile.' + name] = _best_time(
+            lambda: compile(source, '<' + name + '>', 'exec'), repeat)
+        results['exec.' + name] = _best_time(_exec_fn(compile(source, '<' + name + '>', 'exec')), repeat)
+    return results
+
+
+def compare(results, baseline, tolerance=0.2):
+    """
+    Returns a list of (name, baseline time, time) for the results which are
+    more than <tolerance> (a fraction) slower than the baseline.
+    """
+    regressions = []
+    for name, seconds in sorted(results.items()):
+        base = baseline.get(name)
+        if base and seconds > base*(1.0 + tolerance):
+            regressions.append((name, base, seconds))
+    return regressions
+
+
+def save_results(path, results, settings):
+    with open(path, 'w') as f:
+        f.write(json.dumps({
+            'python': platform.python_version(),
+            'settings': settings,
+            'results': results,
+        }, indent=1, sort_keys=True))
+
+
+def load_results(path):
+    with open(path, 'r') as f:
+        return json.load(f)['results']
+
+
+def print_results(results, baseline=None, stream=sys.stdout):
+    for name, seconds in sorted(results.items()):
+        line = '{:40s} {:10.4f}s'.format(name, seconds)
+        if baseline and baseline.get(name):
+            line += '  {:+7.1%}'.format(seconds/baseline[name] - 1.0)
+        stream.write(line + '\n')
+
+
+def _parse_args(argv):
+    parser = argparse.ArgumentParser(
+        description='Benchmarks the h2pyex parser and code generators.')
+    parser.add_argument('--structs', type=int, default=200)
+    parser.add_argument('--defines', type=int, default=200)
+    parser.add_argument('--nesting', type=int, default=3)
+    parser.add_argument('--array-size', type=int, default=32)
+    parser.add_argument('--fields', type=int, default=8)
+    parser.add_argument('--comment-lines', type=int, default=2)
+    parser.add_argument('--repeat', type=int, default=3,
+        help='Number of runs of each benchmark, the best is kept.')
+    parser.add_argument('-o', '--output',
+        help='Write the results to this json file.')
+    parser.add_argument('-b', '--baseline',
+        help='Compare the results against this json file.')
+    parser.add_argument('-t', '--tolerance', type=float, default=0.2,
+        help='Fraction a benchmark may be slower than the baseline.')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    """
+    Entry point for the command line tool.
+    """
+    args = _parse_args(sys.argv[1:] if argv is None else argv)
+    settings = dict(structs=args.structs, defines=args.defines, nesting=args.nesting,
+                    array_size=args.array_size, fields=args.fields,
+                    comment_lines=args.comment_lines)
+    header_text = make_synthetic_header(**settings)
+    results = run_benchmarks(header_text, repeat=args.repeat, tablesSupport=False)
+    
+    baseline = None
+    if args.baseline and os.path.isfile(args.baseline):
+        baseline = load_results(args.baseline)
+    print_results(results, baseline)
+    if args.output:
+        save_results(args.output, results, settings)
+    if baseline:
+        regressions = compare(results, baseline, args.tolerance)
+        for (name, base, seconds) in regressions:
+            print('REGRESSION: {} took {:.4f}s, baseline {:.4f}s.'.format(name, seconds, base))
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,215 @@
+"""
+Benchmarks the runtime throughput of the classes generated by each writer,
+eg.:
+
+    python -m h2pyex.benchmark_runtime -n 20000 -o runtime.json
+
+Reports messages/sec and bytes/sec of construction, serialise,
+deserialise_from, update and pythonise for flat, array heavy and nested
+structs (or the structs of a given header) and, where tracemalloc is
+available, the memory blocks allocated per operation.
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import sys
+import types
+import json
+import timeit
+import argparse
+import platform
+import itertools
+
+try:
+    import tracemalloc
+except ImportError:
+    tracemalloc = None
+
+if __name__ == "__main__" and __package__ is None:
+    from h2pyex.benchmark import generate_source, save_results, WRITERS
+else:
+    from .benchmark import generate_source, save_results, WRITERS
+
+
+RUNTIME_HEADER = """
+// A struct of scalars only.
+typedef struct {
+    int8_t bi;
+    uint8_t bu;
+    int16_t di;
+    uint16_t du;
+    int32_t qi;
+    uint32_t qu;
+    float f;
+    double dbl;
+} Bench_Flat_t;
+
+// A struct dominated by arrays.
+typedef struct {
+    uint32_t seq;
+    int16_t samples[128];
+    float gains[16];
+    uint8_t flags[32];
+    char name[16];
+} Bench_Arrays_t;
+
+typedef struct {
+    float32_t afloat;
+} Bench_NestC_t;
+
+typedef struct {
+    float32_t afloat;
+    Bench_NestC_t cnests;
+} Bench_NestB_t;
+
+// The same shape as Sample_NestA_t.
+typedef struct {
+    Bench_NestB_t bnest;
+    double testdouble;
+    Bench_NestC_t cnest;
+    Bench_NestB_t bnests[2];
+} Bench_NestA_t;
+"""
+
+RUNTIME_STRUCTS = ('Bench_Flat_t', 'Bench_Arrays_t', 'Bench_NestA_t')
+
+OPERATIONS = ('construct', 'serialise', 'deserialise_from', 'update', 'pythonise')
+
+
+def load_module(header_text, writer_cls, name=None, **kwargs):
+    """
+    Generates and executes a module from <header_text>.
+    """
+    module = types.ModuleType(str(name or 'bench_' + writer_cls.__name__))
+    exec(compile(generate_source(header_text, writer_cls, **kwargs), module.__name__, 'exec'),
+         module.__dict__)
+    return module
+
+
+def make_operation(operation, cls):
+    """
+    Returns a function which performs <operation> once on an instance of <cls>.
+    """
+    obj = cls()
+    size = obj.packed_size()
+    # Deterministic, non-zero data for the other instance.
+    buf = bytes(bytearray((7*i + 1) & 0x7F for i in range(size)))
+    other = cls()
+    other.deserialise(buf)
+    if operation == 'construct':
+        return cls
+    elif operation == 'serialise':
+        return obj.serialise
+    elif operation == 'deserialise_from':
+        return lambda: obj.deserialise_from(buf, 0)
+    elif operation == 'update':
+        # Alternate between changing every field and changing none.
+        others = itertools.cycle((other, cls()))
+        return lambda: obj.update(next(others))
+    elif operation == 'pythonise':
+        other.pythonise()
+        return other.pythonise
+    raise ValueError('Unknown operation {}.'.format(operation))
+
+
+def measure_allocations(fn, count=1000):
+    """
+    Returns the (blocks, bytes) allocated per call of <fn> and kept alive by
+    its results or None if tracemalloc is not available.
+    """
+    if tracemalloc is None:
+        return None
+    results = []
+    tracemalloc.start()
+    try:
+        before = tracemalloc.take_snapshot()
+        for i in range(count):
+            results.append(fn())
+        after = tracemalloc.take_snapshot()
+    finally:
+        tracemalloc.stop()
+    stats = after.compare_to(before, 'filename')
+    blocks = sum(stat.count_diff for stat in stats)
+    size = sum(stat.size_diff for stat in stats)
+    # Remove the results list itself.
+    return max(blocks - 1, 0)/count, max(size - sys.getsizeof(results), 0)/count
+
+
+def run_benchmarks(header_text=RUNTIME_HEADER, structs=RUNTIME_STRUCTS, number=10000,
+                   repeat=3, writers=WRITERS, operations=OPERATIONS, **kwargs):
+    """
+    Returns a dictionary of '<writer>.<struct>.<operation>' to a dictionary
+    of the measured rates.
+    """
+    results = {}
+    for writer_cls in writers:
+        module = load_module(header_text, writer_cls, **kwargs)
+        for structname in structs:
+            cls = getattr(module, structname)
+            size = cls().packed_size()
+            for operation in operations:
+                fn = make_operation(operation, cls)
+                seconds = min(timeit.repeat(fn, number=number, repeat=repeat))/number
+                result = {
+                    'seconds': seconds,
+                    'msgs_per_sec': 1.0/seconds,
+                    'bytes_per_sec': size/seconds,
+                }
+                allocations = measure_allocations(make_operation(operation, cls))
+                if allocations is not None:
+                    result['alloc_blocks'], result['alloc_bytes'] = allocations
+                results['{}.{}.{}'.format(writer_cls.__name__, structname, operation)] = result
+    return results
+
+
+def print_results(results, stream=sys.stdout):
+    stream.write('{:50s} {:>12s} {:>12s} {:>9s} {:>10s}\n'.format(
+        'benchmark', 'msgs/s', 'MB/s', 'blocks', 'bytes'))
+    for name, result in sorted(results.items()):
+        line = '{:50s} {:12.0f} {:12.2f}'.format(
+            name, result['msgs_per_sec'], result['bytes_per_sec']/1e6)
+        if 'alloc_blocks' in result:
+            line += ' {:9.1f} {:10.1f}'.format(result['alloc_blocks'], result['alloc_bytes'])
+        stream.write(line + '\n')
+
+
+def _parse_args(argv):
+    parser = argparse.ArgumentParser(
+        description='Benchmarks the runtime throughput of the generated classes.')
+    parser.add_argument('--header',
+        help='Header to generate the classes from (default: a built in one).')
+    parser.add_argument('-s', '--struct', action='append',
+        help='Name of a struct to benchmark (may be repeated).')
+    parser.add_argument('-n', '--number', type=int, default=10000,
+        help='Number of operations per timing.')
+    parser.add_argument('--repeat', type=int, default=3,
+        help='Number of timings of each benchmark, the best is kept.')
+    parser.add_argument('-o', '--output',
+        help='Write the results to this json file.')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    """
+    Entry point for the command line tool.
+    """
+    args = _parse_args(sys.argv[1:] if argv is None else argv)
+    header_text = RUNTIME_HEADER
+    if args.header:
+        with open(args.header, 'r') as f:
+            header_text = f.read()
+    structs = args.struct or RUNTIME_STRUCTS
+    results = run_benchmarks(header_text, structs, number=args.number, repeat=args.repeat,
+                             tablesSupport=False)
+    print_results(results)
+    if args.output:
+        save_results(args.output, results, dict(header=args.header, structs=list(structs),
+                                                number=args.number))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,414 @@
+"""
+Evaluation of c constant expressions in #defines and #if directives.
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import re
+import sys
+import ast
+import math
+import struct
+import numbers
+
+from .userexceptions import NotConstantException
+
+
+_LONG_BITS = struct.calcsize(str('l'))*8
+
+# The types c constants can be cast to: name -> (bits, signed), where bits
+# is None for floating point types.
+CAST_TYPES = {
+    'char': (8, True),
+    'signed char': (8, True),
+    'unsigned char': (8, False),
+    'short': (16, True),
+    'short int': (16, True),
+    'unsigned short': (16, False),
+    'unsigned short int': (16, False),
+    'int': (32, True),
+    'signed': (32, True),
+    'signed int': (32, True),
+    'unsigned': (32, False),
+    'unsigned int': (32, False),
+    'long': (_LONG_BITS, True),
+    'long int': (_LONG_BITS, True),
+    'unsigned long': (_LONG_BITS, False),
+    'unsigned long int': (_LONG_BITS, False),
+    'long long': (64, True),
+    'unsigned long long': (64, False),
+    'size_t': (_LONG_BITS, False),
+    'int8_t': (8, True),
+    'uint8_t': (8, False),
+    'int16_t': (16, True),
+    'uint16_t': (16, False),
+    'int32_t': (32, True),
+    'uint32_t': (32, False),
+    'int64_t': (64, True),
+    'uint64_t': (64, False),
+    'float': (None, True),
+    'double': (None, True),
+    'long double': (None, True),
+}
+
+_TYPE_WORDS = frozenset(word for name in CAST_TYPES for word in name.split())
+
+# Hex constants above the largest int are wrapped to negative values as
+# HeaderParser.pytify() does.
+_MAXINT = sys.maxsize
+_UMAX = 2*(_MAXINT + 1)
+
+_TOKEN_REGEX = re.compile(r"""[\t ]*(?:
+     (?P<float>(?:[0-9]+\.[0-9]*|\.[0-9]+)(?:[eE][-+]?[0-9]+)?|[0-9]+[eE][-+]?[0-9]+)[fFlL]?
+    |(?P<hex>0[xX][0-9a-fA-F]+)[uUlL]*
+    |(?P<int>[0-9]+)[uUlL]*
+    |(?P<char>'(?:\\.[^\\']*|[^\\'])')
+    |(?P<name>[a-zA-Z_][a-zA-Z0-9_]*)
+    |(?P<op><<|>>|<=|>=|==|!=|&&|\|\||[-+*/%&|^~!<>?:()])
+    )""", re.VERBOSE)
+
+_END_REGEX = re.compile(r'[\t \r\n]*$')
+
+# Most bodies are a single decimal or hex number.
+_LITERAL_REGEX = re.compile(r'[\t ]*(?:0[xX]([0-9a-fA-F]+)|([1-9][0-9]*|0))[uUlL]*[\t \r\n]*$')
+
+# Bodies which only use operators meaning the same in python, and no calls,
+# comparisons or python keywords, are compiled by python itself as that is
+# quicker than parsing them here. Large hex constants are left to the parser
+# so they are wrapped the same way.
+_PYTHON_COMPATIBLE_REGEX = re.compile(r'[a-zA-Z0-9_ \t()+\-*&|^~<>]*$')
+_NOT_PYTHON_REGEX = re.compile(
+    r'\b(?:and|or|not|is|in|if|else|lambda|None|True|False)\b|[a-zA-Z0-9_)][ \t]*\('
+    r'|(?<![<>])[<>](?![<>])|\*\*|0[xX][0-9a-fA-F]{16}')
+_INT_SUFFIX_REGEX = re.compile(r'\b(0[xX][0-9a-fA-F]+|[0-9]+)[uUlL]+\b')
+_NO_BUILTINS = {'__builtins__': {}}
+
+_DEFINED_REGEX = re.compile(
+    r'\bdefined\b[\t ]*(?:\([\t ]*([a-zA-Z_][a-zA-Z0-9_]*)[\t ]*\)|([a-zA-Z_][a-zA-Z0-9_]*))')
+
+_BINARY_PRECEDENCE = {
+    '||': 1,
+    '&&': 2,
+    '|': 3,
+    '^': 4,
+    '&': 5,
+    '==': 6, '!=': 6,
+    '<': 7, '<=': 7, '>': 7, '>=': 7,
+    '<<': 8, '>>': 8,
+    '+': 9, '-': 9,
+    '*': 10, '/': 10, '%': 10,
+}
+
+_CONDITIONAL_PRECEDENCE = 0
+
+
+def evaluate(expr, symbols):
+    """
+    Evaluates the c constant expression <expr>, which may use the names of
+    the numbers in the dictionary <symbols> (eg. earlier #defines), and
+    returns its value as an int or float. Integer division and remainder
+    truncate towards zero as in c.
+    Raises NotConstantException if it is not a constant expression.
+    """
+    m = _LITERAL_REGEX.match(expr)
+    if m is not None:
+        if m.group(2) is not None:
+            return int(m.group(2))
+        value = int(m.group(1), 16)
+        return value - _UMAX if value > _MAXINT else value
+    if _PYTHON_COMPATIBLE_REGEX.match(expr) and not _NOT_PYTHON_REGEX.search(expr):
+        try:
+            python_expr = expr
+            if _INT_SUFFIX_REGEX.search(expr):
+                python_expr = _INT_SUFFIX_REGEX.sub(r'\1', expr)
+            value = eval(python_expr.strip(), _NO_BUILTINS, symbols)
+        except Exception:
+            pass
+        else:
+            if isinstance(value, numbers.Real) and not isinstance(value, bool):
+                return value
+    parser = _Parser(_tokenise(expr), symbols)
+    try:
+        value = parser.parse_expression(_CONDITIONAL_PRECEDENCE)
+    except (TypeError, ValueError, ZeroDivisionError, OverflowError) as e:
+        raise NotConstantException('{} in "{}"'.format(e, expr))
+    if parser.pos != len(parser.tokens):
+        raise NotConstantException('Unexpected "{}" in "{}"'.format(parser.tokens[parser.pos][1], expr))
+    return value
+
+
+def evaluate_condition(expr, symbol_tables):
+    """
+    Evaluates the expression of an #if or #elif directive and returns
+    whether it is true. A name is defined if it is in any of the
+    dictionaries <symbol_tables>, the first one holding it giving its value.
+    As in c, "defined NAME" and "defined(NAME)" are 1 or 0 and any other
+    name which is not a number counts as 0.
+    Raises NotConstantException if it is not a constant expression.
+    """
+    symbols = _ConditionSymbols(symbol_tables)
+    if 'defined' in expr:
+        expr = _DEFINED_REGEX.sub(lambda m: '1' if (m.group(1) or m.group(2)) in symbols else '0', expr)
+    return bool(evaluate(expr, symbols))
+
+
+def format_constant(value):
+    """
+    Returns the python literal of a value from evaluate().
+    """
+    if isinstance(value, float):
+        if math.isinf(value) or math.isnan(value):
+            raise NotConstantException('{} has no literal.'.format(value))
+        return repr(value)
+    return str(value)
+
+
+def _tokenise(expr):
+    """
+    Returns the list of (kind, value) of the tokens of <expr>, numbers
+    being converted to their values.
+    """
+    tokens = []
+    pos = 0
+    end = len(expr)
+    match = _TOKEN_REGEX.match
+    while pos < end:
+        m = match(expr, pos)
+        if m is None:
+            if _END_REGEX.match(expr, pos):
+                break
+            raise NotConstantException('Cannot parse "{}"'.format(expr[pos:]))
+        kind = m.lastgroup
+        text = m.group(kind)
+        if kind == 'int':
+            if len(text) > 1 and text[0] == '0':
+                try:
+                    value = int(text, 8)
+                except ValueError:
+                    raise NotConstantException('Invalid octal constant {}'.format(text))
+            else:
+                value = int(text)
+            tokens.append(('number', value))
+        elif kind == 'hex':
+            value = int(text, 16)
+            if value > _MAXINT:
+                value -= _UMAX
+            tokens.append(('number', value))
+        elif kind == 'float':
+            tokens.append(('number', float(text)))
+        elif kind == 'char':
+            try:
+                tokens.append(('number', ord(ast.literal_eval(str(text)))))
+            except (TypeError, ValueError, SyntaxError):
+                raise NotConstantException('Invalid character constant {}'.format(text))
+        else:
+            tokens.append((kind, text))
+        pos = m.end()
+    if not tokens:
+        raise NotConstantException('Empty expression')
+    return tokens
+
+
+class _Parser(object):
+    """
+    Evaluates a list of tokens by precedence climbing. The operands of
+    && and || and the branches of ?: which c does not evaluate are parsed
+    with <skipping> set, which makes every operation yield 0 instead.
+    """
+    
+    def __init__(self, tokens, symbols):
+        """
+        Constructor
+        """
+        super(_Parser, self).__init__()
+        self.tokens = tokens
+        self.symbols = symbols
+        self.pos = 0
+        self.skipping = 0
+    
+    
+    def _peek(self):
+        if self.pos < len(self.tokens):
+            return self.tokens[self.pos]
+        return (None, None)
+    
+    
+    def _expect(self, op):
+        if self._peek() != ('op', op):
+            raise NotConstantException('Expected "{}"'.format(op))
+        self.pos += 1
+    
+    
+    def parse_expression(self, min_precedence):
+        value = self.parse_unary()
+        while True:
+            (kind, op) = self._peek()
+            if kind != 'op':
+                return value
+            if op == '?':
+                if min_precedence > _CONDITIONAL_PRECEDENCE:
+                    return value
+                self.pos += 1
+                value = self._parse_conditional(value)
+                continue
+            precedence = _BINARY_PRECEDENCE.get(op)
+            if precedence is None or precedence <= min_precedence:
+                return value
+            self.pos += 1
+            if op == '&&' or op == '||':
+                skip_right = (not value) if op == '&&' else bool(value)
+                self.skipping += skip_right
+                right = self.parse_expression(precedence)
+                self.skipping -= skip_right
+                value = int(bool(value) and bool(right)) if op == '&&' else int(bool(value) or bool(right))
+            else:
+                right = self.parse_expression(precedence)
+                value = 0 if self.skipping else _binary(op, value, right)
+    
+    
+    def _parse_conditional(self, condition):
+        self.skipping += not condition
+        if_true = self.parse_expression(_CONDITIONAL_PRECEDENCE)
+        self.skipping -= not condition
+        self._expect(':')
+        self.skipping += bool(condition)
+        if_false = self.parse_expression(_CONDITIONAL_PRECEDENCE - 1)
+        self.skipping -= bool(condition)
+        return if_true if condition else if_false
+    
+    
+    def parse_unary(self):
+        (kind, value) = self._peek()
+        self.pos += 1
+        if kind == 'number':
+            return value
+        elif kind == 'name':
+            return self._lookup(value)
+        elif kind != 'op':
+            raise NotConstantException('Incomplete expression')
+        elif value == '(':
+            cast = self._parse_cast()
+            if cast is not None:
+                return _cast(cast, self.parse_unary())
+            inner = self.parse_expression(_CONDITIONAL_PRECEDENCE)
+            self._expect(')')
+            return inner
+        elif value == '-':
+            return -self.parse_unary()
+        elif value == '+':
+            return +self.parse_unary()
+        elif value == '~':
+            return ~self.parse_unary()
+        elif value == '!':
+            return int(not self.parse_unary())
+        raise NotConstantException('Unexpected "{}"'.format(value))
+    
+    
+    def _parse_cast(self):
+        """
+        Returns the (bits, signed) of a cast following an open bracket and
+        moves past it, or None if the bracket does not start a cast.
+        """
+        words = []
+        pos = self.pos
+        while pos < len(self.tokens) and self.tokens[pos][0] == 'name' and self.tokens[pos][1] in _TYPE_WORDS:
+            words.append(self.tokens[pos][1])
+            pos += 1
+        if not words or pos >= len(self.tokens) or self.tokens[pos] != ('op', ')'):
+            return None
+        cast = CAST_TYPES.get(' '.join(words))
+        if cast is None or (len(words) == 1 and words[0] in self.symbols):
+            return None
+        self.pos = pos + 1
+        return cast
+    
+    
+    def _lookup(self, name):
+        if self.skipping:
+            return 0
+        value = self.symbols.get(name)
+        if not isinstance(value, numbers.Real):
+            raise NotConstantException('"{}" is not a constant'.format(name))
+        return value
+
+
+class _ConditionSymbols(object):
+    """
+    The names of an #if expression looked up through several dictionaries,
+    those which are not numbers being 0.
+    """
+    
+    def __init__(self, symbol_tables):
+        """
+        Constructor
+        """
+        super(_ConditionSymbols, self).__init__()
+        self.symbol_tables = symbol_tables
+    
+    
+    def __contains__(self, name):
+        return any(name in symbols for symbols in self.symbol_tables)
+    
+    
+    def get(self, name, default=None):
+        for symbols in self.symbol_tables:
+            if name in symbols:
+                value = symbols[name]
+                return value if isinstance(value, numbers.Real) else 0
+        return 0
+    
+    
+    __getitem__ = get
+
+
+def _binary(op, a, b):
+    if op == '+':
+        return a + b
+    elif op == '-':
+        return a - b
+    elif op == '*':
+        return a * b
+    elif op == '/':
+        if isinstance(a, float) or isinstance(b, float):
+            return a / b
+        quotient = abs(a)//abs(b)
+        return -quotient if (a < 0) != (b < 0) else quotient
+    elif op == '%':
+        if isinstance(a, float) or isinstance(b, float):
+            raise TypeError('Remainder of a float')
+        quotient = abs(a)//abs(b)
+        return a - b*(-quotient if (a < 0) != (b < 0) else quotient)
+    elif op == '<<':
+        return a << b
+    elif op == '>>':
+        return a >> b
+    elif op == '&':
+        return a & b
+    elif op == '|':
+        return a | b
+    elif op == '^':
+        return a ^ b
+    elif op == '<':
+        return int(a < b)
+    elif op == '<=':
+        return int(a <= b)
+    elif op == '>':
+        return int(a > b)
+    elif op == '>=':
+        return int(a >= b)
+    elif op == '==':
+        return int(a == b)
+    return int(a != b)
+
+
+def _cast(cast, value):
+    (bits, signed) = cast
+    if bits is None:
+        return float(value)
+    value = int(value) & ((1 << bits) - 1)
+    if signed and value >= 1 << (bits - 1):
+        value -= 1 << bits
+    return value
@@ -14,8 +14,21 @@ import ctypes
 
 from .support import *
 from .abstractstruct import *
+from .abstractstruct import _record_count
 
 
+# Class -> list of the (offset, size) of each field in _fields_ order.
+_field_spans = {}
+
+# Endianness -> byte order, None being the native order.
+_BYTE_ORDERS = {
+    ENDIANNESS_BIG: 'big',
+    ENDIANNESS_NETWORK: 'big',
+    ENDIANNESS_LITTLE: 'little',
+    ENDIANNESS_NATIVE: None,
+    '@': None,
+}
+
 
 class CTypesStruct(AbstractStruct):
     """
@@ -24,6 +37,7 @@ class CTypesStruct(AbstractStruct):
     
     def __init__(self, **kwargs):
         super(CTypesStruct, self).__init__()
+        self._check_endianness(kwargs.pop('endianness', None))
         self.freeze()
         
         for key, val in enum_fields(kwargs):
@@ -36,6 +50,90 @@ class CTypesStruct(AbstractStruct):
         #        initval = kwargs.pop(name)
         #        setattr(self, name, initval)
     
+    @classmethod
+    def decode_many(cls, buf, count=None, offset=0, form=DECODE_LIST, out=None, **kwargs):
+        """
+        Overrides base class.
+        The records are copied out of <buf> in one go into a ctypes array of
+        the class so they share its memory, unless they are decoded into the
+        existing instances in <out>. The constructor arguments in <kwargs> are
+        accepted as for other classes, an endianness being checked against
+        the class and any field values being overwritten by the decoding.
+        """
+        cls._check_endianness(kwargs.get('endianness'))
+        if form not in DECODE_FORMS:
+            raise ValueError('Unknown form {}, expected one of {}.'.format(form, DECODE_FORMS))
+        if out is not None:
+            return super(CTypesStruct, cls).decode_many(buf, count, offset, form, out)
+        count = _record_count(len(buf), offset, ctypes.sizeof(cls), count)
+        records = (cls*count).from_buffer_copy(buf, offset) if count else []
+        if form == DECODE_COLUMNS:
+            return dict((field[0], [getattr(record, field[0]) for record in records]) for field in cls._fields_)
+        if form == DECODE_DICTS:
+            return [record.to_dict() for record in records]
+        records = cls._frozen_records(records)
+        if form == DECODE_ITER:
+            return records
+        return list(records)
+    
+    
+    @classmethod
+    def _check_endianness(cls, endianness):
+        """
+        Raises a ValueError if <endianness> is given and is not the byte
+        order of the class, which ctypes fixes in its base class.
+        """
+        if endianness is None:
+            return
+        try:
+            wanted = _BYTE_ORDERS[endianness]
+        except KeyError:
+            raise ValueError('Unknown endianness {!r}.'.format(endianness))
+        for (base, order) in ((ctypes.BigEndianStructure, 'big'), (ctypes.LittleEndianStructure, 'little')):
+            # One of the two is ctypes.Structure itself, depending on the platform.
+            if base is not ctypes.Structure and issubclass(cls, base):
+                break
+        else:
+            order = sys.byteorder
+        if (wanted or sys.byteorder) != order:
+            raise ValueError('{} is {} endian and cannot be used as {!r}.'.format(cls.__name__, order, endianness))
+    
+    
+    @classmethod
+    def view(cls, buffer, offset=0):
+        """
+        Returns an instance whose fields are read from and written straight to
+        <buffer> (eg. a bytearray, mmap or memoryview) at <offset> without
+        copying. The instance keeps the buffer alive, which cannot be resized
+        while the view exists. Read-only buffers (eg. bytes) are copied as
+        ctypes cannot share their memory.
+        """
+        try:
+            record = cls.from_buffer(buffer, offset)
+        except TypeError:
+            record = cls.from_buffer_copy(buffer, offset)
+        record.freeze()
+        return record
+    
+    
+    @classmethod
+    def lazy(cls, buf, offset=0):
+        """
+        Overrides base class.
+        ctypes fields are only converted when they are accessed so this is
+        the same as view().
+        """
+        return cls.view(buf, offset)
+    
+    
+    @staticmethod
+    def _frozen_records(records):
+        for record in records:
+            # The elements of a ctypes array are created without calling __init__.
+            record.freeze()
+            yield record
+    
+    
     def packed_size(self):
         """ Returns the packet size when serialized. """
         return ctypes.sizeof(self)
@@ -59,11 +157,44 @@ class CTypesStruct(AbstractStruct):
         return utils.buffer_move(self, buf, src_offset=offset)
     
     
+    def __eq__(self, other):
+        """
+        Overrides base class.
+        Structs of the same class are compared straight from their memory.
+        """
+        if type(other) is type(self):
+            size = ctypes.sizeof(self)
+            return (ctypes.string_at(ctypes.addressof(self), size) ==
+                    ctypes.string_at(ctypes.addressof(other), size))
+        return super(CTypesStruct, self).__eq__(other)
+    
+    
+    def __hash__(self):
+        """
+        Overrides base class.
+        """
+        return hash(ctypes.string_at(ctypes.addressof(self), ctypes.sizeof(self)))
+    
+    
+    def _field_spans(self):
+        """
+        Overrides base class.
+        The spans are read from the field descriptors of the class.
+        """
+        cls = type(self)
+        try:
+            return _field_spans[cls]
+        except KeyError:
+            spans = _field_spans[cls] = [(getattr(cls, field[0]).offset, getattr(cls, field[0]).size)
+                                         for field in cls._fields_]
+            return spans
+    
+    
     def serialise(self):
         """
         Serialise a class to a raw data.
         """
-        return str(self.const_data())
+        return self.const_data()
     
     
     def serialise_into(self, buf, offset=0):
@@ -80,7 +211,13 @@ class CTypesStruct(AbstractStruct):
         Return the data in this struct as a packed mutable byte array whose data shares the
         memory buffer of the struct.
         """
-        raise memoryview(self)
+        data = memoryview(self)
+        if hasattr(data, 'cast'):
+            # A flat view of the bytes rather than a single structure element.
+            return data.cast('B')
+        # Python 2 has no cast() so the bytes are viewed through an array
+        # sharing the memory of the struct, which it keeps alive.
+        return memoryview((ctypes.c_ubyte*ctypes.sizeof(self)).from_buffer(self))
     
     
     def const_data(self):
@@ -0,0 +1,100 @@
+"""
+A cache of decoded records keyed by their packed bytes.
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import collections
+
+from .dispatch import _make_decoder
+
+
+DEFAULT_MAX_SIZE = 256
+
+
+class DecodeCache(object):
+    """
+    A bounded least recently used cache of records of one struct class (of
+    any writer) keyed by their packed bytes, eg.:
+    
+        cache = DecodeCache(Heartbeat_t, max_size=64)
+        record = cache.decode(frame)
+        if record is not last_seen[source]:
+            ...
+    
+    A frame whose bytes were decoded recently returns the same instance
+    again without being decoded, so repeated frames can also be recognised
+    by identity. The instances are shared and must not be changed.
+    """
+    
+    def __init__(self, cls, max_size=DEFAULT_MAX_SIZE, **kwargs):
+        """
+        Constructor
+        
+        At most <max_size> records are kept. <kwargs> are passed to the
+        constructor of each record (eg. endianness).
+        """
+        super(DecodeCache, self).__init__()
+        if max_size < 1:
+            raise ValueError('Cache size must be at least 1, not {}.'.format(max_size))
+        self.cls = cls
+        self.max_size = max_size
+        self.record_size = cls(**kwargs).packed_size()
+        self.hits = 0
+        self.misses = 0
+        self._decode = _make_decoder(cls, kwargs)
+        self._records = collections.OrderedDict()
+    
+    
+    def __len__(self):
+        """
+        Returns the number of records cached.
+        """
+        return len(self._records)
+    
+    
+    def decode(self, buf, offset=0):
+        """
+        Returns the record at <offset> in <buf>, decoding it only if its
+        bytes are not cached.
+        """
+        key = buf[offset:offset + self.record_size]
+        if isinstance(key, memoryview):
+            key = key.tobytes()
+        elif not isinstance(key, bytes):
+            key = bytes(key)
+        if len(key) != self.record_size:
+            raise ValueError('Buffer of {} bytes is too small for a {} at offset {}.'.format(
+                len(buf), self.cls.__name__, offset))
+        records = self._records
+        record = records.pop(key, None)
+        if record is None:
+            self.misses += 1
+            record = self._decode(key, 0)
+            if len(records) >= self.max_size:
+                records.popitem(last=False)
+        else:
+            self.hits += 1
+        records[key] = record
+        return record
+    
+    
+    def decode_many(self, buf, count=None, offset=0):
+        """
+        Returns the list of <count> consecutive records (or as many as fit)
+        from <buf>, decoding only those not cached.
+        """
+        size = self.record_size
+        if count is None:
+            count = max(len(buf) - offset, 0)//size
+        return [self.decode(buf, offset + i*size) for i in range(count)]
+    
+    
+    def clear(self):
+        """
+        Empties the cache.
+        """
+        self._records.clear()
@@ -0,0 +1,125 @@
+"""
+Records the files each header includes so incremental builds regenerate only
+the headers affected by a change.
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import os
+import json
+
+
+def file_stamp(path):
+    """
+    Returns the [mtime, size] of a file or None if it does not exist.
+    """
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return [st.st_mtime, st.st_size]
+
+
+class DependencyGraph(object):
+    """
+    Records which files each header includes and which module was generated
+    from it so only the headers affected by a change need regenerating.
+    """
+    
+    def __init__(self, nodes=None):
+        """
+        Constructor
+        """
+        super(DependencyGraph, self).__init__()
+        # header -> {'stamp': [mtime, size], 'module': path, 'includes': {path: stamp}}
+        self.nodes = nodes or {}
+    
+    
+    @classmethod
+    def load(cls, path):
+        """
+        Loads a saved graph, returning an empty graph if there is none.
+        """
+        try:
+            with open(path, 'r') as f:
+                return cls(json.load(f))
+        except (IOError, ValueError):
+            return cls()
+    
+    
+    def save(self, path):
+        """
+        Saves the graph as json.
+        """
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            f.write(json.dumps(self.nodes, indent=1, sort_keys=True))
+        if os.path.exists(path):
+            os.remove(path)
+        os.rename(tmp_path, path)
+    
+    
+    def update(self, header, includes, module):
+        """
+        Records that <module> has just been generated from <header> which
+        includes the files at the paths <includes>.
+        """
+        self.nodes[header] = {
+            'stamp': file_stamp(header),
+            'module': module,
+            'includes': dict((path, file_stamp(path)) for path in includes),
+        }
+    
+    
+    def remove(self, header):
+        self.nodes.pop(header, None)
+    
+    
+    def is_stale(self, header):
+        """
+        Returns True if the header, its generated module or any of the files
+        it includes has changed since it was last generated.
+        """
+        node = self.nodes.get(header)
+        if node is None:
+            return True
+        if node['stamp'] != file_stamp(header):
+            return True
+        if not os.path.isfile(node['module']):
+            return True
+        for path, stamp in node['includes'].items():
+            if stamp != file_stamp(path):
+                return True
+        return False
+    
+    
+    def dependents(self, headers):
+        """
+        Returns the set of headers which (directly or indirectly) include
+        any of <headers>.
+        """
+        included_by = {}
+        for header, node in self.nodes.items():
+            for path in node['includes']:
+                included_by.setdefault(os.path.normcase(os.path.abspath(path)), []).append(header)
+        found = set()
+        pending = list(headers)
+        while pending:
+            path = os.path.normcase(os.path.abspath(pending.pop()))
+            for header in included_by.get(path, ()):
+                if header not in found:
+                    found.add(header)
+                    pending.append(header)
+        return found
+    
+    
+    def outdated(self, headers):
+        """
+        Returns those of <headers> which need to be regenerated, in order.
+        """
+        stale = [header for header in headers if self.is_stale(header)]
+        affected = set(stale) | self.dependents(stale)
+        return [header for header in headers if header in affected]
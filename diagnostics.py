@@ -0,0 +1,102 @@
+"""
+Structured reports of the problems found when parsing headers.
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import collections
+
+
+# The categories of the problems found when parsing a header.
+SKIPPED = 'skipped'
+DEFINE = 'define'
+MACRO = 'macro'
+INCLUDE = 'include'
+CONDITIONAL = 'conditional'
+
+Diagnostic = collections.namedtuple('Diagnostic', 'category message lineno filename')
+
+
+class Diagnostics(object):
+    """
+    The problems found when parsing a header (and the headers it includes),
+    gathered rather than written out one by one, eg.:
+    
+        parser = HeaderParser(source='api.h', output='api.py', errstream=None)
+        parser.parse()
+        if parser.diagnostics:
+            print(parser.diagnostics.summary())
+    """
+    
+    def __init__(self):
+        """
+        Constructor
+        """
+        super(Diagnostics, self).__init__()
+        self.entries = []
+    
+    
+    def __len__(self):
+        return len(self.entries)
+    
+    
+    def __iter__(self):
+        return iter(self.entries)
+    
+    
+    def add(self, category, message, lineno=None, filename=None):
+        """
+        Records a problem of the given category.
+        """
+        self.entries.append(Diagnostic(category, message, lineno, filename))
+    
+    
+    def counts(self):
+        """
+        Returns the dictionary of the number of problems of each category.
+        """
+        return dict(collections.Counter(entry.category for entry in self.entries))
+    
+    
+    def by_category(self, category):
+        """
+        Returns the list of the problems of one category.
+        """
+        return [entry for entry in self.entries if entry.category == category]
+    
+    
+    def summary(self):
+        """
+        Returns a one line summary of the counts, eg. "3 skipped, 1 define".
+        """
+        counts = self.counts()
+        if not counts:
+            return 'no problems'
+        return ', '.join('{} {}'.format(counts[category], category) for category in sorted(counts))
+    
+    
+    def format(self):
+        """
+        Returns the report of all the problems, one "ERROR:" entry each.
+        """
+        lines = []
+        for (category, message, lineno, filename) in self.entries:
+            where = ''
+            if filename:
+                where += '{}:'.format(filename)
+            if lineno is not None:
+                where += '{}:'.format(lineno)
+            lines.append('ERROR: {}{}{}\n'.format(where, ' ' if where else '', message.rstrip('\r\n\t ')))
+        return ''.join(lines)
+    
+    
+    def write(self, stream):
+        """
+        Writes the report to <stream> in one go.
+        """
+        if self.entries:
+            stream.write(self.format())
+            stream.flush()
@@ -0,0 +1,181 @@
+"""
+Decoding of mixed records told apart by a discriminator field.
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import struct
+import ctypes
+
+from .abstractstruct import *
+
+
+class Dispatcher(object):
+    """
+    Decodes a sequence of records of several struct classes told apart by a
+    discriminator field (eg. a message id) which every record has at the
+    same offset, eg.:
+    
+        dispatcher = Dispatcher.from_module(messages, messages.Header_t, 'id',
+                                            prefix='MSG_ID_', suffix='_t')
+        (records, offset) = dispatcher.decode_all(buf)
+    
+    The discriminator is read straight from the buffer and the record is
+    then decoded by its class in one step. Records with ids which are not
+    accepted are skipped by the size of their class, or by the value of
+    <length_field> for ids with no class, without being decoded.
+    """
+    
+    def __init__(self, header_cls, field, classes, accept=None, length_field=None, **kwargs):
+        """
+        Constructor
+        
+        <header_cls> is the class of the header common to all the records,
+        <field> the name of its discriminator field and <classes> a dictionary
+        of discriminator value to record class. Only the ids in <accept> are
+        decoded if it is given. <kwargs> are passed to the constructors of
+        the records (eg. endianness).
+        """
+        super(Dispatcher, self).__init__()
+        self.header_cls = header_cls
+        self.field = field
+        self.classes = dict(classes)
+        self.length_field = length_field
+        self._kwargs = kwargs
+        self.header_size = header_cls(**kwargs).packed_size()
+        (self._id_offset, self._id_struct) = _field_struct(header_cls, field, kwargs)
+        if length_field is None:
+            self._length_offset = self._length_struct = None
+        else:
+            (self._length_offset, self._length_struct) = _field_struct(header_cls, length_field, kwargs)
+        # Discriminator value -> (decode function or None to skip, record size).
+        self._table = {}
+        for (msg_id, cls) in self.classes.items():
+            size = cls(**kwargs).packed_size()
+            if accept is not None and msg_id not in accept:
+                self._table[msg_id] = (None, size)
+            else:
+                self._table[msg_id] = (_make_decoder(cls, kwargs), size)
+    
+    
+    @classmethod
+    def from_module(cls, module, header_cls, field, prefix, suffix='', **kwargs):
+        """
+        Creates a dispatcher from the #define constants of a generated module.
+        Each constant named <prefix><name> maps its value to the class named
+        <name><suffix> in the module, eg. MSG_ID_Status = 3 to Status_t with
+        the prefix 'MSG_ID_' and the suffix '_t'.
+        """
+        classes = {}
+        for name in dir(module):
+            if not name.startswith(prefix):
+                continue
+            record_cls = getattr(module, name[len(prefix):] + suffix, None)
+            if isinstance(record_cls, type) and issubclass(record_cls, AbstractStruct):
+                classes[getattr(module, name)] = record_cls
+        return cls(header_cls, field, classes, **kwargs)
+    
+    
+    def record_id(self, buf, offset=0):
+        """
+        Returns the discriminator of the record at <offset>.
+        """
+        return self._id_struct.unpack_from(buf, offset + self._id_offset)[0]
+    
+    
+    def _skip_size(self, msg_id, buf, offset):
+        if self._length_struct is None:
+            raise ValueError('Unknown id {} at offset {} and no length field to skip it by.'.format(
+                msg_id, offset))
+        size = self._length_struct.unpack_from(buf, offset + self._length_offset)[0]
+        if size <= 0:
+            raise ValueError('Invalid length {} of record {} at offset {}.'.format(size, msg_id, offset))
+        return size
+    
+    
+    def decode_from(self, buf, offset=0):
+        """
+        Returns the (record, size) of the record at <offset>. The record is
+        None if it was skipped.
+        """
+        msg_id = self._id_struct.unpack_from(buf, offset + self._id_offset)[0]
+        try:
+            (decode, size) = self._table[msg_id]
+        except KeyError:
+            return (None, self._skip_size(msg_id, buf, offset))
+        if decode is None:
+            return (None, size)
+        return (decode(buf, offset), size)
+    
+    
+    def decode_all(self, buf, offset=0, end=None):
+        """
+        Decodes the records from <offset> up to <end> (or the end of the
+        buffer) which are complete. Returns the list of decoded records and
+        the offset of the first byte not consumed.
+        """
+        if end is None:
+            end = len(buf)
+        records = []
+        append = records.append
+        table = self._table
+        unpack_id = self._id_struct.unpack_from
+        id_offset = self._id_offset
+        last = end - self.header_size
+        while offset <= last:
+            msg_id = unpack_id(buf, offset + id_offset)[0]
+            try:
+                (decode, size) = table[msg_id]
+            except KeyError:
+                decode = None
+                size = self._skip_size(msg_id, buf, offset)
+            if offset + size > end:
+                break
+            if decode is not None:
+                append(decode(buf, offset))
+            offset += size
+        return (records, offset)
+
+
+def _field_struct(cls, field, kwargs):
+    """
+    Returns the (offset, struct.Struct) for reading a scalar field of <cls>
+    straight from a buffer.
+    """
+    fields = getattr(cls, '_fields_', ())
+    if any(f[0] == field and isinstance(f[1], type) and issubclass(f[1], ctypes._SimpleCData) for f in fields):
+        field_type = dict((f[0], f[1]) for f in fields)[field]
+        return (getattr(cls, field).offset,
+                struct.Struct(str(_ctypes_endianness(cls) + field_type._type_)))
+    layout = getattr(cls(**kwargs), '_layout', None)
+    if layout is None or field not in cls._scalar_fields:
+        raise ValueError('{} has no scalar field {}.'.format(cls.__name__, field))
+    return (layout.offsets[field], layout.structs[field])
+
+
+def _ctypes_endianness(cls):
+    for (base, endianness) in ((ctypes.BigEndianStructure, ENDIANNESS_BIG),
+                               (ctypes.LittleEndianStructure, ENDIANNESS_LITTLE)):
+        if base is not ctypes.Structure and issubclass(cls, base):
+            return endianness
+    return ENDIANNESS_NATIVE
+
+
+def _make_decoder(cls, kwargs):
+    """
+    Returns a function which decodes an instance of <cls> at an offset in a buffer.
+    """
+    if hasattr(cls, 'from_buffer_copy'):
+        def decode(buf, offset):
+            record = cls.from_buffer_copy(buf, offset)
+            record.freeze()
+            return record
+    else:
+        def decode(buf, offset):
+            record = cls(**kwargs)
+            record.deserialise_from(buf, offset)
+            return record
+    return decode
@@ -0,0 +1,214 @@
+"""
+An on-disk cache of the python modules generated from c header files.
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import os
+import sys
+import errno
+import marshal
+import hashlib
+
+try:
+    from importlib.util import MAGIC_NUMBER as _MAGIC
+except ImportError:
+    # Python 2
+    import imp
+    _MAGIC = imp.get_magic()
+
+
+# Bump whenever the generated code changes in a way which invalidates old entries.
+CACHE_FORMAT_VERSION = 1
+
+DEFAULT_MAX_SIZE = 64*1024*1024
+
+_SOURCE_EXT = '.py'
+_CODE_EXT = '.pyc'
+
+
+class HeaderCache(object):
+    """
+    An on-disk cache of the python modules generated from c header files.
+    
+    Entries are keyed by a hash of the header contents, the contents of the
+    resolved include files and the writer options so a changed header never
+    loads a stale module. Both the generated source and its compiled byte
+    code are stored, the byte code being used whenever it matches the
+    running interpreter.
+    """
+    
+    def __init__(self, cache_dir, max_size=DEFAULT_MAX_SIZE):
+        """
+        Constructor
+        """
+        super(HeaderCache, self).__init__()
+        self.cache_dir = cache_dir
+        self.max_size = max_size
+        try:
+            os.makedirs(cache_dir)
+        except OSError as e:
+            if e.errno != errno.EEXIST:
+                raise
+    
+    
+    def make_key(self, header_text, include_files=(), writer_cls=None, options=None):
+        """
+        Returns the hex digest identifying one generated module.
+        """
+        h = hashlib.sha1()
+        h.update('{}\0{}\0'.format(CACHE_FORMAT_VERSION, sys.version_info[:2]).encode('utf-8'))
+        h.update(_as_bytes(header_text))
+        for filename in include_files:
+            h.update(b'\0' + _as_bytes(filename) + b'\0')
+            try:
+                with open(filename, 'rb') as f:
+                    h.update(f.read())
+            except IOError:
+                pass
+        if writer_cls is not None:
+            h.update('\0{}.{}'.format(writer_cls.__module__, writer_cls.__name__).encode('utf-8'))
+        for name, val in sorted((options or {}).items()):
+            if isinstance(val, type):
+                val = '{}.{}'.format(val.__module__, val.__name__)
+            h.update('\0{}={!r}'.format(name, val).encode('utf-8'))
+        return h.hexdigest()
+    
+    
+    def _path(self, asname, key, ext):
+        return os.path.join(self.cache_dir, '{}.{}{}'.format(asname, key, ext))
+    
+    
+    def load(self, asname, key, module):
+        """
+        Executes the cached module into <module>. Returns False on a miss.
+        """
+        code_path = self._path(asname, key, _CODE_EXT)
+        source_path = self._path(asname, key, _SOURCE_EXT)
+        code = None
+        try:
+            with open(code_path, 'rb') as f:
+                if f.read(len(_MAGIC)) == _MAGIC:
+                    code = marshal.loads(f.read())
+        except (IOError, EOFError, ValueError, TypeError):
+            code = None
+        if code is None:
+            # Byte code missing or from another interpreter - fall back on the source.
+            try:
+                with open(source_path, 'r') as f:
+                    source = f.read()
+            except IOError:
+                return False
+            code = compile(source, source_path, 'exec')
+            self._write_code(code_path, code)
+        self._touch(code_path)
+        self._touch(source_path)
+        exec(code, module.__dict__)
+        return True
+    
+    
+    def store(self, asname, key, source):
+        """
+        Adds a generated module to the cache, removing stale entries of the
+        same name and evicting old entries if the cache is too large.
+        Returns the compiled code object.
+        """
+        source_path = self._path(asname, key, _SOURCE_EXT)
+        code = compile(source, source_path, 'exec')
+        self.remove_stale(asname, key)
+        _atomic_write(source_path, _as_bytes(source))
+        self._write_code(self._path(asname, key, _CODE_EXT), code)
+        self.evict(keep='{}.{}.'.format(asname, key))
+        return code
+    
+    
+    def remove_stale(self, asname, key):
+        """
+        Removes the entries for <asname> which are not for <key>.
+        """
+        for name in os.listdir(self.cache_dir):
+            (stem, ext) = os.path.splitext(name)
+            if ext not in (_SOURCE_EXT, _CODE_EXT):
+                # Temporary files of entries being written.
+                continue
+            # Dotted names such as pkg.msgs must not match the entries of pkg.
+            (entry_asname, sep, entry_key) = stem.rpartition('.')
+            if entry_asname == asname and entry_key != key:
+                _remove(os.path.join(self.cache_dir, name))
+    
+    
+    def evict(self, keep=None):
+        """
+        Removes the least recently used entries until the cache is within
+        its size limit. Entries whose file names start with <keep> are spared.
+        """
+        if self.max_size is None:
+            return
+        entries = []
+        total = 0
+        for name in os.listdir(self.cache_dir):
+            if keep and name.startswith(keep):
+                continue
+            path = os.path.join(self.cache_dir, name)
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            entries.append((st.st_mtime, st.st_size, path))
+            total += st.st_size
+        entries.sort()
+        for (mtime, size, path) in entries:
+            if total <= self.max_size:
+                break
+            _remove(path)
+            total -= size
+    
+    
+    def clear(self):
+        """
+        Removes all the entries in the cache.
+        """
+        for name in os.listdir(self.cache_dir):
+            _remove(os.path.join(self.cache_dir, name))
+    
+    
+    def _write_code(self, path, code):
+        _atomic_write(path, _MAGIC + marshal.dumps(code))
+    
+    
+    def _touch(self, path):
+        try:
+            os.utime(path, None)
+        except OSError:
+            pass
+
+
+def _as_bytes(s):
+    if isinstance(s, bytes):
+        return s
+    return s.encode('utf-8')
+
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+def _atomic_write(path, data):
+    """
+    Writes the file in one go so other processes never see a partial entry.
+    """
+    tmp_path = '{}.{}.tmp'.format(path, os.getpid())
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    try:
+        os.rename(tmp_path, path)
+    except OSError:
+        # Windows does not allow renaming over an existing file.
+        _remove(path)
+        os.rename(tmp_path, path)
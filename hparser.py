@@ -14,16 +14,21 @@ import re
 
 if __name__ == "__main__" and __package__ is None:
     from h2pyex import *
+    from h2pyex.constexpr import evaluate, evaluate_condition, format_constant
+    from h2pyex.diagnostics import *
 else:
     from .support import *
     from .writer import Writer
     from .writerplus import WriterPlus
     from .writer_ctypes import WriterCTypes
     from .abstractstruct import ENDIANNESS_NETWORK
+    from .headercache import HeaderCache
+    from .constexpr import evaluate, evaluate_condition, format_constant
+    from .diagnostics import *
 
 
 try:
-    SEARCH_DIRS = os.environ['include'].split(';')
+    searchdirs = os.environ['include'].split(';')
 except KeyError:
     try:
         searchdirs=os.environ['INCLUDE'].split(';')
@@ -47,25 +52,111 @@ except KeyError:
 
 
 
-def import_cheader(filename, asname=None, add_to_sys_modules=True, **kwargs):
+def _wrap_hex(match):
+    """
+    Replaces a hex constant too large for an int by its negative value.
+    """
+    val = int(match.group(1), 16)
+    if val > sys.maxsize:
+        return "(" + str(val - 2*(sys.maxsize + 1)) + ")"
+    return match.group(0)
+
+
+def parse_defines(defines):
+    """
+    Returns the dictionary of the macros given either as a dictionary or as
+    a list of -D style "NAME" or "NAME=VALUE" strings. A macro without a
+    value is 1 and a value which is not a constant is kept as a string.
+    """
+    if defines is None:
+        return {}
+    if isinstance(defines, dict):
+        return dict(defines)
+    result = {}
+    for define in defines:
+        (name, sep, text) = define.partition('=')
+        name = name.strip()
+        if not sep:
+            result[name] = 1
+            continue
+        try:
+            result[name] = evaluate(text, result)
+        except NotConstantException:
+            result[name] = text.strip()
+    return result
+
+
+def find_include(filename, relative_to=None):
+    """
+    Returns the path of an included file or None if it cannot be found.
+    """
+    dirs = ([relative_to] if relative_to else []) + searchdirs
+    for dir in dirs:
+        path = os.path.join(dir, filename)
+        if os.path.isfile(path):
+            return path
+    return None
+
+
+def resolve_includes(text, relative_to=None, _found=None):
+    """
+    Returns the paths of the files (recursively) included by the c source <text>.
+    """
+    found = [] if _found is None else _found
+    for filename in HeaderParser.REGEX_FIND_INCLUDES.findall(text):
+        path = find_include(filename, relative_to)
+        if path and path not in found:
+            found.append(path)
+            try:
+                with open(path, 'r') as f:
+                    resolve_includes(f.read(), os.path.dirname(path), found)
+            except IOError:
+                pass
+    return found
+
+
+def import_cheader(filename, asname=None, add_to_sys_modules=True, cache=None, **kwargs):
     """
     Imports a c header file as a python module.
+    
+    If <cache> is a directory or HeaderCache the generated module is stored
+    there and later imports of an unchanged header skip the parsing.
     """
-    import imp
+    import types
     from io import StringIO
     out = StringIO()
     if not asname:
         assert os.path.isfile(filename)
         asname = os.path.splitext(os.path.split(filename)[1])[0]
-    else:
-        if filename.count('\n')>0:
-            filename = StringIO(filename)
-    module = imp.new_module(asname)
+    module = types.ModuleType(str(asname))
     module.__dict__['__doc__'] = 'Auto-generated python module from h2pyex.'
+    
+    key = None
+    if cache is not None:
+        if isstr(cache):
+            cache = HeaderCache(cache)
+        if filename.count('\n')>0:
+            text, relative_to = filename, None
+        else:
+            with open(filename, 'r') as f:
+                text = f.read()
+            relative_to = os.path.dirname(os.path.abspath(filename))
+        key = cache.make_key(text, resolve_includes(text, relative_to),
+                             kwargs.get('writer_cls', WriterCTypes), kwargs)
+        if cache.load(asname, key, module):
+            if add_to_sys_modules:
+                sys.modules[asname] = module
+            return module
+    
+    if filename.count('\n')>0:
+        filename = StringIO(filename)
     hr = HeaderParser(
         source=filename, output=out, errstream=None, **kwargs)
     hr.parse()
-    exec(out.getvalue(), module.__dict__)
+    if key is not None:
+        exec(cache.store(asname, key, out.getvalue()), module.__dict__)
+    else:
+        exec(out.getvalue(), module.__dict__)
     if add_to_sys_modules:
         sys.modules[asname] = module
     return module
@@ -79,18 +170,34 @@ class HeaderParser(object):
     Class for parsing a c header file.
     """
     
-    def __init__(self, source=None, output=None, writer = None, env={}, ignores=None, default_endianness=ENDIANNESS_NETWORK, writer_cls=WriterCTypes, **kwargs):
+    def __init__(self, source=None, output=None, writer = None, env=None, ignores=None, default_endianness=ENDIANNESS_NETWORK, writer_cls=WriterCTypes, defines=None, **kwargs):
         """
         Constructor
+        
+        <defines> are the macros the header is compiled with, as for
+        parse_defines(). They and the header's own #defines decide which
+        #if/#ifdef regions are parsed, self.defines holding every macro
+        defined so far. Other names in <env> are not macros.
+        
+        The problems found are gathered in self.diagnostics (a Diagnostics
+        which may be passed in as <diagnostics>) and reported to <errstream>
+        once the parsing is done.
+        
+        System (<...>) includes are only parsed into the output if
+        <expand_system_includes> is set.
         """
         super(HeaderParser, self).__init__()
         
-        if isstr(source):
-            self.source = open(source,'r')
-        else:
-            self.source = source
+        self.use_mmap = kwargs.pop('use_mmap', False)
+        self.expand_system_includes = kwargs.pop('expand_system_includes', False)
+        self._set_source(source)
         
         self.errstream = kwargs.pop('errstream', sys.stderr)
+        self.diagnostics = kwargs.pop('diagnostics', None)
+        if self.diagnostics is None:
+            self.diagnostics = Diagnostics()
+        # The name of an included file the diagnostics refer to.
+        self.filename = kwargs.pop('filename', None)
         
         
         if writer:
@@ -99,7 +206,8 @@ class HeaderParser(object):
         else:
             self.writer = writer_cls(output=output, default_endianness=default_endianness, **kwargs)
         
-        self.env = env
+        self.env = {} if env is None else env
+        self.defines = parse_defines(defines)
         self.struct_format = {}
         
         #for k,v in TYPE_2_DEFAULTS.iteritems():
@@ -107,6 +215,8 @@ class HeaderParser(object):
         
         self.filedict = {}
         self.importable = {}
+        # The names of the files included by the source in order.
+        self.includes = []
         
         #######################################################################
         #######################################################################
@@ -125,12 +235,28 @@ class HeaderParser(object):
         
         self.was_inside_comment = False
         self.was_inside_code = False
+        
+        # For each open #if, whether one of its branches has been taken.
+        self.conditionals = []
     
     
-    def _put_error(self, msg):
-        if not self.errstream is None:
-            self.errstream.write('ERROR: ' + msg + '\n')
-            self.errstream.flush()
+    def _set_source(self, source):
+        """
+        Sets the source to parse, opening it if it is a file name. Files
+        opened here are closed by parse().
+        """
+        self._owns_source = isstr(source)
+        if isstr(source):
+            if self.use_mmap:
+                self.source = MMapSource(source)
+            else:
+                self.source = open(source,'r')
+        else:
+            self.source = source
+        self._read_logical_line = getattr(self.source, 'read_logical_line', None)
+    
+    def _put_error(self, msg, category, lineno=None):
+        self.diagnostics.add(category, msg, lineno, self.filename)
     
     def next_line(self, goble_lines=True):
         """
@@ -140,7 +266,7 @@ class HeaderParser(object):
         
         cleaned = clean(self.current_codeline)
         if cleaned:
-            self._put_error('Skipped "{}", line {}.'.format(cleaned, self.current_lineno))
+            self._put_error('Skipped "{}".'.format(cleaned), SKIPPED, self.current_lineno)
         
         #if self.current_comment:
         #    sys.stderr.write('WARNING: Skipping comment "%s" on line %d.\n' % (self.current_comment, self.current_lineno))
@@ -163,20 +289,27 @@ class HeaderParser(object):
             self.current_comment = ''
         
         while not self.current_codeline or ( ( self.was_inside_comment or self.was_inside_code) and not self.last_codeline):
-            lineStr = self.source.readline()
-            if not lineStr:
-                return None
-            self._lineno += 1
-            
-            if goble_lines:
-                while lineStr[-2:] == '\\\n':
-                    next_line = self.source.readline()
-                    if not next_line:
-                        raise UnexpectedException('End of file after line continuation.')
-                    self._lineno += 1
-                    lineStr += next_line
-            elif not clean(lineStr):
-                return ''
+            if goble_lines and self._read_logical_line:
+                # The source can return the line with its continuations in one go.
+                (lineStr, count) = self._read_logical_line()
+                if not lineStr:
+                    return None
+                self._lineno += count
+            else:
+                lineStr = self.source.readline()
+                if not lineStr:
+                    return None
+                self._lineno += 1
+                
+                if goble_lines:
+                    while lineStr[-2:] == '\\\n':
+                        next_line = self.source.readline()
+                        if not next_line:
+                            raise UnexpectedException('End of file after line continuation.')
+                        self._lineno += 1
+                        lineStr += next_line
+                elif not clean(lineStr):
+                    return ''
             
             (code, comment, self.was_inside_comment, self.was_inside_code) = \
                 process_line_for_comments(lineStr, self.was_inside_comment, self.was_inside_code)
@@ -223,51 +356,55 @@ class HeaderParser(object):
         """
         body = self.REGEX_CHAR.sub("ord('\\1')", body)
         body = self.REGEX_U.sub(r"\1\2", body)
-        start = 0
-        UMAX = 2 * (sys.maxint + 1)
-        while 1:
-            m = self.REGEX_HEX.search(body, start)
-            if not m: break
-            s, e = m.span()
-            val = long(body[slice(*m.span(1))], 16)
-            if val > sys.maxint:
-                val -= UMAX
-                body = body[:s] + "(" + str(val) + ")" + body[e:]
-            start = s + 1
-        return body
-    
-    REGEXT_DETECT_INCLUDE = re.compile('^[\t ]*#[\t ]*include[\t ]+<([a-zA-Z0-9_/\.]+)')
+        return self.REGEX_HEX.sub(_wrap_hex, body)
+    
+    # Note that process_line_for_comments() has already tripled the quotes of c-strings.
+    REGEXT_DETECT_INCLUDE = re.compile('^[\t ]*#[\t ]*include[\t ]+(<|"+)([a-zA-Z0-9_/\.]+)(>|"+)')
+    REGEX_FIND_INCLUDES = re.compile(r'^[\t ]*#[\t ]*include[\t ]+[<"]([a-zA-Z0-9_/\.]+)[>"]', re.MULTILINE)
     def parse_include(self):
         """
         This is a code snippet extracted from h2py.
+        
+        Every include is recorded in self.includes. System (<...>) includes
+        are parsed into the output if self.expand_system_includes is set,
+        local ("...") includes are expected to be generated as modules of
+        their own.
         """
         match = self.REGEXT_DETECT_INCLUDE.match(self.current_codeline)
         if match:
-            regs = match.regs
-            a, b = regs[1]
-            filename = self.current_codeline[a:b]
-            if importable.has_key(filename):
-                self.writer.putln('from %s import *\n' % importable[filename])
-            elif not filedict.has_key(filename):
-                filedict[filename] = None
-                inclfp = None
+            filename = match.group(2)
+            self.includes.append(filename)
+            if filename in self.importable:
+                self.writer.putln('from %s import *\n' % self.importable[filename])
+            elif match.group(1) == '<' and self.expand_system_includes and filename not in self.filedict:
+                self.filedict[filename] = None
+                inclpath = None
                 for dir in searchdirs:
-                    try:
-                        inclfp = open(dir + '/' + filename)
+                    if os.path.isfile(dir + '/' + filename):
+                        inclpath = dir + '/' + filename
                         break
-                    except IOError:
-                        pass
-                if inclfp:
-                    self.stderr.write('\n' +
-                            '##########################################################################################' +
-                            ('# Included from %s\n' % filename) +
-                            '##########################################################################################' )
-                    HeaderParser(inclfp, writer=self.writer, env=self.env).parse()
-                    self.current_codeline = ''
-                    return True
+                if inclpath:
+                    # The parser opens the file and closes it once parsed.
+                    parser = HeaderParser(inclpath, writer=self.writer, env=self.env, errstream=self.errstream,
+                                          diagnostics=self.diagnostics, filename=filename,
+                                          expand_system_includes=True, use_mmap=self.use_mmap)
+                    # The macros the include defines or undefines also apply to the rest of this file.
+                    parser.defines = self.defines
+                    parser.parse(finish=False)
                 else:
-                    self._put_error('Warning - could not find file %s\n' %
-                                     filename)
+                    self._put_error('Could not find file {}.'.format(filename), INCLUDE, self.current_lineno)
+            self.current_codeline = ''
+            return True
+    
+    REGEX_DEFINE_NAME = re.compile(r'[\t ]*#[\t ]*define[\t ]+([a-zA-Z_][a-zA-Z0-9_]*)')
+    def note_define(self):
+        """
+        Records the macro of a #define in self.defines, whether or not its
+        body can be converted. parse_define() gives the constants their values.
+        """
+        match = self.REGEX_DEFINE_NAME.match(self.current_codeline)
+        if match:
+            self.defines[match.group(1)] = None
     
     REGEX_DETECT_DEFINE = re.compile(r'^[\t ]*#[\t ]*define[\t ]+([a-zA-Z0-9_]+)([\t ]+|$)')
     def parse_define(self):
@@ -278,19 +415,30 @@ class HeaderParser(object):
         if match:
             name = match.group(1)
             body = self.current_codeline[match.end():]
-            body = self.pytify(body)
-            #Need to support empty defines used as compile directives
-            if not clean(body):
-                body = 'None'
-            stmt = '%s = %s' % (name, body.strip())
             try:
-                exec(stmt, self.env)
-            except:
-                self._put_error("Unable to evaluate: '%s'\n  From line %d:\n\t%s\n"  % (stmt, self.current_lineno, self.current_codeline))
+                # Constant expressions are folded into a literal, only other
+                # bodies are converted to python and exec'd.
+                value = evaluate(body, self.env)
+                stmt = '%s = %s' % (name, format_constant(value))
+            except NotConstantException:
+                body = self.pytify(body)
+                #Need to support empty defines used as compile directives
+                if not clean(body):
+                    body = 'None'
+                stmt = '%s = %s' % (name, body.strip())
+                try:
+                    exec(stmt, self.env)
+                except:
+                    self._put_error("Unable to evaluate '{}' from '{}'.".format(stmt, self.current_codeline),
+                                    DEFINE, self.current_lineno)
+                    return None
+                value = self.env[name]
             else:
-                self.writer.putln(stmt)
-                self.current_codeline = ''
-                return True
+                self.env[name] = value
+            self.defines[name] = value
+            self.writer.putln(stmt)
+            self.current_codeline = ''
+            return True
     
     REGEX_DETECT_MACRO = re.compile(
          r'^[\t ]*#[\t ]*define[\t ]+'
@@ -306,9 +454,9 @@ class HeaderParser(object):
             body = self.pytify(body)
             stmt = "def %s(%s): return %s\n" % (macro, arg, body)
             try:
-                exec(pythonCode, self.env)
+                exec(stmt, self.env)
             except:
-                self._put_error(traceback.format_exc())
+                self._put_error(traceback.format_exc(), MACRO, self.current_lineno)
                 raise ParseException("Could not evaluate macro '%s'." % (stmt), self.current_lineno)
             else:
                 self.writer.putln(stmt)
@@ -316,6 +464,159 @@ class HeaderParser(object):
                 return True
     
     
+    REGEX_DETECT_CONDITIONAL = re.compile(r'[\t ]*#[\t ]*(ifdef|ifndef|if|elif|else|endif)\b[\t ]*(.*)', re.DOTALL)
+    REGEX_DETECT_UNDEF = re.compile(r'[\t ]*#[\t ]*undef[\t ]+([a-zA-Z_][a-zA-Z0-9_]*)[\t ]*$')
+    def parse_conditional(self):
+        """
+        Handles an #if, #ifdef, #ifndef, #elif, #else or #endif met in an
+        active region. Once a region turns out to be inactive its lines are
+        skipped up to the directive ending it.
+        """
+        match = self.REGEX_DETECT_CONDITIONAL.match(self.current_codeline)
+        if not match:
+            return None
+        (directive, rest) = match.groups()
+        self.current_codeline = ''
+        if directive in ('if', 'ifdef', 'ifndef'):
+            active = self._condition(directive, rest)
+            self.conditionals.append(active)
+        elif not self.conditionals:
+            raise ParseException('#{} without #if.'.format(directive), self.current_lineno)
+        elif directive == 'endif':
+            self.conditionals.pop()
+            return True
+        else:
+            # The branch before this #elif or #else was the one taken.
+            self._join_continuations(rest)
+            active = False
+        if not active:
+            self._skip_inactive()
+        return True
+    
+    
+    def parse_undef(self):
+        """
+        Forgets a macro for the conditionals which follow.
+        """
+        match = self.REGEX_DETECT_UNDEF.match(self.current_codeline)
+        if match:
+            name = match.group(1)
+            if name in self.defines:
+                del self.defines[name]
+                # Only macros are dropped from env, not the classes and helpers it also holds.
+                self.env.pop(name, None)
+            self.current_codeline = ''
+            return True
+    
+    
+    def _condition(self, directive, rest):
+        """
+        Returns whether the condition of an #if, #ifdef, #ifndef or #elif holds.
+        """
+        rest = self._join_continuations(rest)
+        if directive == 'ifdef' or directive == 'ifndef':
+            name = clean(rest)
+            defined = name in self.defines
+            return defined if directive == 'ifdef' else not defined
+        try:
+            return evaluate_condition(rest, (self.defines,))
+        except NotConstantException as e:
+            self._put_error('Cannot evaluate #{} {} ({}), treating it as false.'.format(directive, clean(rest), e),
+                            CONDITIONAL, self._lineno)
+            return False
+    
+    
+    def _next_raw_line(self):
+        """
+        Returns the next line of the source (or of the line read ahead by
+        next_line()) or '' at the end of the file.
+        """
+        if self.last_codeline is not None:
+            line = self.last_codeline
+            self.last_codeline = None
+            self.last_comment = ''
+            return line
+        line = self.source.readline()
+        if line:
+            self._lineno += 1
+        return line
+    
+    
+    def _join_continuations(self, text):
+        """
+        Returns the directive text <text>, which has had its comments
+        removed, joined with its continuation lines.
+        """
+        code = clean(text)
+        while code.endswith('\\'):
+            line = self._next_raw_line()
+            if not line:
+                raise UnexpectedException('End of file after line continuation.')
+            (more, comment, self.was_inside_comment, self.was_inside_code) = \
+                process_line_for_comments(line, self.was_inside_comment)
+            code = code[:-1] + ' ' + clean(more)
+        return code
+    
+    
+    def _skip_inactive(self):
+        """
+        Skips the lines of an inactive region without parsing them, only
+        looking for the conditional directives (and block comments which may
+        hide them) to find the #elif, #else or #endif ending the region.
+        Returns once a branch becomes active or the #endif is found.
+        """
+        match_directive = self.REGEX_DETECT_CONDITIONAL.match
+        readline = self.source.readline
+        # A line read ahead by next_line() has had its comments removed.
+        pending = self.last_codeline
+        self.last_codeline = None
+        self.last_comment = ''
+        inside_comment = self.was_inside_comment
+        start_lineno = self._lineno
+        depth = 0
+        while True:
+            if pending:
+                (line, pending, uncommented) = (pending, None, True)
+            else:
+                line = readline()
+                if not line:
+                    raise UnexpectedException('End of file in the inactive #if region from line {}.'.format(start_lineno))
+                self._lineno += 1
+                uncommented = inside_comment or '/*' in line
+                if uncommented:
+                    (line, comment, inside_comment, inside_string) = process_line_for_comments(line, inside_comment)
+            match = match_directive(line)
+            if match is None:
+                continue
+            directive = match.group(1)
+            if directive in ('if', 'ifdef', 'ifndef'):
+                depth += 1
+            elif depth:
+                if directive == 'endif':
+                    depth -= 1
+            elif directive == 'endif':
+                self.conditionals.pop()
+                break
+            elif self.conditionals[-1]:
+                # A branch has been taken already.
+                continue
+            elif directive == 'else':
+                self.conditionals[-1] = True
+                break
+            else:
+                if not uncommented:
+                    (line, comment, inside_comment, inside_string) = process_line_for_comments(line, inside_comment)
+                    match = match_directive(line)
+                self.was_inside_comment = inside_comment
+                active = self._condition(directive, match.group(2))
+                inside_comment = self.was_inside_comment
+                if active:
+                    self.conditionals[-1] = True
+                    break
+        self.was_inside_comment = inside_comment
+        self.was_inside_code = False
+    
+    
     REGEX_DETECT_TYPDEF = re.compile(r'[\t ]*(typedef)[\t ]*([^\s.]*)[\t ]*([^\s^\[^\].]*)(\[[a-zA-Z0-9_\(\)]+\])*;')
     def parse_typedef(self):
         """
@@ -362,7 +663,8 @@ class HeaderParser(object):
             m = self.REGEX_DETECT_STRUCTEND.match(self.current_codeline)
             while not m:
                 self.current_codeline = clean(self.current_codeline)
-                if self.current_codeline:
+                # The fields of the inactive regions of conditionals are skipped.
+                if self.current_codeline and not self.parse_conditional():
                     inner_match = self.REGEX_DETECT_FIELD.match(self.current_codeline)
                     if inner_match:
                         typename = inner_match.group(1)
@@ -429,50 +731,70 @@ class HeaderParser(object):
         self.writer.putln(expr.rstrip('\r\n\t '))
     
     
-    def parse(self, source=None):
+    REGEX_LEADING_TOKEN = re.compile(r'[\t ]*(#[\t ]*[a-zA-Z_]+|[a-zA-Z_][a-zA-Z0-9_]*)')
+    CONDITIONAL_TOKENS = frozenset(['#if', '#ifdef', '#ifndef', '#elif', '#else', '#endif'])
+    
+    def parse(self, source=None, finish=True):
         """
         Parses the input source and generates the python code.
+        
+        Unless <finish> is cleared (as it is for included files) the writer
+        then writes out the code and the diagnostics are reported.
         """
         if source:
-            if isstr(source):
-                self.source = open(source,'r')
-            else:
-                self.source = source
+            self._set_source(source)
         assert self.source, "No source!"
-        while self.next_line(goble_lines=False) is not None:
-            if self.current_codeline:
-                res = self.parse_include()
-                if res:
-                    continue
-                res = self.parse_define()
-                if res:
-                    continue
-                res = self.parse_macro()
-                if res:
-                    continue
-                res = self.parse_struct()
-                if res:
-                    self.writer.write_struct_class(*res)
-                    continue
-                res = self.parse_typedef()
-                if res:
-                    continue
-                self._put_error('Skipped line %d:\n\t%s\n' % (self.current_lineno, self.current_codeline.rstrip('\r\n\t ')))
-                self.current_codeline = ''
-            
-            elif self.current_comment:
-                self.writer._put_comment(self.current_comment + '\n')
-                self.writer.output.flush()
-                self.current_comment = ''
-            else:
-                self.writer.putln()
-                self.current_codeline = ''
-        self.writer.output.flush()
-        if self.errstream:
-            self.errstream.flush()
+        try:
+            while self.next_line(goble_lines=False) is not None:
+                if self.current_codeline:
+                    # Only try the handlers which can match the line's leading token.
+                    m = self.REGEX_LEADING_TOKEN.match(self.current_codeline)
+                    token = m and m.group(1).replace(' ', '').replace('\t', '')
+                    res = None
+                    if token == '#include':
+                        res = self.parse_include()
+                    elif token == '#define':
+                        self.note_define()
+                        res = self.parse_define() or self.parse_macro()
+                    elif token in self.CONDITIONAL_TOKENS:
+                        res = self.parse_conditional()
+                    elif token == '#undef':
+                        res = self.parse_undef()
+                    elif token == 'typedef' or token == 'struct':
+                        res = self.parse_struct()
+                        if res:
+                            self.writer.write_struct_class(*res)
+                            continue
+                        if token == 'typedef':
+                            res = self.parse_typedef()
+                    if res:
+                        continue
+                    self._put_error('Skipped "{}".'.format(self.current_codeline.rstrip('\r\n\t ')), SKIPPED, self.current_lineno)
+                    self.current_codeline = ''
+                
+                elif self.current_comment:
+                    self.writer._put_comment(self.current_comment + '\n')
+                    self.current_comment = ''
+                else:
+                    self.writer.putln()
+                    self.current_codeline = ''
+            if self.conditionals:
+                raise UnexpectedException('End of file with {} unterminated #if.'.format(len(self.conditionals)))
+            if finish:
+                self.writer.finish()
+        finally:
+            if self._owns_source:
+                self.source.close()
+                self._owns_source = False
+            if finish and self.errstream is not None:
+                self.diagnostics.write(self.errstream)
 
 
 if __name__ == '__main__':
+    if len(sys.argv) > 1:
+        from h2pyex.batch import main
+        sys.exit(main())
+    
     header_file = os.path.join(os.path.dirname(__file__), r'sample.h')
     output_file = os.path.join(os.path.dirname(__file__), r'sample.py');
     
@@ -0,0 +1,212 @@
+"""
+Records decoded lazily, field by field, from their source buffer.
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+from .abstractstruct import AbstractStruct
+
+
+_SCALAR = 0
+_ARRAY = 1
+_NESTED = 2
+_NESTED_ARRAY = 3
+
+
+class _LazySpec(object):
+    """
+    The offsets and struct formats of the fields of a class used by its
+    LazyRecords, worked out once per class and constructor arguments.
+    """
+    
+    def __init__(self, cls, kwargs):
+        """
+        Constructor
+        """
+        super(_LazySpec, self).__init__()
+        proto = cls(**kwargs)
+        layout = getattr(proto, '_layout', None)
+        if layout is None:
+            raise TypeError('{} has no struct layout to decode lazily.'.format(cls.__name__))
+        self.size = layout.packed_size
+        # name -> (kind, offset, struct, dimensions, nested class, nested size)
+        self.fields = {}
+        for (name, field_format, count) in cls._layout_fields:
+            field_struct = layout.structs[name]
+            template = getattr(proto, name)
+            dimensions = []
+            while isinstance(template, list):
+                dimensions.append(len(template))
+                template = template[0] if template else None
+            is_struct = isinstance(field_format, type)
+            # A single char array is read and written as one string.
+            if name in cls._scalar_fields or (count == 1 and not is_struct and field_format.endswith('s')):
+                kind = _SCALAR
+            elif not is_struct:
+                kind = _ARRAY
+            elif dimensions:
+                kind = _NESTED_ARRAY
+            else:
+                kind = _NESTED
+            nested_size = field_struct.size//count
+            self.fields[name] = (kind, layout.offsets[name], field_struct, tuple(dimensions),
+                                 field_format if kind >= _NESTED else None, nested_size)
+
+
+_specs = {}
+
+
+def _get_spec(cls, kwargs):
+    key = (cls, tuple(sorted(kwargs.items())))
+    try:
+        return _specs[key]
+    except KeyError:
+        spec = _specs[key] = _LazySpec(cls, kwargs)
+        return spec
+
+
+class LazyRecord(object):
+    """
+    A read/write proxy for a record of a generated struct class which stays
+    in its source buffer. Each field is decoded from its precomputed offset
+    the first time it is read and then cached. Nested structs are returned
+    as LazyRecords in turn and a char array as a single string.
+    
+    serialise() copies the record from the buffer, patching in only the
+    fields which were assigned and those arrays and nested structs which
+    were read (as they may have been changed in place). flush() patches the
+    same fields straight into the buffer if it is writable.
+    """
+    
+    __slots__ = ('_cls', '_buf', '_offset', '_kwargs', '_spec', '_cache', '_dirty')
+    
+    def __init__(self, cls, buf, offset=0, **kwargs):
+        """
+        Constructor
+        
+        <kwargs> are the constructor arguments of the class (eg. endianness).
+        """
+        spec = _get_spec(cls, kwargs)
+        if offset + spec.size > len(buf):
+            raise ValueError('Buffer of {} bytes is too small for a {} at offset {}.'.format(
+                len(buf), cls.__name__, offset))
+        _setattr = object.__setattr__
+        _setattr(self, '_cls', cls)
+        _setattr(self, '_buf', buf)
+        _setattr(self, '_offset', offset)
+        _setattr(self, '_kwargs', kwargs)
+        _setattr(self, '_spec', spec)
+        _setattr(self, '_cache', {})
+        _setattr(self, '_dirty', set())
+    
+    
+    def __getattr__(self, name):
+        if name.startswith('_'):
+            raise AttributeError(name)
+        try:
+            return self._cache[name]
+        except KeyError:
+            pass
+        try:
+            (kind, offset, field_struct, dimensions, nested_cls, nested_size) = self._spec.fields[name]
+        except KeyError:
+            raise AttributeError("'{}' has no field '{}'.".format(self._cls.__name__, name))
+        offset += self._offset
+        if kind == _SCALAR:
+            value = field_struct.unpack_from(self._buf, offset)[0]
+        elif kind == _ARRAY:
+            value = _unflatten(field_struct.unpack_from(self._buf, offset), dimensions)
+        elif kind == _NESTED:
+            value = LazyRecord(nested_cls, self._buf, offset, **self._kwargs)
+        else:
+            count = field_struct.size//nested_size
+            value = _unflatten([LazyRecord(nested_cls, self._buf, offset + i*nested_size, **self._kwargs)
+                                for i in range(count)], dimensions)
+        self._cache[name] = value
+        return value
+    
+    
+    def __setattr__(self, name, value):
+        if name not in self._spec.fields:
+            raise AttributeError("'{}' has no field '{}'.".format(self._cls.__name__, name))
+        self._cache[name] = value
+        self._dirty.add(name)
+    
+    
+    def packed_size(self):
+        return self._spec.size
+    
+    
+    def _patch(self, target, base):
+        """
+        Packs the cached fields which may have changed into <target> where
+        the record starts at <base>.
+        """
+        fields = self._spec.fields
+        for (name, value) in self._cache.items():
+            (kind, offset, field_struct, dimensions, nested_cls, nested_size) = fields[name]
+            offset += base
+            if kind == _SCALAR:
+                if name in self._dirty:
+                    field_struct.pack_into(target, offset, value)
+            elif kind == _ARRAY:
+                field_struct.pack_into(target, offset, *_flatten(value))
+            elif kind == _NESTED:
+                _patch_struct(value, target, offset)
+            else:
+                for (i, element) in enumerate(_flatten(value)):
+                    _patch_struct(element, target, offset + i*nested_size)
+    
+    
+    def serialise(self):
+        """
+        Returns the packed record with any changes.
+        """
+        data = bytearray(self._buf[self._offset:self._offset + self._spec.size])
+        self._patch(data, 0)
+        return bytes(data)
+    
+    
+    def flush(self):
+        """
+        Writes any changes back into the buffer.
+        """
+        self._patch(self._buf, self._offset)
+        self._dirty.clear()
+    
+    
+    def materialise(self):
+        """
+        Returns a fully decoded instance of the class.
+        """
+        record = self._cls(**self._kwargs)
+        record.deserialise(self.serialise())
+        return record
+
+
+def _patch_struct(value, target, offset):
+    if isinstance(value, LazyRecord):
+        value._patch(target, offset)
+    elif isinstance(value, AbstractStruct):
+        data = value.serialise()
+        target[offset:offset + len(data)] = data
+    else:
+        raise ValueError('Expected a struct, not {}.'.format(type(value)))
+
+
+def _unflatten(values, dimensions):
+    if len(dimensions) <= 1:
+        return list(values)
+    step = len(values)//dimensions[0]
+    return [_unflatten(values[i*step:(i + 1)*step], dimensions[1:]) for i in range(dimensions[0])]
+
+
+def _flatten(array):
+    if not isinstance(array, list):
+        return [array]
+    if not array or not isinstance(array[0], list):
+        return array
+    return [value for row in array for value in _flatten(row)]
@@ -0,0 +1,103 @@
+"""
+Pools of struct instances reused for decoding.
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+
+class StructPool(object):
+    """
+    A pool of instances of one struct class (of any writer) which are
+    decoded into again and again rather than allocated per message, eg.:
+    
+        pool = StructPool(Sample_t, size=64)
+        record = pool.decode(buf)
+        ...
+        pool.release(record)
+    
+    An acquired instance keeps whatever values it last held until it is
+    decoded into or set.
+    """
+    
+    def __init__(self, cls, size=0, max_size=None, **kwargs):
+        """
+        Constructor
+        
+        <size> instances are created up front and at most <max_size> released
+        instances are kept. <kwargs> are passed to the constructor of each
+        instance (eg. endianness).
+        """
+        super(StructPool, self).__init__()
+        self.cls = cls
+        self.max_size = max_size
+        self._kwargs = kwargs
+        self._free = [cls(**kwargs) for i in range(size)]
+        self.record_size = (self._free[0] if self._free else cls(**kwargs)).packed_size()
+    
+    
+    def __len__(self):
+        """
+        Returns the number of free instances.
+        """
+        return len(self._free)
+    
+    
+    def acquire(self):
+        """
+        Returns a free instance, creating one if the pool is empty.
+        """
+        if self._free:
+            return self._free.pop()
+        return self.cls(**self._kwargs)
+    
+    
+    def acquire_many(self, count):
+        """
+        Returns a list of <count> free instances.
+        """
+        free = self._free
+        taken = free[max(len(free) - count, 0):]
+        del free[len(free) - len(taken):]
+        while len(taken) < count:
+            taken.append(self.cls(**self._kwargs))
+        return taken
+    
+    
+    def release(self, record):
+        """
+        Returns an instance to the pool.
+        """
+        if self.max_size is None or len(self._free) < self.max_size:
+            self._free.append(record)
+    
+    
+    def release_many(self, records):
+        """
+        Returns a list of instances to the pool.
+        """
+        if self.max_size is None:
+            self._free.extend(records)
+        else:
+            self._free.extend(records[:max(self.max_size - len(self._free), 0)])
+    
+    
+    def decode(self, buf, offset=0):
+        """
+        Decodes the record at <offset> into a pooled instance.
+        """
+        record = self.acquire()
+        record.deserialise_from(buf, offset)
+        return record
+    
+    
+    def decode_many(self, buf, count=None, offset=0):
+        """
+        Decodes <count> consecutive records (or as many as fit) into a list
+        of pooled instances.
+        """
+        if count is None:
+            count = max(len(buf) - offset, 0)//self.record_size
+        return self.cls.decode_many(buf, count, offset, out=self.acquire_many(count))
@@ -0,0 +1,130 @@
+"""
+Random access to files of back to back records through a memory map.
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import mmap
+
+
+# The number of records decoded at a time when iterating.
+DEFAULT_CHUNK = 4096
+
+
+class RecordLog(object):
+    """
+    Random access to a file of back to back records of one struct class (of
+    any writer) through a read only memory map, eg.:
+    
+        with RecordLog('telemetry.bin', Sample_t) as log:
+            last = log[-1]
+            for record in log[1000:2000]:
+                ...
+    
+    Opening a log only maps the file. Records are decoded when they are
+    indexed or iterated over.
+    """
+    
+    def __init__(self, filename, cls, offset=0, **kwargs):
+        """
+        Constructor
+        
+        <offset> is the position of the first record in the file and
+        <kwargs> are passed to the constructor of each record (eg. endianness).
+        """
+        super(RecordLog, self).__init__()
+        self.name = filename
+        self.cls = cls
+        self.offset = offset
+        self._kwargs = kwargs
+        self.record_size = cls(**kwargs).packed_size()
+        self._file = open(filename, 'rb')
+        try:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # Empty files cannot be mapped.
+            self._map = None
+        size = self._map.size() if self._map is not None else 0
+        self._count = max(size - offset, 0)//self.record_size
+    
+    
+    def __len__(self):
+        return self._count
+    
+    
+    def __getitem__(self, index):
+        """
+        Returns the record at <index> or a list of the records in a slice.
+        """
+        if isinstance(index, slice):
+            (start, stop, step) = index.indices(self._count)
+            if step == 1:
+                return self.decode_many(start, max(stop - start, 0))
+            return [self.decode(i) for i in range(start, stop, step)]
+        if index < 0:
+            index += self._count
+        if not 0 <= index < self._count:
+            raise IndexError('Record {} is out of range.'.format(index))
+        return self.decode(index)
+    
+    
+    def __iter__(self):
+        return self.iter()
+    
+    
+    def iter(self, start=0, stop=None, chunk=DEFAULT_CHUNK):
+        """
+        Yields the records from <start> to <stop>, decoding <chunk> records
+        at a time.
+        """
+        (start, stop, step) = slice(start, stop).indices(self._count)
+        for first in range(start, stop, chunk):
+            for record in self.decode_many(first, min(chunk, stop - first)):
+                yield record
+    
+    
+    def record_offset(self, index):
+        """
+        Returns the position of record <index> in the file.
+        """
+        return self.offset + index*self.record_size
+    
+    
+    def decode(self, index, record=None):
+        """
+        Decodes record <index> into <record>, or a new instance if None.
+        """
+        if record is None:
+            record = self.cls(**self._kwargs)
+        record.deserialise_from(self._map, self.record_offset(index))
+        return record
+    
+    
+    def decode_many(self, start, count, form='list'):
+        """
+        Decodes <count> records from <start> with the decode_many() of the
+        struct class.
+        """
+        if count <= 0:
+            # Also covers empty files, which have no map.
+            return self.cls.decode_many(b'', 0, form=form, **self._kwargs)
+        return self.cls.decode_many(self._map, count, self.record_offset(start), form=form, **self._kwargs)
+    
+    
+    def close(self):
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        self._file.close()
+        self._count = 0
+    
+    
+    def __enter__(self):
+        return self
+    
+    
+    def __exit__(self, exc_type, exc_value, tb):
+        self.close()
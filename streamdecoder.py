@@ -0,0 +1,141 @@
+"""
+Incremental decoding of records from a byte stream received in chunks.
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+
+DEFAULT_MAX_BUFFERED = 1024*1024
+
+
+class StreamDecoder(object):
+    """
+    Incrementally decodes a byte stream of back to back records of one
+    struct class (of any writer) which arrives in arbitrary chunks, eg.:
+    
+        decoder = StreamDecoder(Sample_t)
+        while True:
+            nbytes = sock.recv_into(decoder.get_buffer())
+            if not nbytes:
+                break
+            decoder.buffer_updated(nbytes)
+            for record in decoder.records():
+                ...
+    
+    The bytes are received into one preallocated buffer of <max_buffered>
+    bytes. Complete records are decoded straight from it and only the
+    trailing part of an incomplete record is ever moved, back to the start
+    of the buffer when the free space runs out. Records which have not been
+    taken with records() stay buffered, so a full buffer pushes back on the
+    sender rather than growing.
+    """
+    
+    def __init__(self, cls, max_buffered=DEFAULT_MAX_BUFFERED, **kwargs):
+        """
+        Constructor
+        
+        <kwargs> are passed to the constructor of each record (eg. endianness).
+        """
+        super(StreamDecoder, self).__init__()
+        self.cls = cls
+        self._kwargs = kwargs
+        self.record_size = cls(**kwargs).packed_size()
+        if max_buffered < self.record_size:
+            raise ValueError('Cannot buffer {} bytes with records of {} bytes.'.format(
+                max_buffered, self.record_size))
+        self._buf = bytearray(max_buffered)
+        # The undecoded bytes are self._buf[self._start:self._end].
+        self._start = 0
+        self._end = 0
+    
+    
+    def buffered(self):
+        """
+        Returns the number of bytes received but not yet decoded.
+        """
+        return self._end - self._start
+    
+    
+    def space(self):
+        """
+        Returns the number of bytes which can be received before the
+        buffered records must be taken.
+        """
+        return len(self._buf) - self.buffered()
+    
+    
+    def pending(self):
+        """
+        Returns the number of complete records buffered.
+        """
+        return self.buffered()//self.record_size
+    
+    
+    def _compact(self):
+        if self._start:
+            size = self._end - self._start
+            self._buf[:size] = self._buf[self._start:self._end]
+            self._start = 0
+            self._end = size
+    
+    
+    def get_buffer(self, sizehint=-1):
+        """
+        Returns a writable memoryview of the free space to receive into,
+        eg. with socket.recv_into(). Call buffer_updated() afterwards.
+        Raises BufferError if the buffer is full.
+        """
+        if self._end == len(self._buf) or 0 <= len(self._buf) - self._end < sizehint:
+            self._compact()
+        if self._end == len(self._buf):
+            raise BufferError('Stream buffer is full with {} bytes.'.format(self.buffered()))
+        return memoryview(self._buf)[self._end:]
+    
+    
+    def buffer_updated(self, nbytes):
+        """
+        Records that <nbytes> were written into the buffer from get_buffer().
+        """
+        self._end += nbytes
+    
+    
+    def feed(self, data):
+        """
+        Copies a received chunk into the buffer.
+        Raises BufferError if it does not fit.
+        """
+        nbytes = len(data)
+        if nbytes > self.space():
+            raise BufferError('Stream buffer cannot take {} more bytes with {} of {} used.'.format(
+                nbytes, self.buffered(), len(self._buf)))
+        if self._end + nbytes > len(self._buf):
+            self._compact()
+        self._buf[self._end:self._end + nbytes] = data
+        self._end += nbytes
+    
+    
+    def records(self, max_count=None, form='list'):
+        """
+        Decodes and removes up to <max_count> (or all) of the complete
+        records buffered, returning them in one of the forms of decode_many().
+        A generator (form='iter') must be used up before more bytes are received.
+        """
+        count = self.pending()
+        if max_count is not None:
+            count = min(count, max_count)
+        records = self.cls.decode_many(self._buf, count, self._start, form=form, **self._kwargs)
+        self._start += count*self.record_size
+        if self._start == self._end:
+            self._start = self._end = 0
+        return records
+    
+    
+    def decode(self, data):
+        """
+        Feeds a chunk and returns the list of the records completed by it.
+        """
+        self.feed(data)
+        return self.records()
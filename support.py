@@ -10,6 +10,7 @@ from __future__ import unicode_literals
 import os
 import sys
 import re
+import mmap
 
 _path = os.path.realpath(os.path.abspath(os.path.join(__file__,'../../../Python')))
 sys.path.append(_path)
@@ -36,57 +37,123 @@ COMMENT_START_REGEX = re.compile(r'((///?)|(/\*\*?)|(\"))')
 def process_line_for_comments(line, inside_comment=False, inside_string=False):
     """
     Processes a line of a c file to extract a comment.
+    Returns the (code, comment, inside_comment, inside_string) of the line,
+    the last two being the state to pass on with the next line.
+    
+    Double quoted c-strings stay in the code where they are, each of their
+    quotes being tripled, and comment markers inside them are not treated
+    as comments.
     """
-    comment = ''
-    code = ''
-    while line:
+    comment = []
+    code = []
+    pos = 0
+    end = len(line)
+    while pos < end:
         if inside_comment:
             #  Inside a comment!
-            idx = line.find('*/')
+            idx = line.find('*/', pos)
             if idx>=0:
-                comment += line[:idx]
-                line = line[idx+2:]
+                comment.append(line[pos:idx])
+                pos = idx+2
                 inside_comment = False
             else:
-                comment += line
-                #line = ''
+                comment.append(line[pos:])
                 break
         elif inside_string:
-            idx = line.find('"')
+            idx = line.find('"', pos)
             if idx < 0:
                 if not line.endswith('\\'):
-                    print(line)
-                    print(code)
-                    print(comment)
-                    raise ParseException("Mal formed c-string.")
-                code += line + '\n'
-                #line = ''
+                    raise ParseException('Mal formed c-string "{}" in "{}".'.format(
+                        line[pos:].rstrip('\r\n'), line.rstrip('\r\n')))
+                code.append(line[pos:])
+                code.append('\n')
                 break
             else:
                 inside_string = False
-                code += line[:idx] + '"""'
-                line = line[idx+1:]
+                code.append(line[pos:idx])
+                code.append('"""')
+                pos = idx+1
         else:
-            m = COMMENT_START_REGEX.search(line)
+            m = COMMENT_START_REGEX.search(line, pos)
             if m:
+                code.append(line[pos:m.start()])
                 if m.group(1) == '"':
                     inside_string = True
-                    end = m.end()
-                    code += '"""' + line[:(end-1)]
-                    line = line[end:]
+                    code.append('"""')
+                    pos = m.end()
+                elif m.group(1).startswith('/*'):
+                    pos = m.end()
+                    inside_comment = True
                 else:
-                    code += line[:m.start()]
-                    if m.group(1).startswith('/*'):
-                        line = line[m.end():]
-                        inside_comment = True
-                    else:
-                        comment += line[m.end():]
-                        #line = ''
-                        break
+                    comment.append(line[m.end():])
+                    break
             else:
-                code += line
+                code.append(line[pos:])
                 break
     
-    return code, comment, inside_comment, inside_string
+    return ''.join(code), ''.join(comment), inside_comment, inside_string
 
 
+class MMapSource(object):
+    """
+    A read only source file accessed through a memory map rather than
+    read line by line. Supports the readline() used by the HeaderParser and
+    read_logical_line() which returns a line together with its continuation
+    lines in a single slice of the map.
+    """
+    
+    def __init__(self, filename):
+        """
+        Constructor
+        """
+        super(MMapSource, self).__init__()
+        self.name = filename
+        self._file = open(filename, 'rb')
+        try:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # Empty files cannot be mapped.
+            self._map = None
+    
+    def readline(self):
+        """
+        Returns the next line including its line ending or '' at the end of the file.
+        """
+        if self._map is None:
+            return ''
+        line = self._map.readline()
+        if not isinstance(line, str):
+            line = line.decode('latin-1')
+        return line
+    
+    def read_logical_line(self):
+        """
+        Returns the next line joined with any continuation lines and the
+        number of physical lines it spans.
+        """
+        if self._map is None:
+            return '', 0
+        start = pos = self._map.tell()
+        size = self._map.size()
+        count = 0
+        while pos < size:
+            idx = self._map.find(b'\n', pos)
+            count += 1
+            if idx < 0:
+                pos = size
+                break
+            pos = idx+1
+            if self._map[idx-1:idx] != b'\\':
+                break
+        else:
+            if count and self._map[pos-2:pos] == b'\\\n':
+                raise UnexpectedException('End of file after line continuation.')
+        line = self._map.read(pos - start)
+        if not isinstance(line, str):
+            line = line.decode('latin-1')
+        return line, count
+    
+    def close(self):
+        if self._map is not None:
+            self._map.close()
+        self._file.close()
@@ -0,0 +1,237 @@
+"""
+Logging of decoded records to pytables tables in chunks.
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import time
+import ctypes
+import itertools
+
+from .abstractstruct import AbstractStruct
+
+
+DEFAULT_CHUNK = 16384
+
+
+class TableSink(object):
+    """
+    Logs records of one struct class to a pytables Table, eg.:
+    
+        with tables.open_file('log.h5', 'w') as h5file:
+            sink = TableSink.create(h5file, '/', 'samples', Sample_t)
+            for buf in packets:
+                sink.append_buffer(buf)
+            sink.close()
+    
+    Records (or the raw buffers they are decoded from) are gathered into
+    per column lists and written <chunk_size> rows at a time with a single
+    Table.append(), the time column being filled with the given times or the
+    time each record was added.
+    """
+    
+    def __init__(self, table, cls, chunk_size=DEFAULT_CHUNK, **kwargs):
+        """
+        Constructor
+        
+        <table> is a table created with the description from
+        cls.make_table_descriptor(). <kwargs> are the constructor arguments
+        of the class (eg. endianness).
+        """
+        super(TableSink, self).__init__()
+        self.table = table
+        self.cls = cls
+        self.chunk_size = chunk_size
+        self.rows_written = 0
+        self._kwargs = kwargs
+        # A list of (column path, function getting the value from a record).
+        self._columns = _table_columns(cls(**kwargs), table.description)
+        self._times = []
+        self._values = [[] for column in self._columns]
+        # Records with only scalar fields can be logged from the columns
+        # decoded by decode_many() without decoding any records.
+        self._scalar_only = all(len(path) == 1 and path[0] in cls._scalar_fields
+                                for (path, getter) in self._columns)
+    
+    
+    @classmethod
+    def create(cls, h5file, where, name, record_cls, title='', expectedrows=10000,
+               chunk_size=DEFAULT_CHUNK, **kwargs):
+        """
+        Creates a table for <record_cls> in an open pytables file and
+        returns a sink appending to it.
+        """
+        table = h5file.create_table(where, name, record_cls.make_table_descriptor(), title,
+                                    expectedrows=expectedrows, createparents=True)
+        return cls(table, record_cls, chunk_size, **kwargs)
+    
+    
+    def __len__(self):
+        """
+        Returns the number of rows waiting to be written.
+        """
+        return len(self._times)
+    
+    
+    def append(self, record, timestamp=None):
+        """
+        Adds a record, logged at <timestamp> or the current time.
+        """
+        self._times.append(time.time() if timestamp is None else timestamp)
+        for (values, (path, getter)) in zip(self._values, self._columns):
+            values.append(getter(record))
+        if len(self._times) >= self.chunk_size:
+            self.flush()
+    
+    
+    def append_many(self, records, timestamps=None):
+        """
+        Adds a list of records, logged at the corresponding <timestamps>, a
+        single time for all of them or the current time.
+        """
+        self._add_times(len(records), timestamps)
+        for (values, (path, getter)) in zip(self._values, self._columns):
+            values.extend([getter(record) for record in records])
+        if len(self._times) >= self.chunk_size:
+            self.flush()
+    
+    
+    def append_buffer(self, buf, count=None, offset=0, timestamps=None):
+        """
+        Decodes and adds <count> consecutive records (or as many as fit)
+        from <buf>.
+        """
+        if not self._scalar_only:
+            self.append_many(self.cls.decode_many(buf, count, offset, **self._kwargs), timestamps)
+            return
+        columns = self.cls.decode_many(buf, count, offset, form='columns', **self._kwargs)
+        self._add_times(len(columns[self._columns[0][0][0]]), timestamps)
+        for (values, (path, getter)) in zip(self._values, self._columns):
+            values.extend(columns[path[0]])
+        if len(self._times) >= self.chunk_size:
+            self.flush()
+    
+    
+    def _add_times(self, count, timestamps):
+        if timestamps is None:
+            timestamps = time.time()
+        if isinstance(timestamps, (int, float)):
+            self._times.extend(itertools.repeat(timestamps, count))
+        else:
+            if len(timestamps) != count:
+                raise ValueError('Got {} timestamps for {} records.'.format(len(timestamps), count))
+            self._times.extend(timestamps)
+    
+    
+    def flush(self):
+        """
+        Writes the rows gathered so far to the table in one append.
+        """
+        count = len(self._times)
+        if not count:
+            return
+        import numpy
+        rows = numpy.zeros(count, dtype=self.table.dtype)
+        rows['time'] = self._times
+        for (values, (path, getter)) in zip(self._values, self._columns):
+            column = rows
+            for name in path:
+                column = column[name]
+            column[...] = values
+            del values[:]
+        del self._times[:]
+        self.table.append(rows)
+        self.rows_written += count
+    
+    
+    def close(self):
+        """
+        Writes any remaining rows and flushes the table.
+        """
+        self.flush()
+        self.table.flush()
+    
+    
+    def __enter__(self):
+        return self
+    
+    
+    def __exit__(self, exc_type, exc_value, tb):
+        self.close()
+
+
+def _table_columns(record, description, path=(), get=None):
+    """
+    Returns the list of (column path, getter) of the leaf columns of the
+    table description of the class of <record>.
+    <get> gets the record from the top level record.
+    """
+    columns = []
+    for field in type(record)._fields_:
+        name = field[0]
+        value = getattr(record, name)
+        field_get = _attribute_getter(get, name)
+        if isinstance(value, AbstractStruct):
+            columns.extend(_table_columns(value, description._v_colobjects[name], path + (name,), field_get))
+            continue
+        indices = _struct_array_indices(value)
+        if indices:
+            for index in indices:
+                element_name = '{}_{}'.format(name, '_'.join(str(idx) for idx in index))
+                element = _index(value, index)
+                columns.extend(_table_columns(element, description._v_colobjects[element_name],
+                                              path + (element_name,), _index_getter(field_get, index)))
+            continue
+        if isinstance(value, list) and description._v_colobjects[name].shape == ():
+            # A char array whose only element is the whole string.
+            field_get = _index_getter(field_get, (0,))
+        elif isinstance(value, ctypes.Array):
+            field_get = _list_getter(field_get)
+        columns.append((path + (name,), field_get))
+    return columns
+
+
+def _struct_array_indices(value):
+    """
+    Returns the indices of the elements of an array of structs or None if
+    <value> is not one.
+    """
+    shape = []
+    element = value
+    while isinstance(element, (list, ctypes.Array)) and len(element):
+        shape.append(len(element))
+        element = element[0]
+    if not shape or not isinstance(element, AbstractStruct):
+        return None
+    return list(itertools.product(*[range(dim) for dim in shape]))
+
+
+def _index(value, index):
+    for idx in index:
+        value = value[idx]
+    return value
+
+
+def _attribute_getter(get, name):
+    if get is None:
+        return lambda record: getattr(record, name)
+    return lambda record: getattr(get(record), name)
+
+
+def _index_getter(get, index):
+    return lambda record: _index(get(record), index)
+
+
+def _list_getter(get):
+    return lambda record: _to_list(get(record))
+
+
+def _to_list(value):
+    if isinstance(value, ctypes.Array) and value._type_ is ctypes.c_char:
+        return value.value
+    if isinstance(value, ctypes.Array):
+        return [_to_list(element) for element in value]
+    return value
@@ -0,0 +1,5 @@
+"""
+Tests for h2pyex, run from the directory holding the package with eg.:
+
+    python -m unittest discover -s h2pyex/tests -t .
+"""
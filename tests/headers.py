@@ -0,0 +1,75 @@
+"""
+Helpers for generating modules from c headers in the tests.
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import sys
+import itertools
+import unittest
+
+from h2pyex.hparser import import_cheader
+from h2pyex.writer import Writer
+from h2pyex.writerplus import WriterPlus
+from h2pyex.writer_ctypes import WriterCTypes
+
+
+# The (name, writer class, options) of each kind of generated class.
+WRITER_VARIANTS = (
+    ('Writer', Writer, {}),
+    ('SlottedWriter', Writer, {'slots': True}),
+    ('WriterPlus', WriterPlus, {}),
+    ('SlottedWriterPlus', WriterPlus, {'slots': True}),
+    ('WriterCTypes', WriterCTypes, {}),
+)
+
+_module_ids = itertools.count()
+
+
+def load_header(text, writer_cls=WriterCTypes, **kwargs):
+    """
+    Parses the c header <text> with <writer_cls> and returns the generated
+    module, which is not added to sys.modules.
+    """
+    kwargs.setdefault('tablesSupport', False)
+    asname = 'h2pyex_test_{}'.format(next(_module_ids))
+    return import_cheader(text, asname=asname, add_to_sys_modules=False, writer_cls=writer_cls, **kwargs)
+
+
+class HeaderTestMixin(object):
+    """
+    Loads <header> as self.module before each test, generated with
+    <writer_cls> and the <writer_options> and <header_options>.
+    """
+    
+    header = ''
+    header_options = {}
+    writer_cls = WriterCTypes
+    writer_options = {}
+    
+    def setUp(self):
+        super(HeaderTestMixin, self).setUp()
+        options = dict(self.header_options, **self.writer_options)
+        # The module must be kept as Python 2 clears its globals once it is freed.
+        self.module = load_header(self.header, writer_cls=self.writer_cls, **options)
+
+
+def for_each_writer(*names):
+    """
+    Class decorator adding a TestCase for each of the WRITER_VARIANTS named
+    (or all of them) to the module of a HeaderTestMixin subclass, eg.
+    RecordLogTest_WriterPlus.
+    """
+    def add_test_cases(mixin):
+        module = sys.modules[mixin.__module__]
+        for (name, writer_cls, options) in WRITER_VARIANTS:
+            if names and name not in names:
+                continue
+            case_name = str('{}_{}'.format(mixin.__name__, name))
+            attributes = {'writer_cls': writer_cls, 'writer_options': options, '__module__': mixin.__module__}
+            setattr(module, case_name, type(case_name, (mixin, unittest.TestCase), attributes))
+        return mixin
+    return add_test_cases
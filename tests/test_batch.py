@@ -0,0 +1,139 @@
+"""
+Tests for the command line tool converting header trees.
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import io
+import os
+import shutil
+import tempfile
+import unittest
+
+from h2pyex.batch import (find_headers, common_root, module_path, compile_header, compile_headers,
+                          print_summary, _parse_args)
+
+
+HEADER = '''
+#define COUNT 3
+
+typedef struct
+{
+    uint16_t id;
+    int32_t values[COUNT];
+} Sample_t;
+'''
+
+
+class BatchTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.src = os.path.join(self.tmpdir, 'src')
+        self.out = os.path.join(self.tmpdir, 'out')
+        os.makedirs(os.path.join(self.src, 'sub'))
+    
+    
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+    
+    
+    def _write(self, relpath, text):
+        path = os.path.join(self.src, relpath)
+        with io.open(path, 'w') as f:
+            f.write(text)
+        return path
+    
+    
+    def _load(self, path):
+        namespace = {}
+        with open(path, 'r') as f:
+            exec(f.read(), namespace)
+        return namespace
+    
+    
+    def test_find_headers(self):
+        a = self._write('a.h', HEADER)
+        b = self._write(os.path.join('sub', 'b.hpp'), HEADER)
+        self._write('notes.txt', 'not a header')
+        manifest = self._write('manifest.txt', '# listed headers\n\nsub/b.hpp\n')
+        self.assertEqual(find_headers([self.src]), [a, b])
+        self.assertEqual(find_headers([a], manifest), [a, b])
+    
+    
+    def test_module_path(self):
+        header = os.path.join(self.src, 'sub', 'b.h')
+        self.assertEqual(module_path(header, self.out, self.src), os.path.join(self.out, 'sub', 'b.py'))
+        self.assertEqual(module_path(header, self.out), os.path.join(self.out, 'b.py'))
+        self.assertEqual(module_path(header, self.out, os.path.join(self.src, 'other')),
+                         os.path.join(self.out, 'b.py'))
+    
+    
+    def test_compile_header(self):
+        header = self._write('a.h', HEADER)
+        output = os.path.join(self.out, 'nested', 'a.py')
+        result = compile_header(header, output, tablesSupport=False)
+        self.assertIsNone(result.failure)
+        self.assertEqual(result.errors, 0)
+        module = self._load(output)
+        self.assertEqual(module['COUNT'], 3)
+        self.assertEqual(module['Sample_t']().packed_size(), 14)
+    
+    
+    def test_compile_header_counts_errors(self):
+        header = self._write('a.h', HEADER + '#pragma pack(1)\nextern int f(void);\n')
+        result = compile_header(header, os.path.join(self.out, 'a.py'), tablesSupport=False)
+        self.assertIsNone(result.failure)
+        self.assertEqual(result.errors, 2)
+    
+    
+    def test_failed_header_writes_nothing(self):
+        header = self._write('a.h', '#ifdef UNTERMINATED\n#define A 1\n')
+        output = os.path.join(self.out, 'a.py')
+        result = compile_header(header, output, tablesSupport=False)
+        self.assertIn('UnexpectedException', result.failure)
+        self.assertFalse(os.path.exists(output))
+    
+    
+    def test_compile_headers_with_defines(self):
+        self._write('a.h', '#ifdef FEATURE\n#define LEVEL 2\n#else\n#define LEVEL 1\n#endif\n')
+        self._write(os.path.join('sub', 'b.h'), HEADER)
+        args = _parse_args([self.src, '-D', 'FEATURE', '-o', self.out])
+        self.assertEqual(args.define, ['FEATURE'])
+        results = compile_headers(find_headers(args.paths), self.out, root=self.src, jobs=1,
+                                  defines=args.define, tablesSupport=False)
+        self.assertEqual([result.failure for result in results], [None, None])
+        self.assertEqual(self._load(os.path.join(self.out, 'a.py'))['LEVEL'], 2)
+        self.assertTrue(os.path.isfile(os.path.join(self.out, 'sub', 'b.py')))
+        stream = io.StringIO()
+        self.assertEqual(print_summary(results, stream), 0)
+        self.assertIn('2 header(s), 0 failed', stream.getvalue())
+
+    
+    
+    def test_common_root(self):
+        a = os.path.join(self.src, 'a', 'types.h')
+        b = os.path.join(self.src, 'b', 'deep', 'types.h')
+        self.assertEqual(common_root([a, b]), self.src)
+        self.assertEqual(common_root([a]), os.path.dirname(a))
+        self.assertIsNone(common_root([]))
+    
+    
+    def test_headers_of_the_same_name(self):
+        os.makedirs(os.path.join(self.src, 'a'))
+        os.makedirs(os.path.join(self.src, 'b'))
+        a = self._write(os.path.join('a', 'types.h'), '#define A 1\n')
+        b = self._write(os.path.join('b', 'types.h'), '#define B 2\n')
+        self.assertRaises(ValueError, compile_headers, [a, b], self.out, tablesSupport=False)
+        self.assertFalse(os.path.exists(self.out))
+        results = compile_headers([a, b], self.out, root=common_root([a, b]), tablesSupport=False)
+        self.assertEqual([result.failure for result in results], [None, None])
+        self.assertEqual(self._load(os.path.join(self.out, 'a', 'types.py'))['A'], 1)
+        self.assertEqual(self._load(os.path.join(self.out, 'b', 'types.py'))['B'], 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
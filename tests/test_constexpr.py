@@ -0,0 +1,116 @@
+"""
+Tests for evaluating c constant expressions.
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import sys
+import unittest
+
+from h2pyex.constexpr import evaluate, evaluate_condition, format_constant
+from h2pyex.userexceptions import NotConstantException
+
+
+class EvaluateTest(unittest.TestCase):
+
+    def test_literals(self):
+        self.assertEqual(evaluate('42', {}), 42)
+        self.assertEqual(evaluate(' 0x1F \n', {}), 31)
+        self.assertEqual(evaluate('10UL', {}), 10)
+        self.assertEqual(evaluate('010', {}), 8)
+        self.assertEqual(evaluate('1.5f', {}), 1.5)
+        self.assertEqual(evaluate('2e3', {}), 2000.0)
+        self.assertEqual(evaluate("'A'", {}), 65)
+        self.assertEqual(evaluate("'\\n' + 0", {}), 10)
+        # Hex constants above the largest int wrap around as in pytify().
+        self.assertEqual(evaluate('0x{:X}'.format(2*(sys.maxsize + 1) - 1), {}), -1)
+    
+    
+    def test_precedence(self):
+        self.assertEqual(evaluate('1 + 2 * 3', {}), 7)
+        self.assertEqual(evaluate('(1 + 2) * 3', {}), 9)
+        self.assertEqual(evaluate('1 << 2 + 1', {}), 8)
+        self.assertEqual(evaluate('1 | 6 & 3', {}), 3)
+        self.assertEqual(evaluate('1 ^ 3 | 4', {}), 6)
+        self.assertEqual(evaluate('2 + 3 == 5 && 1 < 2', {}), 1)
+        self.assertEqual(evaluate('3 & 1 == 1', {}), 1)
+        self.assertEqual(evaluate('0 || 2 && 0', {}), 0)
+        self.assertEqual(evaluate('-2 * -3 - ~0 + !5', {}), 7)
+    
+    
+    def test_shifts(self):
+        self.assertEqual(evaluate('1 << 31', {}), 2147483648)
+        self.assertEqual(evaluate('0x80 >> 3', {}), 16)
+        self.assertEqual(evaluate('-16 >> 2', {}), -4)
+        self.assertEqual(evaluate('(1 << BITS) - 1', {'BITS': 12}), 4095)
+    
+    
+    def test_division_truncates_towards_zero(self):
+        self.assertEqual(evaluate('7 / 2', {}), 3)
+        self.assertEqual(evaluate('-7 / 2', {}), -3)
+        self.assertEqual(evaluate('7 / -2', {}), -3)
+        self.assertEqual(evaluate('-7 % 3', {}), -1)
+        self.assertEqual(evaluate('7 % -3', {}), 1)
+        self.assertEqual(evaluate('7.0 / 2', {}), 3.5)
+        self.assertEqual(evaluate('SIZE / WIDTH', {'SIZE': 100, 'WIDTH': 8}), 12)
+    
+    
+    def test_casts(self):
+        self.assertEqual(evaluate('(uint8_t)-1', {}), 255)
+        self.assertEqual(evaluate('(int8_t)200', {}), -56)
+        self.assertEqual(evaluate('(unsigned int)-1', {}), 4294967295)
+        self.assertEqual(evaluate('(unsigned long long)(1 << 3)', {}), 8)
+        self.assertEqual(evaluate('(double)3 / 2', {}), 1.5)
+        # A bracketed constant which happens to be named like a type is not a cast.
+        self.assertEqual(evaluate('(size_t) + 1', {'size_t': 4}), 5)
+    
+    
+    def test_conditional(self):
+        self.assertEqual(evaluate('1 ? 2 : 3', {}), 2)
+        self.assertEqual(evaluate('0 ? 2 : 1 ? 3 : 4', {}), 3)
+        self.assertEqual(evaluate('(A > 2 ? A : 2) * 2', {'A': 5}), 10)
+        # The operands c does not evaluate may be invalid.
+        self.assertEqual(evaluate('1 ? 2 : 1 / 0', {}), 2)
+        self.assertEqual(evaluate('0 && 1 / 0', {}), 0)
+        self.assertEqual(evaluate('1 || MISSING', {}), 1)
+    
+    
+    def test_not_constant(self):
+        for expr in ('', 'MISSING + 1', 'NAME', '1 +', '(1', '1 ? 2', '1 / 0', '1.5 % 2', '08', '"text"',
+                     'f(1)', '1 2'):
+            self.assertRaises(NotConstantException, evaluate, expr, {'NAME': 'text'})
+
+
+
+class EvaluateConditionTest(unittest.TestCase):
+
+    def test_defined(self):
+        symbols = ({'A': 1}, {'B': 'text'})
+        self.assertTrue(evaluate_condition('defined A', symbols))
+        self.assertTrue(evaluate_condition('defined(B) && !defined ( C )', symbols))
+        self.assertFalse(evaluate_condition('defined C || defined(D)', symbols))
+    
+    
+    def test_values(self):
+        self.assertTrue(evaluate_condition('A * 2 == 6', ({'A': 3}, {'A': 2})))
+        self.assertTrue(evaluate_condition('VERSION >= 0x0102', ({}, {'VERSION': 0x0200})))
+        # Names which are not defined or are not numbers count as 0.
+        self.assertFalse(evaluate_condition('UNDEFINED', ({},)))
+        self.assertTrue(evaluate_condition('UNDEFINED + NAME == 0', ({'NAME': 'text'},)))
+        self.assertRaises(NotConstantException, evaluate_condition, '1 +', ({},))
+
+
+
+class FormatConstantTest(unittest.TestCase):
+
+    def test_format_constant(self):
+        self.assertEqual(format_constant(-3), '-3')
+        self.assertEqual(format_constant(0.5), '0.5')
+        self.assertRaises(NotConstantException, format_constant, float('inf'))
+
+
+if __name__ == '__main__':
+    unittest.main()
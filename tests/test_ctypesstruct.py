@@ -0,0 +1,76 @@
+"""
+Tests for the buffers shared by the classes generated with WriterCTypes.
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import gc
+import unittest
+
+from .headers import HeaderTestMixin
+
+
+HEADER = '''
+typedef struct
+{
+    uint8_t a;
+    uint16_t b;
+} A_t;
+'''
+
+
+class ViewTest(HeaderTestMixin, unittest.TestCase):
+
+    header = HEADER
+    
+    def test_view_shares_buffer(self):
+        buf = bytearray(b'\xff\x01\x02\x03')
+        record = self.module.A_t.view(buf, 1)
+        self.assertEqual((record.a, record.b), (1, 0x203))
+        record.b = 0x405
+        self.assertEqual(buf, bytearray(b'\xff\x01\x04\x05'))
+        buf[1] = 9
+        self.assertEqual(record.a, 9)
+    
+    
+    def test_view_copies_read_only_buffer(self):
+        buf = b'\x01\x02\x03'
+        record = self.module.A_t.view(buf)
+        record.a = 9
+        self.assertEqual(record.serialise(), b'\x09\x02\x03')
+        self.assertEqual(buf, b'\x01\x02\x03')
+    
+    
+    def test_view_frozen(self):
+        record = self.module.A_t.view(bytearray(3))
+        with self.assertRaises(AttributeError):
+            record.c = 1
+
+
+
+class DataTest(HeaderTestMixin, unittest.TestCase):
+
+    header = HEADER
+    
+    def test_data_shares_memory(self):
+        record = self.module.A_t(b=0x203)
+        data = record.data()
+        self.assertEqual(len(data), 3)
+        self.assertEqual(data.tobytes(), b'\x00\x02\x03')
+        data[0:1] = b'\x05'
+        self.assertEqual(record.a, 5)
+        record.b = 0x405
+        self.assertEqual(data.tobytes(), b'\x05\x04\x05')
+    
+    
+    def test_data_keeps_record_alive(self):
+        data = self.module.A_t(a=7).data()
+        gc.collect()
+        self.assertEqual(data.tobytes(), b'\x07\x00\x00')
+
+
+if __name__ == '__main__':
+    unittest.main()
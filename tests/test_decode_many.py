@@ -0,0 +1,83 @@
+"""
+Tests for decoding runs of records with decode_many().
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import struct
+import unittest
+
+from h2pyex.writer import Writer
+from h2pyex.pool import StructPool
+
+from .headers import HeaderTestMixin, for_each_writer, load_header
+
+
+HEADER = '''
+typedef struct
+{
+    uint16_t id;
+    int32_t value;
+} Sample_t;
+'''
+
+BIG = struct.pack('>HiHi', 1, -5, 2, 7)
+LITTLE = struct.pack('<HiHi', 1, -5, 2, 7)
+
+
+def check_forms(test, cls, buf, **kwargs):
+    records = cls.decode_many(buf, **kwargs)
+    test.assertEqual([(record.id, record.value) for record in records], [(1, -5), (2, 7)])
+    records = cls.decode_many(buf, form='iter', **kwargs)
+    test.assertEqual([record.id for record in records], [1, 2])
+    test.assertEqual(cls.decode_many(buf, form='columns', **kwargs), {'id': [1, 2], 'value': [-5, 7]})
+    test.assertEqual(cls.decode_many(buf, form='dicts', **kwargs)[1], {'id': 2, 'value': 7})
+    test.assertEqual(len(cls.decode_many(buf, count=1, offset=6, **kwargs)), 1)
+    test.assertRaises(ValueError, cls.decode_many, buf, form='tuples', **kwargs)
+
+
+@for_each_writer()
+class DecodeManyTest(HeaderTestMixin):
+
+    header = HEADER
+    
+    def test_forms(self):
+        check_forms(self, self.module.Sample_t, BIG)
+    
+    
+    def test_little_endian(self):
+        if self.writer_cls is not Writer:
+            self.skipTest('Only Writer classes take the endianness of each instance.')
+        check_forms(self, self.module.Sample_t, LITTLE, endianness='<')
+
+
+
+class CTypesDecodeManyTest(HeaderTestMixin, unittest.TestCase):
+
+    header = HEADER
+    
+    def test_endianness(self):
+        check_forms(self, self.module.Sample_t, BIG, endianness='!')
+        little = load_header(HEADER, default_endianness='<')
+        check_forms(self, little.Sample_t, LITTLE, endianness='<')
+    
+    
+    def test_mismatched_endianness(self):
+        with self.assertRaises(ValueError) as context:
+            self.module.Sample_t.decode_many(BIG, endianness='<')
+        self.assertIn('big endian', str(context.exception))
+        self.assertRaises(ValueError, self.module.Sample_t, endianness='<')
+        self.assertRaises(ValueError, self.module.Sample_t.decode_many, BIG, endianness='?')
+        self.assertEqual(self.module.Sample_t(endianness='>', id=4).id, 4)
+    
+    
+    def test_through_pool(self):
+        pool = StructPool(self.module.Sample_t, size=2, endianness='>')
+        self.assertEqual([record.value for record in pool.decode_many(BIG)], [-5, 7])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,97 @@
+"""
+Tests for the cache of decoded records.
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import struct
+import unittest
+
+from h2pyex.writer import Writer
+from h2pyex.decodecache import DecodeCache
+
+from .headers import HeaderTestMixin, for_each_writer
+
+
+HEADER = '''
+typedef struct
+{
+    uint16_t id;
+    int32_t value;
+} Sample_t;
+'''
+
+
+def sample(idx):
+    return struct.pack('>Hi', idx, -idx)
+
+
+@for_each_writer()
+class DecodeCacheTest(HeaderTestMixin):
+
+    header = HEADER
+    
+    def setUp(self):
+        super(DecodeCacheTest, self).setUp()
+        self.cls = self.module.Sample_t
+    
+    
+    def test_repeated_frames_share_records(self):
+        cache = DecodeCache(self.cls)
+        first = cache.decode(sample(1))
+        self.assertEqual((first.id, first.value), (1, -1))
+        self.assertIs(cache.decode(bytearray(sample(1))), first)
+        self.assertIs(cache.decode(memoryview(sample(2) + sample(1)), 6), first)
+        self.assertIsNot(cache.decode(sample(2)), first)
+        self.assertEqual((cache.hits, cache.misses, len(cache)), (2, 2, 2))
+    
+    
+    def test_least_recently_used_is_evicted(self):
+        cache = DecodeCache(self.cls, max_size=2)
+        records = [cache.decode(sample(idx)) for idx in range(2)]
+        cache.decode(sample(0))
+        cache.decode(sample(2))
+        self.assertEqual(len(cache), 2)
+        self.assertIs(cache.decode(sample(0)), records[0])
+        self.assertIsNot(cache.decode(sample(1)), records[1])
+        self.assertEqual(cache.misses, 4)
+    
+    
+    def test_decode_many(self):
+        cache = DecodeCache(self.cls)
+        buf = sample(3) + sample(4) + sample(3) + b'\x00'
+        records = cache.decode_many(buf)
+        self.assertEqual([record.id for record in records], [3, 4, 3])
+        self.assertIs(records[0], records[2])
+        self.assertEqual([record.id for record in cache.decode_many(buf, 1, 6)], [4])
+        self.assertEqual((cache.hits, cache.misses), (2, 2))
+    
+    
+    def test_clear(self):
+        cache = DecodeCache(self.cls)
+        record = cache.decode(sample(1))
+        cache.clear()
+        self.assertEqual(len(cache), 0)
+        self.assertIsNot(cache.decode(sample(1)), record)
+    
+    
+    def test_invalid_arguments(self):
+        self.assertRaises(ValueError, DecodeCache, self.cls, max_size=0)
+        cache = DecodeCache(self.cls)
+        self.assertRaises(ValueError, cache.decode, sample(1)[:-1])
+        self.assertRaises(ValueError, cache.decode, sample(1), 1)
+        self.assertEqual(len(cache), 0)
+    
+    
+    def test_endianness(self):
+        if self.writer_cls is not Writer:
+            self.skipTest('Only Writer classes take the endianness of each instance.')
+        cache = DecodeCache(self.cls, endianness='<')
+        self.assertEqual(cache.decode(struct.pack('<Hi', 1, -9)).value, -9)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,64 @@
+"""
+Tests for comparing, updating and exchanging deltas between structs.
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import unittest
+
+from .headers import HeaderTestMixin, for_each_writer
+
+
+HEADER = '''
+typedef struct
+{
+    int32_t ai;
+    int32_t bi;
+    double dbl;
+    uint8_t arr[3];
+} S_t;
+'''
+
+
+@for_each_writer()
+class DeltaTest(HeaderTestMixin):
+
+    header = HEADER
+    
+    def setUp(self):
+        super(DeltaTest, self).setUp()
+        self.cls = self.module.S_t
+    
+    
+    def test_serialise_is_bytes(self):
+        record = self.cls(ai=1)
+        self.assertIsInstance(record.serialise(), bytes)
+        self.assertEqual(len(record.serialise()), record.packed_size())
+    
+    
+    def test_changed_fields_and_update(self):
+        a = self.cls()
+        b = self.cls(bi=5, dbl=3.0)
+        self.assertEqual(a.changed_fields(b), 0b110)
+        self.assertEqual(a.changed_fields(self.cls()), 0)
+        self.assertTrue(a.update(b))
+        self.assertEqual((a.ai, a.bi, a.dbl), (0, 5, 3.0))
+        self.assertFalse(a.update(b))
+    
+    
+    def test_encode_and_apply_delta(self):
+        a = self.cls()
+        b = self.cls(ai=-2)
+        b.arr[1] = 7
+        delta = a.encode_delta(b)
+        self.assertEqual(a.encode_delta(a), b'')
+        self.assertEqual(a.apply_delta(delta), 0b1001)
+        self.assertEqual((a.ai, list(a.arr)), (-2, [0, 7, 0]))
+        self.assertEqual(a.serialise(), b.serialise())
+
+
+if __name__ == '__main__':
+    unittest.main()
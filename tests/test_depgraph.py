@@ -0,0 +1,117 @@
+"""
+Tests for the include dependency graph used by incremental builds.
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import io
+import os
+import shutil
+import tempfile
+import unittest
+
+from h2pyex.depgraph import DependencyGraph
+from h2pyex.batch import find_headers, rebuild
+
+
+class DependencyGraphTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.out = os.path.join(self.tmpdir, 'out')
+        self.common = self._write('common.h', '#define COMMON 1\n')
+        self.a = self._write('a.h', '#include "common.h"\n#define A 2\n')
+        self.b = self._write('b.h', '#define B 3\n')
+    
+    
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+    
+    
+    def _write(self, name, text):
+        path = os.path.join(self.tmpdir, name)
+        with io.open(path, 'w') as f:
+            f.write(text)
+        return path
+    
+    
+    def _module(self, name):
+        path = os.path.join(self.out, name)
+        if not os.path.isdir(self.out):
+            os.makedirs(self.out)
+        with io.open(path, 'w') as f:
+            f.write('')
+        return path
+    
+    
+    def test_is_stale(self):
+        graph = DependencyGraph()
+        self.assertTrue(graph.is_stale(self.a))
+        module = self._module('a.py')
+        graph.update(self.a, [self.common], module)
+        self.assertFalse(graph.is_stale(self.a))
+        self._write('common.h', '#define COMMON 100\n')
+        self.assertTrue(graph.is_stale(self.a))
+        graph.update(self.a, [self.common], module)
+        os.remove(module)
+        self.assertTrue(graph.is_stale(self.a))
+        graph.update(self.a, [self.common], self._module('a.py'))
+        self._write('a.h', '#include "common.h"\n#define A 20\n')
+        self.assertTrue(graph.is_stale(self.a))
+    
+    
+    def test_dependents_are_transitive(self):
+        graph = DependencyGraph()
+        graph.update(self.a, [self.common], self._module('a.py'))
+        graph.update(self.b, [self.a], self._module('b.py'))
+        self.assertEqual(graph.dependents([self.common]), set([self.a, self.b]))
+        self.assertEqual(graph.dependents([self.b]), set())
+    
+    
+    def test_outdated_includes_dependents(self):
+        graph = DependencyGraph()
+        for (header, includes) in ((self.common, []), (self.a, [self.common]), (self.b, [])):
+            graph.update(header, includes, self._module(os.path.basename(header) + '.py'))
+        headers = [self.a, self.b, self.common]
+        self.assertEqual(graph.outdated(headers), [])
+        self._write('common.h', '#define COMMON 100\n')
+        self.assertEqual(graph.outdated(headers), [self.a, self.common])
+    
+    
+    def test_save_and_load(self):
+        path = os.path.join(self.tmpdir, 'deps.json')
+        self.assertEqual(DependencyGraph.load(path).nodes, {})
+        graph = DependencyGraph()
+        graph.update(self.a, [self.common], self._module('a.py'))
+        graph.save(path)
+        loaded = DependencyGraph.load(path)
+        self.assertEqual(loaded.nodes, graph.nodes)
+        self.assertFalse(loaded.is_stale(self.a))
+    
+    
+    def test_rebuild_only_affected_headers(self):
+        graph = DependencyGraph()
+        headers = find_headers([self.tmpdir])
+        results = rebuild(headers, self.out, graph, root=self.tmpdir, tablesSupport=False)
+        self.assertEqual(sorted(result.header for result in results), sorted(headers))
+        self.assertEqual(graph.nodes[self.a]['includes'], {self.common: graph.nodes[self.common]['stamp']})
+        self.assertEqual(rebuild(headers, self.out, graph, root=self.tmpdir, tablesSupport=False), [])
+        self._write('common.h', '#define COMMON 100\n')
+        results = rebuild(headers, self.out, graph, root=self.tmpdir, tablesSupport=False)
+        self.assertEqual(sorted(result.header for result in results), sorted([self.a, self.common]))
+    
+    
+    def test_failed_header_is_retried(self):
+        graph = DependencyGraph()
+        bad = self._write('bad.h', '#if 1\n')
+        results = rebuild([bad], self.out, graph, root=self.tmpdir, tablesSupport=False)
+        self.assertTrue(results[0].failure)
+        self.assertNotIn(bad, graph.nodes)
+        self.assertEqual(graph.outdated([bad]), [bad])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,78 @@
+"""
+Tests for the report of the problems found when parsing headers.
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import io
+import unittest
+
+from h2pyex.diagnostics import Diagnostics, SKIPPED, DEFINE, INCLUDE
+from h2pyex.hparser import HeaderParser
+from h2pyex.userexceptions import UnexpectedException
+
+
+class DiagnosticsTest(unittest.TestCase):
+
+    def _diagnostics(self):
+        diagnostics = Diagnostics()
+        diagnostics.add(SKIPPED, 'Skipped "int f(void);".\n', 3)
+        diagnostics.add(DEFINE, 'Unable to evaluate X.', 5, 'other.h')
+        diagnostics.add(SKIPPED, 'Skipped "extern int x;".', None, 'other.h')
+        diagnostics.add(INCLUDE, 'Could not find file a.h.')
+        return diagnostics
+    
+    
+    def test_counts(self):
+        diagnostics = self._diagnostics()
+        self.assertEqual(len(diagnostics), 4)
+        self.assertEqual(diagnostics.counts(), {SKIPPED: 2, DEFINE: 1, INCLUDE: 1})
+        self.assertEqual([entry.lineno for entry in diagnostics.by_category(SKIPPED)], [3, None])
+        self.assertEqual(diagnostics.by_category('macro'), [])
+        self.assertEqual(diagnostics.summary(), '1 define, 1 include, 2 skipped')
+        self.assertEqual(Diagnostics().summary(), 'no problems')
+        self.assertEqual([entry.category for entry in diagnostics], [SKIPPED, DEFINE, SKIPPED, INCLUDE])
+    
+    
+    def test_format(self):
+        self.assertEqual(self._diagnostics().format().splitlines(), [
+            'ERROR: 3: Skipped "int f(void);".',
+            'ERROR: other.h:5: Unable to evaluate X.',
+            'ERROR: other.h: Skipped "extern int x;".',
+            'ERROR: Could not find file a.h.',
+        ])
+    
+    
+    def test_write(self):
+        stream = io.StringIO()
+        Diagnostics().write(stream)
+        self.assertEqual(stream.getvalue(), '')
+        self._diagnostics().write(stream)
+        self.assertEqual(stream.getvalue(), self._diagnostics().format())
+    
+    
+    def test_parser_reports_once_parsed(self):
+        errors = io.StringIO()
+        diagnostics = Diagnostics()
+        parser = HeaderParser(source=io.StringIO('#define A 1\nint f(void);\n#define B A +\n'), output=io.StringIO(),
+                              errstream=errors, diagnostics=diagnostics, tablesSupport=False)
+        self.assertIs(parser.diagnostics, diagnostics)
+        parser.parse()
+        self.assertEqual([(entry.category, entry.lineno) for entry in diagnostics],
+                         [(SKIPPED, 2), (DEFINE, 3), (SKIPPED, 3)])
+        self.assertEqual(errors.getvalue(), diagnostics.format())
+    
+    
+    def test_parser_reports_on_failure(self):
+        errors = io.StringIO()
+        parser = HeaderParser(source=io.StringIO('int f(void);\n#if 1\n'), output=io.StringIO(), errstream=errors,
+                              tablesSupport=False)
+        self.assertRaises(UnexpectedException, parser.parse)
+        self.assertEqual(errors.getvalue(), 'ERROR: 1: Skipped "int f(void);".\n')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,92 @@
+"""
+Tests for converting records to and from dictionaries.
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import struct
+import unittest
+
+from h2pyex.writer_ctypes import WriterCTypes
+
+from .headers import HeaderTestMixin, for_each_writer
+
+
+HEADER = '''
+typedef struct
+{
+    uint8_t tag;
+    int16_t pos[2];
+} Inner_t;
+
+typedef struct
+{
+    uint16_t id;
+    int8_t grid[2][2];
+    Inner_t inner;
+    Inner_t history[2];
+} Outer_t;
+
+typedef struct
+{
+    uint16_t id;
+    char name[4];
+} Named_t;
+'''
+
+OUTER = struct.pack('>H4bBhhBhhBhh', 7, 1, 2, 3, 4, 1, -1, 2, 3, 30, 31, 4, 40, 41)
+
+OUTER_DICT = {
+    'id': 7,
+    'grid': [[1, 2], [3, 4]],
+    'inner': {'tag': 1, 'pos': [-1, 2]},
+    'history': [{'tag': 3, 'pos': [30, 31]}, {'tag': 4, 'pos': [40, 41]}],
+}
+
+NAMED = struct.pack('>H4s', 1, b'ab')
+
+
+@for_each_writer()
+class DictTest(HeaderTestMixin):
+
+    header = HEADER
+    
+    def test_to_dict(self):
+        record = self.module.Outer_t()
+        record.deserialise(OUTER)
+        self.assertEqual(record.to_dict(), OUTER_DICT)
+        self.assertEqual(self.module.Inner_t().to_dict(), {'tag': 0, 'pos': [0, 0]})
+    
+    
+    def test_from_dict(self):
+        record = self.module.Outer_t.from_dict(OUTER_DICT)
+        self.assertEqual(record.serialise(), OUTER)
+        record = self.module.Outer_t.from_dict({'id': 3, 'inner': {'tag': 5}})
+        self.assertEqual((record.id, record.inner.tag, list(record.inner.pos)), (3, 5, [0, 0]))
+        self.assertEqual(record.history[1].tag, 0)
+    
+    
+    def test_decode_many_dicts(self):
+        buf = OUTER + struct.pack('>H', 9) + OUTER[2:]
+        dicts = self.module.Outer_t.decode_many(buf, form='dicts')
+        self.assertEqual(dicts, [OUTER_DICT, dict(OUTER_DICT, id=9)])
+        self.assertEqual(self.module.Outer_t.decode_many(buf, 1, len(OUTER), form='dicts')[0]['id'], 9)
+        self.assertEqual(self.module.Outer_t.decode_many(b'', form='dicts'), [])
+    
+    
+    def test_char_field(self):
+        record = self.module.Named_t()
+        record.deserialise(NAMED)
+        values = record.to_dict()
+        # ctypes strips the trailing nulls and the other classes keep a list of one string.
+        expected = b'ab' if self.writer_cls is WriterCTypes else [b'ab\x00\x00']
+        self.assertEqual(values, {'id': 1, 'name': expected})
+        self.assertEqual(self.module.Named_t.decode_many(NAMED, form='dicts'), [values])
+        self.assertEqual(self.module.Named_t.from_dict(values).serialise(), NAMED)
+
+
+if __name__ == '__main__':
+    unittest.main()
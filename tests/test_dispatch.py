@@ -0,0 +1,134 @@
+"""
+Tests for decoding mixed records by their discriminator.
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import struct
+import unittest
+
+from h2pyex.writer import Writer
+from h2pyex.dispatch import Dispatcher
+
+from .headers import HeaderTestMixin, for_each_writer
+
+
+HEADER = '''
+#define MSG_ID_Status 1
+#define MSG_ID_Position 2
+#define MSG_ID_Missing 9
+
+typedef struct
+{
+    uint8_t id;
+    uint8_t length;
+} Header_t;
+
+typedef struct
+{
+    uint8_t id;
+    uint8_t length;
+    uint16_t flags;
+} Status_t;
+
+typedef struct
+{
+    uint8_t id;
+    uint8_t length;
+    int32_t x;
+    int32_t y;
+} Position_t;
+'''
+
+STATUS = struct.pack('>BBH', 1, 4, 0xabcd)
+POSITION = struct.pack('>BBii', 2, 10, -3, 4)
+# A record with no class, skipped by its length.
+UNKNOWN = struct.pack('>BB3s', 7, 5, b'xyz')
+
+
+@for_each_writer()
+class DispatcherTest(HeaderTestMixin):
+    
+    header = HEADER
+    
+    def _dispatcher(self, **kwargs):
+        return Dispatcher.from_module(self.module, self.module.Header_t, 'id', prefix='MSG_ID_', suffix='_t',
+                                      **kwargs)
+    
+    
+    def test_from_module(self):
+        dispatcher = self._dispatcher()
+        self.assertEqual(dispatcher.classes, {1: self.module.Status_t, 2: self.module.Position_t})
+        self.assertEqual(dispatcher.header_size, 2)
+        self.assertEqual(dispatcher.record_id(STATUS + POSITION, len(STATUS)), 2)
+    
+    
+    def test_decode_all(self):
+        buf = STATUS + POSITION + STATUS
+        (records, offset) = self._dispatcher().decode_all(buf)
+        self.assertEqual([type(record) for record in records],
+                         [self.module.Status_t, self.module.Position_t, self.module.Status_t])
+        self.assertEqual((records[0].flags, records[1].x, records[1].y), (0xabcd, -3, 4))
+        self.assertEqual(offset, len(buf))
+        (records, offset) = self._dispatcher().decode_all(buf, len(STATUS), len(STATUS) + len(POSITION))
+        self.assertEqual([record.id for record in records], [2])
+    
+    
+    def test_partial_record_is_not_consumed(self):
+        dispatcher = self._dispatcher()
+        for partial in (POSITION[:1], POSITION[:2], POSITION[:-1]):
+            (records, offset) = dispatcher.decode_all(STATUS + partial)
+            self.assertEqual(len(records), 1)
+            self.assertEqual(offset, len(STATUS))
+    
+    
+    def test_unknown_id_skipped_by_length(self):
+        dispatcher = self._dispatcher(length_field='length')
+        (records, offset) = dispatcher.decode_all(STATUS + UNKNOWN + POSITION)
+        self.assertEqual([record.id for record in records], [1, 2])
+        self.assertEqual(offset, len(STATUS + UNKNOWN + POSITION))
+        self.assertEqual(dispatcher.decode_from(UNKNOWN), (None, len(UNKNOWN)))
+        (records, offset) = dispatcher.decode_all(STATUS + UNKNOWN[:-1])
+        self.assertEqual(offset, len(STATUS))
+    
+    
+    def test_unknown_id_without_length_field(self):
+        dispatcher = self._dispatcher()
+        with self.assertRaises(ValueError) as context:
+            dispatcher.decode_all(STATUS + UNKNOWN)
+        self.assertIn('Unknown id 7 at offset 4', str(context.exception))
+        self.assertRaises(ValueError, dispatcher.decode_from, UNKNOWN)
+    
+    
+    def test_unknown_id_with_invalid_length(self):
+        dispatcher = self._dispatcher(length_field='length')
+        self.assertRaises(ValueError, dispatcher.decode_all, struct.pack('>BB', 7, 0))
+    
+    
+    def test_accept(self):
+        dispatcher = self._dispatcher(accept=[2])
+        (records, offset) = dispatcher.decode_all(STATUS + POSITION + STATUS)
+        self.assertEqual([record.id for record in records], [2])
+        self.assertEqual(offset, 2*len(STATUS) + len(POSITION))
+        self.assertEqual(dispatcher.decode_from(STATUS), (None, len(STATUS)))
+        (record, size) = dispatcher.decode_from(POSITION)
+        self.assertEqual((record.x, size), (-3, len(POSITION)))
+    
+    
+    def test_no_such_field(self):
+        self.assertRaises(ValueError, Dispatcher, self.module.Header_t, 'kind', {})
+    
+    
+    def test_little_endian(self):
+        if self.writer_cls is not Writer:
+            self.skipTest('Only Writer classes take the endianness of each instance.')
+        dispatcher = self._dispatcher(endianness='<')
+        (records, offset) = dispatcher.decode_all(struct.pack('<BBii', 2, 10, -3, 4))
+        self.assertEqual((records[0].x, records[0].y), (-3, 4))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,140 @@
+"""
+Tests for the on-disk cache of generated modules.
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import os
+import types
+import shutil
+import tempfile
+import unittest
+
+from h2pyex.headercache import HeaderCache, _MAGIC
+from h2pyex.hparser import import_cheader
+from h2pyex.writer import Writer
+from h2pyex.writer_ctypes import WriterCTypes
+
+
+SOURCE = 'VALUE = 42\n'
+
+
+class HeaderCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.cache = HeaderCache(os.path.join(self.tmpdir, 'cache'))
+    
+    
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+    
+    
+    def _module(self):
+        return types.ModuleType(str('cached'))
+    
+    
+    def test_store_and_load(self):
+        key = self.cache.make_key('#define VALUE 42\n')
+        module = self._module()
+        self.assertFalse(self.cache.load('cached', key, module))
+        self.cache.store('cached', key, SOURCE)
+        self.assertTrue(self.cache.load('cached', key, module))
+        self.assertEqual(module.VALUE, 42)
+    
+    
+    def test_key_depends_on_inputs(self):
+        include = os.path.join(self.tmpdir, 'inc.h')
+        with open(include, 'w') as f:
+            f.write('#define A 1\n')
+        key = self.cache.make_key('#include "inc.h"\n', [include], WriterCTypes, {'packing': 1})
+        self.assertEqual(key, self.cache.make_key('#include "inc.h"\n', [include], WriterCTypes, {'packing': 1}))
+        self.assertNotEqual(key, self.cache.make_key('#include "inc.h"\n\n', [include], WriterCTypes, {'packing': 1}))
+        self.assertNotEqual(key, self.cache.make_key('#include "inc.h"\n', [include], Writer, {'packing': 1}))
+        self.assertNotEqual(key, self.cache.make_key('#include "inc.h"\n', [include], WriterCTypes, {'packing': 4}))
+        with open(include, 'w') as f:
+            f.write('#define A 2\n')
+        self.assertNotEqual(key, self.cache.make_key('#include "inc.h"\n', [include], WriterCTypes, {'packing': 1}))
+    
+    
+    def test_byte_code_of_another_interpreter_is_recompiled(self):
+        key = self.cache.make_key('#define VALUE 42\n')
+        self.cache.store('cached', key, SOURCE)
+        code_path = self.cache._path('cached', key, '.pyc')
+        with open(code_path, 'rb') as f:
+            data = f.read()
+        with open(code_path, 'wb') as f:
+            f.write(b'\0'*len(_MAGIC) + data[len(_MAGIC):])
+        module = self._module()
+        self.assertTrue(self.cache.load('cached', key, module))
+        self.assertEqual(module.VALUE, 42)
+        with open(code_path, 'rb') as f:
+            self.assertEqual(f.read(len(_MAGIC)), _MAGIC)
+    
+    
+    def test_store_removes_stale_entries(self):
+        old_key = self.cache.make_key('#define VALUE 1\n')
+        new_key = self.cache.make_key('#define VALUE 42\n')
+        self.cache.store('cached', old_key, 'VALUE = 1\n')
+        self.cache.store('cached', new_key, SOURCE)
+        self.assertFalse(self.cache.load('cached', old_key, self._module()))
+        self.assertTrue(self.cache.load('cached', new_key, self._module()))
+    
+    
+    def test_dotted_names_are_kept_apart(self):
+        keys = [self.cache.make_key('#define VALUE {}\n'.format(i)) for i in range(3)]
+        self.cache.store('pkg.msgs', keys[0], SOURCE)
+        self.cache.store('pkg', keys[1], SOURCE)
+        self.cache.store('pkg.msgs.extra', keys[2], SOURCE)
+        for (name, key) in zip(('pkg.msgs', 'pkg', 'pkg.msgs.extra'), keys):
+            self.assertTrue(self.cache.load(name, key, self._module()), name)
+        self.cache.store('pkg.msgs', keys[1], SOURCE)
+        self.assertFalse(self.cache.load('pkg.msgs', keys[0], self._module()))
+        self.assertTrue(self.cache.load('pkg', keys[1], self._module()))
+        self.assertTrue(self.cache.load('pkg.msgs.extra', keys[2], self._module()))
+    
+    
+    def test_evict_least_recently_used(self):
+        self.cache.max_size = None
+        keys = [self.cache.make_key('#define VALUE {}\n'.format(i)) for i in range(3)]
+        for (i, key) in enumerate(keys):
+            name = 'mod{}'.format(i)
+            self.cache.store(name, key, SOURCE)
+            for ext in ('.py', '.pyc'):
+                os.utime(self.cache._path(name, key, ext), (1000 + i, 1000 + i))
+        total = sum(os.path.getsize(os.path.join(self.cache.cache_dir, name))
+                    for name in os.listdir(self.cache.cache_dir))
+        oldest = sum(os.path.getsize(self.cache._path('mod0', keys[0], ext)) for ext in ('.py', '.pyc'))
+        self.cache.max_size = total - oldest
+        self.cache.evict()
+        self.assertFalse(self.cache.load('mod0', keys[0], self._module()))
+        self.assertTrue(self.cache.load('mod1', keys[1], self._module()))
+        self.assertTrue(self.cache.load('mod2', keys[2], self._module()))
+    
+    
+    def test_import_cheader_invalidated_by_include(self):
+        header = os.path.join(self.tmpdir, 'main.h')
+        include = os.path.join(self.tmpdir, 'inc.h')
+        with open(header, 'w') as f:
+            f.write('#include "inc.h"\n#define VALUE 42\n')
+        with open(include, 'w') as f:
+            f.write('#define A 1\n')
+        module = import_cheader(header, add_to_sys_modules=False, cache=self.cache, tablesSupport=False)
+        self.assertEqual(module.VALUE, 42)
+        entries = sorted(os.listdir(self.cache.cache_dir))
+        module = import_cheader(header, add_to_sys_modules=False, cache=self.cache, tablesSupport=False)
+        self.assertEqual(module.VALUE, 42)
+        self.assertEqual(sorted(os.listdir(self.cache.cache_dir)), entries)
+        with open(include, 'w') as f:
+            f.write('#define A 2\n')
+        module = import_cheader(header, add_to_sys_modules=False, cache=self.cache, tablesSupport=False)
+        self.assertEqual(module.VALUE, 42)
+        self.assertNotEqual(sorted(os.listdir(self.cache.cache_dir)), entries)
+        self.assertEqual(len(os.listdir(self.cache.cache_dir)), len(entries))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,194 @@
+"""
+Tests for the header parser.
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import io
+import os
+import shutil
+import tempfile
+import unittest
+
+from h2pyex import hparser
+from h2pyex.hparser import HeaderParser
+from h2pyex.userexceptions import ParseException, UnexpectedException
+
+from .headers import load_header
+
+
+def parse(text, **kwargs):
+    """
+    Parses the header <text> and returns the parser and generated code.
+    """
+    out = io.StringIO()
+    kwargs.setdefault('tablesSupport', False)
+    parser = HeaderParser(source=io.StringIO(text), output=out, errstream=None, **kwargs)
+    parser.parse()
+    return (parser, out.getvalue())
+
+
+class IncludeTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        with io.open(os.path.join(self.tmpdir, 'sysdefs.h'), 'w') as f:
+            f.write('#define FROM_SYSTEM 7\n')
+        hparser.searchdirs.insert(0, self.tmpdir)
+    
+    
+    def tearDown(self):
+        hparser.searchdirs.remove(self.tmpdir)
+        shutil.rmtree(self.tmpdir)
+    
+    
+    def test_includes_are_recorded(self):
+        (parser, code) = parse('#include <sysdefs.h>\n#include "local.h"\n#define A 1\n')
+        self.assertEqual(parser.includes, ['sysdefs.h', 'local.h'])
+        self.assertEqual(len(parser.diagnostics), 0)
+    
+    
+    def test_system_includes_are_not_expanded_by_default(self):
+        (parser, code) = parse('#include <sysdefs.h>\n#define A 1\n')
+        self.assertNotIn('FROM_SYSTEM', code)
+        self.assertNotIn('FROM_SYSTEM', parser.env)
+    
+    
+    def test_system_includes_expanded_on_request(self):
+        (parser, code) = parse('#include <sysdefs.h>\n#include <missing_h2pyex.h>\n#define A FROM_SYSTEM\n',
+                               expand_system_includes=True)
+        self.assertIn('FROM_SYSTEM = 7', code)
+        self.assertIn('A = 7', code)
+        self.assertEqual([entry.category for entry in parser.diagnostics], ['include'])
+
+
+
+
+class DefineTest(unittest.TestCase):
+
+    def test_constants_are_folded(self):
+        (parser, code) = parse('#define A 0x10\n#define B (A << 2)\n#define C (uint8_t)-1\n'
+                               '#define D (B / 3 - 7 / 2)\n#define E -7 % 3\n#define F 1.5f\n')
+        self.assertEqual(code.split(), ['A', '=', '16', 'B', '=', '64', 'C', '=', '255', 'D', '=', '18',
+                                        'E', '=', '-1', 'F', '=', '1.5'])
+        self.assertEqual((parser.env['B'], parser.env['F']), (64, 1.5))
+        self.assertEqual(len(parser.diagnostics), 0)
+    
+    
+    def test_other_bodies(self):
+        (parser, code) = parse('#define S "text"\n#define BAD A +\n#define OK 1\n')
+        self.assertIn('S = """text"""', code)
+        self.assertEqual(parser.env['S'], 'text')
+        self.assertNotIn('BAD', parser.env)
+        self.assertIn('OK = 1', code)
+        self.assertEqual([entry.category for entry in parser.diagnostics], ['define', 'skipped'])
+
+
+
+
+NESTED = '''
+#if LEVEL > 1
+#  ifdef FEATURE
+#    define A 1
+#  elif LEVEL == 2
+#    define A 2
+#  else
+#    define A 3
+#  endif
+#elif defined(FEATURE)
+#  if 0
+#    define A 4
+#  else
+#    define A 5
+#  endif
+#else
+#  define A 6
+#endif
+'''
+
+
+class ConditionalTest(unittest.TestCase):
+
+    def test_nesting(self):
+        for (defines, value) in ((['LEVEL=2', 'FEATURE'], 1), (['LEVEL=2'], 2), (['LEVEL=3'], 3),
+                                 (['FEATURE'], 5), ([], 6)):
+            (parser, code) = parse(NESTED, defines=defines)
+            self.assertEqual(code.split(), ['A', '=', str(value)], defines)
+            self.assertEqual(parser.defines['A'], value)
+    
+    
+    def test_header_defines(self):
+        (parser, code) = parse('#define BITS 12\n#define NAME "x"\n#define EMPTY\n'
+                               '#if BITS > 8 && defined NAME && defined(EMPTY) && !NAME\n#define A 1\n#endif\n'
+                               '#ifndef GUARD\n#define GUARD\n#define B 2\n#endif\n'
+                               '#ifndef GUARD\n#define B 3\n#endif\n')
+        self.assertIn('A = 1', code)
+        self.assertEqual(code.count('B = '), 1)
+    
+    
+    def test_only_macros_are_defined(self):
+        (parser, code) = parse('typedef struct\n{\n    uint8_t x;\n} P_t;\n'
+                               '#ifdef P_t\n#define A 1\n#endif\n'
+                               '#if defined(__builtins__) || defined HELPER || HELPER\n#define B 1\n#endif\n',
+                               env={'HELPER': 1})
+        self.assertIn('P_t', parser.env)
+        self.assertNotIn('A = 1', code)
+        self.assertNotIn('B = 1', code)
+    
+    
+    def test_defines_which_cannot_be_converted(self):
+        (parser, code) = parse('#define CALL f(1, 2)\n#define MAX(a, b) ((a) > (b) ? (a) : (b))\n'
+                               '#if defined(CALL) && defined(MAX)\n#define A 1\n#endif\n')
+        self.assertIn('A = 1', code)
+    
+    
+    def test_undef(self):
+        (parser, code) = parse('#define X 1\n#undef X\n#undef NEVER_DEFINED\n#undef OPTION\n'
+                               '#if defined(X) || defined(OPTION) || X\n#define A 1\n#endif\n', defines=['OPTION'])
+        self.assertNotIn('A = 1', code)
+        self.assertNotIn('X', parser.env)
+        self.assertEqual(parser.defines, {})
+    
+    
+    def test_errors(self):
+        self.assertRaises(ParseException, parse, '#else\n')
+        self.assertRaises(ParseException, parse, '#endif\n')
+        self.assertRaises(UnexpectedException, parse, '#if 1\n#if 0\n#endif\n')
+        (parser, code) = parse('#if 1 +\n#define A 1\n#else\n#define A 2\n#endif\n')
+        self.assertEqual(code.split(), ['A', '=', '2'])
+        self.assertEqual([entry.category for entry in parser.diagnostics], ['conditional'])
+    
+    
+    def test_struct_fields(self):
+        text = ('typedef struct\n{\n    uint16_t id;\n#ifdef EXTRA\n    uint32_t extra;\n#else\n'
+                '    uint8_t small; /* Without EXTRA */\n#endif\n#if LEVEL > 1\n    uint8_t level;\n#endif\n'
+                '    uint8_t last;\n} R_t;\n')
+        for (defines, fields) in ((['EXTRA', 'LEVEL=2'], ['id', 'extra', 'level', 'last']),
+                                  ([], ['id', 'small', 'last'])):
+            module = load_header(text, defines=defines)
+            self.assertEqual([field[0] for field in module.R_t._fields_], fields, defines)
+        self.assertRaises(UnexpectedException, parse, 'typedef struct\n{\n#if 0\n    uint8_t x;\n} R_t;\n')
+    
+    
+    def test_includes_share_defines(self):
+        tmpdir = tempfile.mkdtemp()
+        try:
+            with io.open(os.path.join(tmpdir, 'config.h'), 'w') as f:
+                f.write('#define FROM_INCLUDE 1\n#undef OPTION\n')
+            hparser.searchdirs.insert(0, tmpdir)
+            try:
+                (parser, code) = parse('#include <config.h>\n#if defined(FROM_INCLUDE) && !defined(OPTION)\n'
+                                       '#define A 1\n#endif\n', defines=['OPTION'], expand_system_includes=True)
+            finally:
+                hparser.searchdirs.remove(tmpdir)
+        finally:
+            shutil.rmtree(tmpdir)
+        self.assertIn('A = 1', code)
+        self.assertEqual(parser.defines, {'FROM_INCLUDE': 1, 'A': 1})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,130 @@
+"""
+Tests for the struct layouts shared by the instances of generated classes.
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import struct
+import unittest
+
+from h2pyex.abstractstruct import StructLayout
+from h2pyex.writer import Writer
+from h2pyex.writerplus import WriterPlus
+
+from .headers import HeaderTestMixin, for_each_writer
+
+
+HEADER = '''
+typedef struct
+{
+    uint8_t a;
+    uint16_t b[2];
+} A_t;
+
+typedef struct
+{
+    A_t x;
+    A_t y[2];
+    int32_t z;
+} B_t;
+'''
+
+
+def packed(endianness):
+    return struct.pack(str(endianness + 'BHH' + 'BHH'*2 + 'i'), 1, 0, 0x203, 0, 0, 0, 9, 0, 0, -5)
+
+
+@for_each_writer()
+class RoundTripTest(HeaderTestMixin):
+
+    header = HEADER
+    
+    def _sample(self):
+        record = self.module.B_t()
+        record.x.a = 1
+        record.x.b[1] = 0x203
+        record.y[1].a = 9
+        record.z = -5
+        return record
+    
+    
+    def test_serialise(self):
+        record = self._sample()
+        self.assertEqual(record.packed_size(), 19)
+        self.assertEqual(record.serialise(), packed('>'))
+    
+    
+    def test_deserialise(self):
+        record = self.module.B_t()
+        record.deserialise(packed('>'))
+        self.assertEqual((record.x.a, list(record.x.b), record.y[1].a, record.z), (1, [0, 0x203], 9, -5))
+        other = self.module.B_t()
+        other.deserialise_from(b'\xff\xff' + packed('>'), 2)
+        self.assertEqual(other.serialise(), packed('>'))
+
+
+
+@for_each_writer('Writer', 'SlottedWriter', 'WriterPlus', 'SlottedWriterPlus')
+class SharedLayoutTest(HeaderTestMixin):
+
+    header = HEADER
+    
+    def test_layout_shared_by_instances(self):
+        (first, second) = (self.module.B_t(), self.module.B_t())
+        self.assertIsInstance(first._layout, StructLayout)
+        self.assertIs(first._layout, second._layout)
+        self.assertIs(first._layout, self.module.B_t._layouts['!'])
+        self.assertIs(first.x._layout, self.module.A_t._layouts['!'])
+        self.assertEqual(first._layout.format, 'BHH'*3 + 'i')
+        self.assertEqual(first._layout.packed_size, 19)
+        self.assertEqual(first._layout.offsets, {'x': 0, 'y': 5, 'z': 15})
+    
+    
+    def test_instances_only_hold_values(self):
+        record = self.module.B_t()
+        if self.writer_options.get('slots'):
+            self.assertFalse(hasattr(record, '__dict__'))
+            return
+        for (name, value) in vars(record).items():
+            self.assertFalse(isinstance(value, struct.Struct), name)
+        self.assertLessEqual(set(vars(record)), set(['x', 'y', 'z', '_endianness', '_layout', '_frozen']))
+
+
+
+class EndiannessTest(HeaderTestMixin, unittest.TestCase):
+
+    header = HEADER
+    writer_cls = Writer
+    
+    def test_layout_per_endianness(self):
+        little = self.module.B_t(endianness='<')
+        self.assertIs(little._layout, self.module.B_t(endianness='<')._layout)
+        self.assertIsNot(little._layout, self.module.B_t()._layout)
+        self.assertEqual(sorted(self.module.B_t._layouts), ['!', '<'])
+        little.deserialise(packed('<'))
+        self.assertEqual((little.x.b[1], little.z), (0x203, -5))
+        self.assertEqual(little.serialise(), packed('<'))
+
+
+
+class WriterPlusEndiannessTest(HeaderTestMixin, unittest.TestCase):
+
+    header = HEADER
+    writer_cls = WriterPlus
+    
+    def test_set_endianness(self):
+        cls = self.module.B_t
+        self.assertIs(cls.setEndianness('<'), cls)
+        record = cls()
+        record.deserialise(packed('<'))
+        self.assertEqual((record.x.b[1], record.z), (0x203, -5))
+        self.assertIs(record._layout, cls._layouts['<'])
+        cls.setEndianness('!')
+        self.assertEqual(record.serialise(), packed('>'))
+
+
+if __name__ == '__main__':
+    unittest.main()
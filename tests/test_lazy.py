@@ -0,0 +1,147 @@
+"""
+Tests for records decoded lazily from their buffer.
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import struct
+import unittest
+
+from h2pyex.writer import Writer
+from h2pyex.lazy import LazyRecord
+
+from .headers import HeaderTestMixin, for_each_writer
+
+
+HEADER = '''
+typedef struct
+{
+    uint8_t tag;
+    int16_t pos[2];
+} Inner_t;
+
+typedef struct
+{
+    uint16_t id;
+    int32_t grid[2][3];
+    Inner_t inner;
+    Inner_t history[2];
+    double value;
+} Outer_t;
+
+typedef struct
+{
+    uint16_t id;
+    char name[4];
+} Named_t;
+'''
+
+
+def outer(idx):
+    return (struct.pack('>H6i', idx, *range(6)) + struct.pack('>Bhh', 1, -1, 2)
+            + struct.pack('>BhhBhh', 3, 30, 31, 4, 40, 41) + struct.pack('>d', idx/4))
+
+
+@for_each_writer('Writer', 'SlottedWriter', 'WriterPlus', 'SlottedWriterPlus')
+class LazyRecordTest(HeaderTestMixin):
+
+    header = HEADER
+    
+    def setUp(self):
+        super(LazyRecordTest, self).setUp()
+        self.cls = self.module.Outer_t
+        self.buf = bytearray(outer(1) + outer(2))
+        self.size = len(outer(0))
+    
+    
+    def test_fields(self):
+        lazy = self.cls.lazy(self.buf, self.size)
+        self.assertIsInstance(lazy, LazyRecord)
+        self.assertEqual(lazy.packed_size(), self.size)
+        self.assertEqual((lazy.id, lazy.value), (2, 0.5))
+        self.assertEqual(lazy.grid, [[0, 1, 2], [3, 4, 5]])
+        self.assertIsInstance(lazy.inner, LazyRecord)
+        self.assertEqual((lazy.inner.tag, lazy.inner.pos), (1, [-1, 2]))
+        self.assertEqual([(element.tag, element.pos[1]) for element in lazy.history], [(3, 31), (4, 41)])
+        self.assertRaises(AttributeError, getattr, lazy, 'missing')
+        self.assertRaises(AttributeError, setattr, lazy, 'missing', 1)
+    
+    
+    def test_matches_full_decode(self):
+        lazy = self.cls.lazy(self.buf)
+        self.assertEqual(lazy.materialise().to_dict(), self.cls.decode_many(self.buf, 1)[0].to_dict())
+        self.assertEqual(lazy.serialise(), outer(1))
+    
+    
+    def test_fields_are_cached(self):
+        lazy = self.cls.lazy(self.buf)
+        self.assertEqual(lazy.id, 1)
+        self.buf[1] = 9
+        self.assertEqual(lazy.id, 1)
+        self.assertEqual(self.cls.lazy(self.buf).id, 9)
+    
+    
+    def test_changes_are_serialised(self):
+        lazy = self.cls.lazy(self.buf)
+        lazy.id = 7
+        lazy.grid[1][2] = -5
+        lazy.history[0].tag = 99
+        data = lazy.serialise()
+        self.assertEqual(self.buf, bytearray(outer(1) + outer(2)))
+        record = self.cls()
+        record.deserialise(data)
+        self.assertEqual((record.id, record.grid[1][2], record.history[0].tag, record.inner.tag), (7, -5, 99, 1))
+        self.assertEqual(lazy.materialise().id, 7)
+    
+    
+    def test_flush(self):
+        lazy = self.cls.lazy(self.buf, self.size)
+        lazy.value = -1.5
+        lazy.inner = self.module.Inner_t(tag=8, pos=[5, 6])
+        lazy.flush()
+        record = self.cls.decode_many(self.buf)[1]
+        self.assertEqual((record.id, record.value, record.inner.tag, record.inner.pos), (2, -1.5, 8, [5, 6]))
+        self.assertEqual(bytes(self.buf[:self.size]), outer(1))
+    
+    
+    def test_little_endian(self):
+        if self.writer_cls is not Writer:
+            self.skipTest('Only Writer classes take the endianness of each instance.')
+        record = self.cls(endianness='<', id=3, value=2.0)
+        lazy = self.cls.lazy(record.serialise(), endianness='<')
+        self.assertEqual((lazy.id, lazy.value), (3, 2.0))
+    
+    
+    def test_char_field(self):
+        buf = bytearray(struct.pack('>H4s', 1, b'ab'))
+        lazy = self.module.Named_t.lazy(buf)
+        self.assertEqual(lazy.name, b'ab\x00\x00')
+        lazy.name = b'xyz'
+        self.assertEqual(lazy.serialise(), struct.pack('>H4s', 1, b'xyz'))
+        lazy.flush()
+        self.assertEqual(self.module.Named_t.lazy(buf).name, b'xyz\x00')
+    
+    
+    def test_buffer_too_small(self):
+        self.assertRaises(ValueError, self.cls.lazy, self.buf, self.size + 1)
+
+
+
+class CTypesLazyTest(HeaderTestMixin, unittest.TestCase):
+    
+    header = HEADER
+    
+    def test_records_are_views(self):
+        buf = bytearray(outer(1) + outer(2))
+        record = self.module.Outer_t.lazy(buf, len(outer(0)))
+        self.assertEqual((record.id, record.inner.pos[0]), (2, -1))
+        record.id = 5
+        self.assertEqual(struct.unpack_from('>H', buf, len(outer(0)))[0], 5)
+        self.assertRaises(TypeError, LazyRecord, self.module.Outer_t, buf)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,111 @@
+"""
+Tests for the codec of structs nesting structs from another generated module.
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import io
+import sys
+import struct
+import types
+import unittest
+
+from h2pyex.hparser import HeaderParser
+
+from .headers import HeaderTestMixin, for_each_writer
+
+
+EXT_HEADER = '''
+typedef struct
+{
+    uint16_t a;
+    uint8_t b[2];
+} Ext_t;
+'''
+
+HEADER = '''
+#include "ext.h"
+
+typedef struct
+{
+    Ext_t e;
+    uint8_t x;
+} B_t;
+
+typedef struct
+{
+    B_t bs[2];
+    Ext_t grid[2][2];
+    uint8_t y;
+} C_t;
+'''
+
+
+def packed():
+    values = []
+    for (a, x) in ((1, 2), (3, 4)):
+        values += [a, 0, a + 1, x]
+    for a in (10, 11, 12, 13):
+        values += [a, 0, 0]
+    values.append(7)
+    return struct.pack(str('>' + 'HBBB'*2 + 'HBB'*4 + 'B'), *values)
+
+
+@for_each_writer('Writer', 'SlottedWriter', 'WriterPlus', 'SlottedWriterPlus')
+class NestedFromModuleTest(HeaderTestMixin):
+
+    header = EXT_HEADER
+    
+    def setUp(self):
+        super(NestedFromModuleTest, self).setUp()
+        name = str('h2pyex_test_ext_{}'.format(id(self)))
+        sys.modules[name] = self.module
+        self.addCleanup(sys.modules.pop, name)
+        out = io.StringIO()
+        options = dict(self.writer_options, tablesSupport=False)
+        parser = HeaderParser(io.StringIO(HEADER), output=out, errstream=None, writer_cls=self.writer_cls, **options)
+        parser.importable = {'ext.h': name}
+        parser.parse()
+        self.nested = types.ModuleType(str('h2pyex_test_nested'))
+        exec(out.getvalue(), self.nested.__dict__)
+    
+    
+    def _sample(self):
+        record = self.nested.C_t()
+        for (i, (a, x)) in enumerate(((1, 2), (3, 4))):
+            record.bs[i].e.a = a
+            record.bs[i].e.b[1] = a + 1
+            record.bs[i].x = x
+        for (i, a) in enumerate((10, 11, 12, 13)):
+            record.grid[i//2][i%2].a = a
+        record.y = 7
+        return record
+    
+    
+    def test_serialise(self):
+        record = self._sample()
+        self.assertEqual(record.packed_size(), len(packed()))
+        self.assertEqual(record.serialise(), packed())
+    
+    
+    def test_deserialise(self):
+        record = self.nested.C_t()
+        record.deserialise(packed())
+        self.assertEqual([(b.e.a, b.e.b[1], b.x) for b in record.bs], [(1, 2, 2), (3, 4, 4)])
+        self.assertEqual([[e.a for e in row] for row in record.grid], [[10, 11], [12, 13]])
+        self.assertEqual(record.y, 7)
+    
+    
+    def test_decode_many_dicts(self):
+        (first, second) = self.nested.C_t.decode_many(packed()*2, form='dicts')
+        self.assertEqual(first, second)
+        self.assertEqual(first['bs'][1], {'e': {'a': 3, 'b': [0, 4]}, 'x': 4})
+        self.assertEqual([[e['a'] for e in row] for row in first['grid']], [[10, 11], [12, 13]])
+        self.assertEqual(first['y'], 7)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,107 @@
+"""
+Tests for the pool of reused struct instances.
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import struct
+import unittest
+
+from h2pyex.writer import Writer
+from h2pyex.pool import StructPool
+
+from .headers import HeaderTestMixin, for_each_writer
+
+
+HEADER = '''
+typedef struct
+{
+    uint16_t id;
+    int32_t value;
+} Sample_t;
+'''
+
+
+def stream(count):
+    return b''.join(struct.pack('>Hi', idx, -idx) for idx in range(count))
+
+
+@for_each_writer()
+class StructPoolTest(HeaderTestMixin):
+
+    header = HEADER
+    
+    def setUp(self):
+        super(StructPoolTest, self).setUp()
+        self.cls = self.module.Sample_t
+    
+    
+    def test_acquire_and_release(self):
+        pool = StructPool(self.cls, size=2)
+        self.assertEqual((len(pool), pool.record_size), (2, 6))
+        first = pool.acquire()
+        second = pool.acquire()
+        third = pool.acquire()
+        self.assertEqual(len(pool), 0)
+        self.assertEqual(len(set(id(record) for record in (first, second, third))), 3)
+        pool.release(third)
+        self.assertIs(pool.acquire(), third)
+    
+    
+    def test_acquire_many(self):
+        pool = StructPool(self.cls, size=3)
+        free = pool.acquire_many(3)
+        pool.release_many(free)
+        taken = pool.acquire_many(5)
+        self.assertEqual(len(taken), 5)
+        self.assertEqual(len(pool), 0)
+        self.assertTrue(all(any(record is other for other in taken) for record in free))
+        pool.release_many(taken)
+        self.assertEqual(len(pool), 5)
+    
+    
+    def test_max_size(self):
+        pool = StructPool(self.cls, max_size=2)
+        pool.release_many(pool.acquire_many(3))
+        self.assertEqual(len(pool), 2)
+        pool.release(self.cls())
+        self.assertEqual(len(pool), 2)
+        pool.acquire()
+        pool.release_many([self.cls(), self.cls()])
+        self.assertEqual(len(pool), 2)
+    
+    
+    def test_decode(self):
+        pool = StructPool(self.cls, size=1)
+        record = pool.decode(stream(3), 12)
+        self.assertEqual((record.id, record.value), (2, -2))
+        pool.release(record)
+        self.assertIs(pool.decode(stream(2), 6), record)
+        self.assertEqual((record.id, record.value), (1, -1))
+    
+    
+    def test_decode_many_reuses_instances(self):
+        pool = StructPool(self.cls, size=4)
+        records = pool.decode_many(stream(4))
+        self.assertEqual([(record.id, record.value) for record in records], [(0, 0), (1, -1), (2, -2), (3, -3)])
+        pool.release_many(records)
+        again = pool.decode_many(stream(3)[6:] + stream(1), 2)
+        self.assertTrue(all(any(record is other for other in records) for record in again))
+        self.assertEqual([record.id for record in again], [1, 2])
+        self.assertEqual(pool.decode_many(stream(2), offset=6)[0].id, 1)
+        self.assertEqual(pool.decode_many(b'\x00\x01\x02'), [])
+    
+    
+    def test_endianness(self):
+        if self.writer_cls is not Writer:
+            self.skipTest('Only Writer classes take the endianness of each instance.')
+        pool = StructPool(self.cls, size=1, endianness='<')
+        self.assertEqual(pool.decode(struct.pack('<Hi', 5, -7)).value, -7)
+        self.assertEqual(pool.acquire().value, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
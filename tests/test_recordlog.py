@@ -0,0 +1,128 @@
+"""
+Tests for the memory mapped record log.
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import io
+import os
+import shutil
+import struct
+import tempfile
+import unittest
+
+from h2pyex.writer import Writer
+from h2pyex.recordlog import RecordLog
+
+from .headers import HeaderTestMixin, for_each_writer
+
+
+HEADER = '''
+typedef struct
+{
+    uint16_t id;
+    int32_t value;
+} Sample_t;
+'''
+
+# A file header skipped with the offset of the log.
+PREAMBLE = b'LOG1'
+
+
+@for_each_writer()
+class RecordLogTest(HeaderTestMixin):
+
+    header = HEADER
+    
+    def setUp(self):
+        super(RecordLogTest, self).setUp()
+        self.tmpdir = tempfile.mkdtemp()
+        self.cls = self.module.Sample_t
+    
+    
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+    
+    
+    def _log(self, count, tail=b'', **kwargs):
+        path = os.path.join(self.tmpdir, 'records.bin')
+        with io.open(path, 'wb') as f:
+            f.write(PREAMBLE)
+            for idx in range(count):
+                f.write(struct.pack('>Hi', idx, -10*idx))
+            f.write(tail)
+        return RecordLog(path, self.cls, offset=len(PREAMBLE), **kwargs)
+    
+    
+    def test_indexing(self):
+        with self._log(5) as log:
+            self.assertEqual(len(log), 5)
+            self.assertEqual(log.record_offset(2), len(PREAMBLE) + 12)
+            self.assertEqual((log[0].id, log[0].value), (0, 0))
+            self.assertEqual((log[-1].id, log[-1].value), (4, -40))
+            self.assertRaises(IndexError, log.__getitem__, 5)
+            self.assertRaises(IndexError, log.__getitem__, -6)
+            record = self.cls()
+            self.assertIs(log.decode(3, record), record)
+            self.assertEqual(record.value, -30)
+    
+    
+    def test_slices(self):
+        with self._log(5) as log:
+            self.assertEqual([record.id for record in log[1:4]], [1, 2, 3])
+            self.assertEqual([record.id for record in log[::2]], [0, 2, 4])
+            self.assertEqual([record.id for record in log[-2:]], [3, 4])
+            self.assertEqual(log[4:1], [])
+            self.assertEqual(log.decode_many(1, 2, form='columns'), {'id': [1, 2], 'value': [-10, -20]})
+    
+    
+    def test_iteration_in_chunks(self):
+        with self._log(7) as log:
+            self.assertEqual([record.id for record in log], list(range(7)))
+            self.assertEqual([record.id for record in log.iter(2, 6, chunk=3)], [2, 3, 4, 5])
+            self.assertEqual([record.id for record in log.iter(-2)], [5, 6])
+    
+    
+    def test_partial_record_is_ignored(self):
+        with self._log(3, tail=b'\x00\x09\xff') as log:
+            self.assertEqual(len(log), 3)
+            self.assertEqual([record.id for record in log], [0, 1, 2])
+            self.assertRaises(IndexError, log.__getitem__, 3)
+        with self._log(0, tail=b'\x00\x09') as log:
+            self.assertEqual(len(log), 0)
+            self.assertEqual(list(log), [])
+    
+    
+    def test_empty_file(self):
+        path = os.path.join(self.tmpdir, 'empty.bin')
+        io.open(path, 'wb').close()
+        with RecordLog(path, self.cls) as log:
+            self.assertEqual(len(log), 0)
+            self.assertEqual(log[:], [])
+            self.assertEqual(list(log), [])
+    
+    
+    def test_close(self):
+        log = self._log(2)
+        log.close()
+        self.assertEqual(len(log), 0)
+        self.assertEqual(list(log), [])
+        log.close()
+    
+    
+    def test_little_endian_records(self):
+        if self.writer_cls is not Writer:
+            self.skipTest('Only Writer classes take the endianness of each instance.')
+        path = os.path.join(self.tmpdir, 'little.bin')
+        with io.open(path, 'wb') as f:
+            f.write(struct.pack('<HiHi', 1, -1, 2, -2))
+        with RecordLog(path, self.cls, endianness='<') as log:
+            self.assertEqual([record.value for record in log], [-1, -2])
+            self.assertEqual(log[1].value, -2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,80 @@
+"""
+Tests for the classes generated with slots=True.
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import unittest
+
+from h2pyex.abstractstruct import SlottedStruct
+
+from .headers import HeaderTestMixin, for_each_writer
+
+
+HEADER = '''
+typedef struct
+{
+    uint8_t a;
+    uint16_t b[2];
+} A_t;
+
+typedef struct
+{
+    A_t x;
+    int32_t z;
+} B_t;
+'''
+
+
+@for_each_writer('SlottedWriter', 'SlottedWriterPlus')
+class SlotsTest(HeaderTestMixin):
+
+    header = HEADER
+    
+    def test_no_dict(self):
+        record = self.module.B_t()
+        self.assertIsInstance(record, SlottedStruct)
+        self.assertFalse(hasattr(record, '__dict__'))
+        self.assertFalse(hasattr(record.x, '__dict__'))
+        self.assertEqual(self.module.B_t._scalar_fields, frozenset(['z']))
+    
+    
+    def test_unknown_attribute_rejected(self):
+        record = self.module.B_t()
+        with self.assertRaises(AttributeError):
+            record.w = 1
+        with self.assertRaises(AttributeError):
+            record._layout = None
+        self.assertFalse(hasattr(record, 'w'))
+    
+    
+    def test_scalar_stores(self):
+        record = self.module.B_t(z=-5)
+        self.assertEqual(record.z, -5)
+        record.z = 7
+        record.x.a = 1
+        self.assertEqual((record.z, record.x.a), (7, 1))
+        self.assertEqual(record.serialise(), b'\x01\x00\x00\x00\x00\x00\x00\x00\x07')
+    
+    
+    def test_checked_stores(self):
+        record = self.module.B_t()
+        x = record.x
+        record.x = {'a': 2, 'b': [3]}
+        self.assertIs(record.x, x)
+        self.assertEqual((x.a, list(x.b)), (2, [3, 0]))
+        with self.assertRaises(ValueError):
+            record.x.b = [1, 2, 3]
+    
+    
+    def test_deserialise(self):
+        record = self.module.B_t()
+        record.deserialise(b'\x01\x00\x02\x00\x03\xff\xff\xff\xfe')
+        self.assertEqual((record.x.a, list(record.x.b), record.z), (1, [2, 3], -2))
+
+
+if __name__ == '__main__':
+    unittest.main()
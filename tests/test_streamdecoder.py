@@ -0,0 +1,191 @@
+"""
+Tests for decoding records from a byte stream arriving in chunks.
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import socket
+import struct
+import sys
+import unittest
+
+from h2pyex.writerplus import WriterPlus
+from h2pyex.streamdecoder import StreamDecoder
+
+if sys.version_info >= (3, 7):
+    import asyncio
+    from h2pyex.aiostream import decode_stream, DecoderProtocol
+
+from .headers import HeaderTestMixin, for_each_writer
+
+
+HEADER = '''
+typedef struct
+{
+    uint16_t id;
+    int32_t value;
+} Sample_t;
+'''
+
+RECORD_SIZE = 6
+
+
+def stream(count, first=0):
+    return b''.join(struct.pack('>Hi', idx, -idx) for idx in range(first, first + count))
+
+
+def chunks(data, size):
+    return [data[pos:pos + size] for pos in range(0, len(data), size)]
+
+
+@for_each_writer()
+class StreamDecoderTest(HeaderTestMixin):
+
+    header = HEADER
+    
+    def setUp(self):
+        super(StreamDecoderTest, self).setUp()
+        self.cls = self.module.Sample_t
+    
+    
+    def test_arbitrary_chunks(self):
+        for size in (1, 4, 6, 7, 15):
+            decoder = StreamDecoder(self.cls, max_buffered=20)
+            ids = []
+            for chunk in chunks(stream(10), size):
+                ids.extend(record.id for record in decoder.decode(chunk))
+            self.assertEqual(ids, list(range(10)), size)
+            self.assertEqual(decoder.buffered(), 0)
+    
+    
+    def test_partial_record_is_kept(self):
+        decoder = StreamDecoder(self.cls)
+        data = stream(2)
+        self.assertEqual([record.id for record in decoder.decode(data[:8])], [0])
+        self.assertEqual((decoder.buffered(), decoder.pending()), (2, 0))
+        self.assertEqual(decoder.records(), [])
+        records = decoder.decode(data[8:])
+        self.assertEqual([(record.id, record.value) for record in records], [(1, -1)])
+        self.assertEqual(decoder.buffered(), 0)
+    
+    
+    def test_receive_into_buffer(self):
+        decoder = StreamDecoder(self.cls, max_buffered=16)
+        data = stream(4)
+        received = []
+        pos = 0
+        while pos < len(data):
+            buf = decoder.get_buffer()
+            nbytes = min(len(buf), 5, len(data) - pos)
+            buf[:nbytes] = data[pos:pos + nbytes]
+            decoder.buffer_updated(nbytes)
+            pos += nbytes
+            received.extend(record.id for record in decoder.records())
+        self.assertEqual(received, [0, 1, 2, 3])
+    
+    
+    def test_records_forms_and_count(self):
+        decoder = StreamDecoder(self.cls)
+        decoder.feed(stream(3))
+        self.assertEqual(decoder.pending(), 3)
+        self.assertEqual([record.id for record in decoder.records(max_count=1)], [0])
+        self.assertEqual(decoder.records(form='columns'), {'id': [1, 2], 'value': [-1, -2]})
+        self.assertEqual(decoder.pending(), 0)
+    
+    
+    def test_full_buffer(self):
+        self.assertRaises(ValueError, StreamDecoder, self.cls, max_buffered=RECORD_SIZE - 1)
+        decoder = StreamDecoder(self.cls, max_buffered=2*RECORD_SIZE)
+        decoder.feed(stream(2))
+        self.assertEqual(decoder.space(), 0)
+        self.assertRaises(BufferError, decoder.get_buffer)
+        self.assertRaises(BufferError, decoder.feed, b'\x00')
+        self.assertEqual(len(decoder.records(max_count=1)), 1)
+        decoder.feed(stream(1, 2)[:4])
+        self.assertEqual([record.id for record in decoder.records()], [1])
+        # The partial record is only moved when more space is asked for.
+        self.assertEqual(len(decoder.get_buffer()), 2)
+        self.assertEqual(len(decoder.get_buffer(8)), 8)
+        self.assertEqual(decoder.buffered(), 4)
+    
+    
+    def test_endianness(self):
+        if self.writer_cls is WriterPlus:
+            self.skipTest('WriterPlus classes set their endianness with setEndianness().')
+        decoder = StreamDecoder(self.cls, endianness='>')
+        self.assertEqual([record.value for record in decoder.decode(stream(2))], [0, -1])
+
+
+
+@unittest.skipIf(sys.version_info < (3, 7), 'asyncio adapters need python 3.7')
+class AsyncioStreamTest(HeaderTestMixin, unittest.TestCase):
+
+    header = HEADER
+    
+    def setUp(self):
+        super(AsyncioStreamTest, self).setUp()
+        self.loop = asyncio.new_event_loop()
+    
+    
+    def tearDown(self):
+        self.loop.close()
+    
+    
+    def _read_stream(self, data, chunk_size):
+        reader = asyncio.StreamReader(loop=self.loop)
+        for chunk in chunks(data, chunk_size):
+            reader.feed_data(chunk)
+        reader.feed_eof()
+        records = decode_stream(reader, self.module.Sample_t, max_buffered=16)
+        ids = []
+        try:
+            while True:
+                ids.append(self.loop.run_until_complete(records.__anext__()).id)
+        except StopAsyncIteration:
+            pass
+        return ids
+    
+    
+    def test_decode_stream(self):
+        self.assertEqual(self._read_stream(stream(5), 4), [0, 1, 2, 3, 4])
+        self.assertEqual(self._read_stream(b'', 4), [])
+    
+    
+    def test_decode_stream_partial_record(self):
+        with self.assertRaises(asyncio.IncompleteReadError):
+            self._read_stream(stream(2)[:-1], 4)
+    
+    
+    def _serve(self, data):
+        (ours, theirs) = socket.socketpair()
+        received = []
+        (transport, protocol) = self.loop.run_until_complete(self.loop.create_connection(
+            lambda: DecoderProtocol(self.module.Sample_t, received.extend, max_buffered=16), sock=ours))
+        for chunk in chunks(data, 5):
+            theirs.sendall(chunk)
+        theirs.close()
+        try:
+            self.loop.run_until_complete(asyncio.wait_for(protocol.closed, 5))
+        finally:
+            transport.close()
+        return [record.id for record in received]
+    
+    
+    def test_protocol(self):
+        self.assertEqual(self._serve(stream(6)), list(range(6)))
+    
+    
+    def test_protocol_partial_record(self):
+        with self.assertRaises(asyncio.IncompleteReadError):
+            self._serve(stream(2)[:-2])
+    
+    
+    def test_protocol_needs_running_loop(self):
+        self.assertRaises(RuntimeError, DecoderProtocol, self.module.Sample_t, print)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,121 @@
+"""
+Tests for the parsing support functions.
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import io
+import os
+import shutil
+import tempfile
+import unittest
+
+from h2pyex.support import process_line_for_comments, MMapSource
+from h2pyex.userexceptions import ParseException, UnexpectedException
+from h2pyex.hparser import HeaderParser
+
+
+class ProcessLineForCommentsTest(unittest.TestCase):
+
+    def test_line_comment(self):
+        self.assertEqual(process_line_for_comments('int x; // the x\n'),
+                         ('int x; ', ' the x\n', False, False))
+        self.assertEqual(process_line_for_comments('/// doc\n'), ('', ' doc\n', False, False))
+    
+    
+    def test_block_comments(self):
+        self.assertEqual(process_line_for_comments('int a; /* one */ int b; /* two\n'),
+                         ('int a;  int b; ', ' one  two\n', True, False))
+        self.assertEqual(process_line_for_comments('   still two */ int c;\n', True),
+                         (' int c;\n', '   still two ', False, False))
+    
+    
+    def test_strings_keep_comment_markers(self):
+        self.assertEqual(process_line_for_comments('char *s = "a//b"; /* c */ int x;'),
+                         ('char *s = """a//b""";  int x;', ' c ', False, False))
+        self.assertEqual(process_line_for_comments('x = "abc" // t'), ('x = """abc""" ', ' t', False, False))
+    
+    
+    def test_malformed_string(self):
+        with self.assertRaises(ParseException) as context:
+            process_line_for_comments('char *s = "abc;\n')
+        self.assertIn('char *s = "abc;', str(context.exception))
+
+
+
+class MMapSourceTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+    
+    
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+    
+    
+    def _source(self, text):
+        path = os.path.join(self.tmpdir, 'source.h')
+        with io.open(path, 'w') as f:
+            f.write(text)
+        return MMapSource(path)
+    
+    
+    def test_readline(self):
+        source = self._source('#define A 1\n#define B 2')
+        self.assertEqual(source.readline(), '#define A 1\n')
+        self.assertEqual(source.readline(), '#define B 2')
+        self.assertEqual(source.readline(), '')
+        source.close()
+    
+    
+    def test_read_logical_line(self):
+        source = self._source('#define A \\\n  1\n#define B 2\n')
+        self.assertEqual(source.read_logical_line(), ('#define A \\\n  1\n', 2))
+        self.assertEqual(source.read_logical_line(), ('#define B 2\n', 1))
+        self.assertEqual(source.read_logical_line(), ('', 0))
+        source.close()
+    
+    
+    def test_end_of_file_after_continuation(self):
+        source = self._source('#define A \\\n')
+        self.assertRaises(UnexpectedException, source.read_logical_line)
+        source.close()
+    
+    
+    def test_empty_file(self):
+        source = self._source('')
+        self.assertEqual(source.readline(), '')
+        self.assertEqual(source.read_logical_line(), ('', 0))
+        source.close()
+    
+    
+    def test_parser_output_is_unchanged(self):
+        text = '/* A comment */\n#define A 1\n\ntypedef struct\n{\n    int16_t x;\n} P_t;\n'
+        self._source(text).close()
+        path = os.path.join(self.tmpdir, 'source.h')
+        outputs = []
+        for use_mmap in (False, True):
+            out = io.StringIO()
+            parser = HeaderParser(source=path, output=out, errstream=None, use_mmap=use_mmap, tablesSupport=False)
+            parser.parse()
+            outputs.append(out.getvalue())
+        self.assertEqual(outputs[0], outputs[1])
+        self.assertIn('class P_t', outputs[1])
+    
+    
+    def test_parser_closes_its_source(self):
+        self._source('#define A 1\n#if 1\n').close()
+        path = os.path.join(self.tmpdir, 'source.h')
+        for use_mmap in (False, True):
+            parser = HeaderParser(source=path, output=io.StringIO(), errstream=None, use_mmap=use_mmap,
+                                  tablesSupport=False)
+            self.assertRaises(UnexpectedException, parser.parse)
+            source = parser.source._file if use_mmap else parser.source
+            self.assertTrue(source.closed)
+
+
+if __name__ == '__main__':
+    unittest.main()
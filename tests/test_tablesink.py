@@ -0,0 +1,131 @@
+"""
+Tests for logging records to pytables tables.
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import os
+import shutil
+import struct
+import tempfile
+import time
+import unittest
+
+try:
+    import tables
+except ImportError:
+    tables = None
+
+from h2pyex.tablesink import TableSink
+
+from .headers import HeaderTestMixin, for_each_writer
+
+
+HEADER = '''
+typedef struct
+{
+    uint16_t id;
+    int32_t value;
+} Flat_t;
+
+typedef struct
+{
+    uint8_t tag;
+    int16_t pos[2];
+} Inner_t;
+
+typedef struct
+{
+    uint16_t id;
+    Inner_t inner;
+    Inner_t history[2];
+} Nested_t;
+'''
+
+
+def flat(count):
+    return b''.join(struct.pack('>Hi', idx, -idx) for idx in range(count))
+
+
+def nested(count):
+    return b''.join(struct.pack('>H' + 'Bhh'*3, idx, 1, idx, -idx, 2, 20, 21, 3, 30, 31 + idx)
+                    for idx in range(count))
+
+
+@unittest.skipIf(tables is None, 'pytables is not installed')
+@for_each_writer()
+class TableSinkTest(HeaderTestMixin):
+
+    header = HEADER
+    header_options = {'tablesSupport': True}
+    
+    def setUp(self):
+        super(TableSinkTest, self).setUp()
+        self.tmpdir = tempfile.mkdtemp()
+        self.h5file = tables.open_file(os.path.join(self.tmpdir, 'log.h5'), 'w')
+    
+    
+    def tearDown(self):
+        self.h5file.close()
+        shutil.rmtree(self.tmpdir)
+    
+    
+    def test_append_buffer(self):
+        sink = TableSink.create(self.h5file, '/logs', 'flat', self.module.Flat_t, chunk_size=4)
+        sink.append_buffer(flat(6), timestamps=2.5)
+        self.assertEqual((sink.rows_written, len(sink)), (6, 0))
+        sink.append_buffer(flat(3), count=2, offset=6, timestamps=[7.0, 8.0])
+        self.assertEqual(len(sink), 2)
+        sink.close()
+        table = self.h5file.root.logs.flat
+        self.assertEqual(table.nrows, 8)
+        self.assertEqual(list(table.col('id')), [0, 1, 2, 3, 4, 5, 1, 2])
+        self.assertEqual(list(table.col('value'))[:3], [0, -1, -2])
+        self.assertEqual(list(table.col('time')), [2.5]*6 + [7.0, 8.0])
+    
+    
+    def test_append_records(self):
+        cls = self.module.Flat_t
+        with TableSink.create(self.h5file, '/', 'flat', cls) as sink:
+            sink.append(cls(id=1, value=10), 1.0)
+            sink.append_many(cls.decode_many(flat(2)), [2.0, 3.0])
+            self.assertRaises(ValueError, sink.append_many, cls.decode_many(flat(2)), [1.0])
+        table = self.h5file.root.flat
+        self.assertEqual([(row['time'], row['id'], row['value']) for row in table],
+                         [(1.0, 1, 10), (2.0, 0, 0), (3.0, 1, -1)])
+    
+    
+    def test_times_keep_sub_second_precision(self):
+        now = 1700000000.25
+        with TableSink.create(self.h5file, '/', 'flat', self.module.Flat_t) as sink:
+            sink.append_buffer(flat(2), timestamps=[now, now + 0.001])
+            before = time.time()
+            sink.append(self.module.Flat_t())
+        times = list(self.h5file.root.flat.col('time'))
+        self.assertEqual(times[:2], [now, now + 0.001])
+        self.assertLess(abs(times[2] - before), 1)
+    
+    
+    def test_nested_records(self):
+        with TableSink.create(self.h5file, '/', 'nested', self.module.Nested_t, chunk_size=2) as sink:
+            sink.append_buffer(nested(3), timestamps=0.0)
+        row = self.h5file.root.nested[2]
+        self.assertEqual(row['id'], 2)
+        self.assertEqual(row['inner']['tag'], 1)
+        self.assertEqual(list(row['inner']['pos']), [2, -2])
+        self.assertEqual(list(row['history_1']['pos']), [30, 33])
+    
+    
+    def test_nothing_to_flush(self):
+        sink = TableSink.create(self.h5file, '/', 'flat', self.module.Flat_t)
+        sink.flush()
+        sink.append_buffer(b'')
+        sink.close()
+        self.assertEqual(self.h5file.root.flat.nrows, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,80 @@
+"""
+Tests for writing out the generated code.
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import io
+import os
+import shutil
+import tempfile
+import unittest
+
+from h2pyex.writer import Writer
+from h2pyex.hparser import HeaderParser
+from h2pyex.userexceptions import UnexpectedException
+
+
+class FinishTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmpdir, 'out.py')
+    
+    
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+    
+    
+    def _read(self):
+        with io.open(self.path) as f:
+            return f.read()
+    
+    
+    def test_stream_written_once_finished(self):
+        stream = io.StringIO()
+        writer = Writer(output=stream, tablesSupport=False)
+        writer.putln('A = 1')
+        writer.putln2('pass')
+        self.assertEqual(stream.getvalue(), '')
+        self.assertEqual(writer.getvalue(), 'A = 1\n        pass\n')
+        writer.finish()
+        self.assertEqual(stream.getvalue(), 'A = 1\n        pass\n')
+        self.assertEqual(writer.getvalue(), '')
+    
+    
+    def test_file_replaced(self):
+        with io.open(self.path, 'w') as f:
+            f.write('OLD = 1\n')
+        writer = Writer(output=self.path, tablesSupport=False)
+        writer.putln('A = 1')
+        self.assertEqual(self._read(), 'OLD = 1\n')
+        writer.finish()
+        self.assertEqual(self._read(), 'A = 1\n')
+        self.assertEqual(os.listdir(self.tmpdir), ['out.py'])
+    
+    
+    def test_file_kept_when_writing_fails(self):
+        with io.open(self.path, 'w') as f:
+            f.write('OLD = 1\n')
+        writer = Writer(output=self.path, tablesSupport=False)
+        writer.putln('A = 1')
+        # A lone surrogate cannot be encoded, so writing the temporary file fails part way.
+        writer.putln('# \ud800')
+        self.assertRaises(UnicodeError, writer.finish)
+        self.assertEqual(self._read(), 'OLD = 1\n')
+        self.assertEqual(os.listdir(self.tmpdir), ['out.py'])
+    
+    
+    def test_failed_parse_writes_nothing(self):
+        parser = HeaderParser(source=io.StringIO('#define A 1\n#ifdef B\n'), output=self.path, errstream=None,
+                              tablesSupport=False)
+        self.assertRaises(UnexpectedException, parser.parse)
+        self.assertEqual(os.listdir(self.tmpdir), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
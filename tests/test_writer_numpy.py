@@ -0,0 +1,95 @@
+"""
+Tests for the numpy dtypes written for c structs.
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import ctypes
+import unittest
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+from h2pyex.writer_ctypes import WriterCTypes
+from h2pyex.writer_numpy import WriterNumpy
+
+from .headers import load_header
+
+
+HEADER = '''
+typedef uint16_t Count_t;
+
+typedef struct
+{
+    uint8_t tag;
+    int32_t pos[2];
+} Inner_t;
+
+typedef struct
+{
+    uint8_t flag;
+    double value;
+    Count_t count;
+    char name[5];
+    Inner_t inner;
+    Inner_t history[2];
+} Outer_t;
+'''
+
+
+@unittest.skipIf(numpy is None, 'numpy is not installed')
+class WriterNumpyTest(unittest.TestCase):
+
+    def _modules(self, **kwargs):
+        # The modules are kept as Python 2 clears their globals once they are freed.
+        self.numpy_module = load_header(HEADER, writer_cls=WriterNumpy, **kwargs)
+        self.ctypes_module = load_header(HEADER, writer_cls=WriterCTypes, **kwargs)
+        return (self.numpy_module, self.ctypes_module)
+    
+    
+    def test_layout_matches_ctypes(self):
+        for packing in (0, 1, 2, 4):
+            (numpy_module, ctypes_module) = self._modules(packing=packing)
+            for name in ('Inner_t', 'Outer_t'):
+                dtype = getattr(numpy_module, name + '_dtype')
+                cls = getattr(ctypes_module, name)
+                self.assertEqual(dtype.itemsize, ctypes.sizeof(cls), (packing, name))
+                self.assertEqual([dtype.fields[field[0]][1] for field in cls._fields_],
+                                 [getattr(cls, field[0]).offset for field in cls._fields_], (packing, name))
+    
+    
+    def test_field_types(self):
+        (numpy_module, ctypes_module) = self._modules(default_endianness='<')
+        dtype = numpy_module.Outer_t_dtype
+        self.assertEqual(numpy_module.Count_t_dtype, numpy.dtype('<u2'))
+        self.assertEqual(dtype['count'], numpy.dtype('<u2'))
+        self.assertEqual(dtype['name'], numpy.dtype('S5'))
+        self.assertEqual(dtype['history'].shape, (2,))
+        self.assertEqual(dtype['history'].base, numpy_module.Inner_t_dtype)
+        self.assertEqual(numpy_module.Inner_t_dtype['pos'].shape, (2,))
+    
+    
+    def test_frombuffer_matches_ctypes(self):
+        (numpy_module, ctypes_module) = self._modules(default_endianness='>')
+        records = []
+        for idx in range(3):
+            record = ctypes_module.Outer_t(flag=idx, value=idx/2, count=1000 + idx, name=b'ab')
+            record.inner.pos[1] = -idx
+            record.history[1].tag = 7*idx
+            records.append(record.serialise())
+        array = numpy.frombuffer(b''.join(records), dtype=numpy_module.Outer_t_dtype)
+        decoded = ctypes_module.Outer_t.decode_many(b''.join(records))
+        self.assertEqual(list(array['count']), [record.count for record in decoded])
+        self.assertEqual(list(array['value']), [0.0, 0.5, 1.0])
+        self.assertEqual(list(array['name']), [b'ab']*3)
+        self.assertEqual(list(array['inner']['pos'][:, 1]), [0, -1, -2])
+        self.assertEqual(list(array['history']['tag'][:, 1]), [0, 7, 14])
+
+
+if __name__ == '__main__':
+    unittest.main()
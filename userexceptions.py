@@ -46,5 +46,12 @@ class UnsupportedDataTypeException(UndefinedException):
     """
     pass
 
+class NotConstantException(UndefinedException):
+    """
+    For c expressions which cannot be evaluated as constants, eg. ones which
+    call functions or use undefined names.
+    """
+    pass
+
 
 
@@ -7,8 +7,11 @@ from __future__ import division
 from __future__ import print_function
 from __future__ import unicode_literals
 
+import os
 import sys
 import copy
+import itertools
+import re
 
 from .support import *
 from .abstractstruct import *
@@ -19,6 +22,7 @@ TYPE_TO_HDF5_MAP = {
     'bool_t': 'BoolCol',
     
     'char' : 'StringCol',
+    'char_t' : 'StringCol',
     
     'int8_t': 'Int8Col',
     'uint8_t':'UInt8Col',
@@ -123,25 +127,39 @@ class Writer(object):
         indentation='    ',
         tablesSupport=True,
         type_map=TYPE_2_STRUCT_FORMAT,
-        defaults_map=TYPE_2_DEFAULTS):
+        defaults_map=TYPE_2_DEFAULTS,
+        slots=False):
         """
         Constructor
+        
+        If <slots> is set the classes keep their fields in __slots__ (see
+        SlottedStruct) which makes them smaller and their fields faster to set.
+        
+        The generated code is kept in memory and only written to <output> (a
+        stream or a file name, stdout by default) by finish().
         """
         super(Writer, self).__init__()
         self.type_map = copy.deepcopy(type_map)
         self.defaults_map = copy.deepcopy(defaults_map)
         self.hdf5_map = copy.deepcopy(TYPE_TO_HDF5_MAP)
         self.has_dependencies = False
+        # The number of values in the flattened form of each struct written.
+        self.flat_counts = {}
+        self.output_path = None
         if output is None:
             self.output = sys.stdout
         elif isstr(output):
-            self.output = open(output,'w')
+            self.output = None
+            self.output_path = output
         else:
             self.output = output
+        self._fragments = []
+        self._write = self._fragments.append
         self.indentation = indentation
         self.default_endianness = default_endianness
         self.packing = packing
         self.tablesSupport=tablesSupport
+        self.slots = slots
         #self.putln("from __future__ import unicode_literals")
     
     
@@ -170,27 +188,62 @@ class Writer(object):
         """
         Prints out the comment block with correct formatting.
         """
-        self.output.write(self._format_comment_block(comment, indentation_count))
+        self._write(self._format_comment_block(comment, indentation_count))
     
     def put_doc_comment(self, doc_comment, indentation_count=0):
         """
         Formats and prints out a docstring.
         """
-        self.output.write(self.indentation*indentation_count + "'''\n")
-        self.output.write(self._format_string_block(doc_comment.rstrip(), indentation_count))
-        self.output.write(self.indentation*indentation_count + "'''\n")
+        self._write(self.indentation*indentation_count + "'''\n")
+        self._write(self._format_string_block(doc_comment.rstrip(), indentation_count))
+        self._write(self.indentation*indentation_count + "'''\n")
     
     def putln(self, line=""):
-        self.output.write(line + "\n")
+        self._write(line + "\n")
     
     def putln1(self, line=""):
-        self.output.write(self.indentation + line + "\n")
+        self._write(self.indentation + line + "\n")
     
     def putln2(self, line=""):
-        self.output.write(self.indentation*2 + line + "\n")
+        self._write(self.indentation*2 + line + "\n")
     
     def putln3(self, line=""):
-        self.output.write(self.indentation*3 + line + "\n")
+        self._write(self.indentation*3 + line + "\n")
+    
+    
+    def getvalue(self):
+        """
+        Returns the code generated so far.
+        """
+        return ''.join(self._fragments)
+    
+    
+    def finish(self):
+        """
+        Writes the generated code to the output in one go. A file is written
+        under a temporary name and then renamed, so it is never left half
+        written.
+        """
+        text = self.getvalue()
+        del self._fragments[:]
+        if self.output_path is None:
+            self.output.write(text)
+            self.output.flush()
+            return
+        tmp_path = '{}.{}.tmp'.format(self.output_path, os.getpid())
+        try:
+            with open(tmp_path, 'w') as f:
+                f.write(text)
+            try:
+                os.rename(tmp_path, self.output_path)
+            except OSError:
+                # Windows does not rename over an existing file.
+                os.remove(self.output_path)
+                os.rename(tmp_path, self.output_path)
+        except:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
     
     
     def _check_dependencies(self):
@@ -208,7 +261,10 @@ class Writer(object):
             self.putln('import struct')
             self.putln('import copy')
             self.putln('import string')
-            self.putln('from h2pyex import AbstractStruct, utils')
+            if self.slots:
+                self.putln('from h2pyex import AbstractStruct, SlottedStruct, utils')
+            else:
+                self.putln('from h2pyex import AbstractStruct, utils')
             self.putln()
             self.has_struct_dependencies = True
     
@@ -224,7 +280,7 @@ class Writer(object):
             raise UnsupportedDataTypeException("For {} on line {}.".format(typename, lineno))
         else:
             self.type_map[defname] = actualtype
-            self.hdf5_map[defname] = actualtype
+            self.hdf5_map[defname] = actualhdf5type
         self._check_dependencies()
         self._put_comment(comment, 1)
         self.putln("{} = '{}'".format(defname, actualtype))
@@ -235,20 +291,12 @@ class Writer(object):
         Writes the python code for a class to serialise/deserialise a structure.
         """
         self._check_dependencies()
-        self.putln("class {}(AbstractStruct):".format(structname))
+        self.putln("class {}({}):".format(structname, self._base_class()))
         self.put_doc_comment(comment, 1)
         
-        self.putln1('_fields_ = [')
-        for (attribname, typename, dimensions, comment) in members:
-            if not dimensions:
-                self.putln3("('{}', '{}'),".format(attribname, typename))
-            else:
-                typestring = typename
-                for dim in reversed(dimensions):
-                    typestring = '{}*{}'.format(typestring, dim)
-                self.putln3("('{}', '{}'),".format(attribname,typestring))
-        self.putln2(']')
-        self.putln1()
+        self._write_fields(members)
+        self._write_slots(members, ('_endianness', '_layout'))
+        struct_classes = self._write_layout_fields(structname, members)
         
         #######################################################################
         #######################################################################
@@ -256,161 +304,417 @@ class Writer(object):
         self.putln3("endianness='{}',".format(self.default_endianness))
         self.putln3("**kwargs):"),
         self.putln2("super({}, self).__init__()".format(structname)),
+        if self.slots:
+            self.putln2("_setattr = object.__setattr__")
+            self.putln2("_setattr(self, '_endianness', endianness)")
+            self.putln2("_setattr(self, '_layout', self._get_layout(endianness))")
+        else:
+            self.putln2("self._endianness = endianness")
+            self.putln2("self._layout = self._get_layout(endianness)")
+        self._write_field_defaults(members)
+        self.putln2("if kwargs: raise Exception('Unused args: ' + str(kwargs))")
+        if not self.slots:
+            self.putln2("self.freeze()")
+        self.putln2("")
         
+        self.putln1("def packed_size(self):")
+        self.putln2("return self._layout.packed_size")
+        self.putln2("")
         
-        #  if comment:
-#           #self.output.write(3*INDENT + '# ' + comment.rstrip('\r\n\t ') + '\n' )
-                #self.printComment(comment.rstrip('\r\n\t '), 3*self.indentation)
+        self._write_codec(members, struct_classes)
+        self._write_dict_codec(members)
         
+        ###################################################################
+        ###################################################################
+        if self.tablesSupport:
+            self.printTablesSupport(members)
         
-        #fmt = '{}'.format(self.default_endianness)
-        fmt = ''
+        ###################################################################
+        ###################################################################
+        if final_comment:
+            self.putln(self._format_comment_block(final_comment, 1))
+        self.putln("\n")
+    
+    
+    def _write_fields(self, members):
+        """
+        Writes the _fields_ list describing the fields of a class.
+        """
+        self.putln1('_fields_ = [')
+        for (attribname, typename, dimensions, comment) in members:
+            if not dimensions:
+                self.putln3("('{}', '{}'),".format(attribname, typename))
+            else:
+                typestring = typename
+                for dim in reversed(dimensions):
+                    typestring = '{}*{}'.format(typestring, dim)
+                self.putln3("('{}', '{}'),".format(attribname,typestring))
+        self.putln2(']')
+        self.putln1()
+    
+    
+    def _base_class(self):
+        return 'SlottedStruct' if self.slots else 'AbstractStruct'
+    
+    
+    def _is_struct_type(self, typename):
+        """
+        Returns True if <typename> is a struct rather than a basic type.
+        """
+        return typename not in self.type_map
+    
+    
+    def _is_char_type(self, typename):
+        return 's' == self.type_map.get(typename)
+    
+    
+    def _write_slots(self, members, private_attributes=()):
+        """
+        Writes the __slots__ of a SlottedStruct class.
+        """
+        if not self.slots:
+            return
+        names = [attribname for (attribname, typename, dimensions, comment) in members]
+        self.putln1('__slots__ = ({},)'.format(', '.join(repr(str(name)) for name in names + list(private_attributes))))
+        self.putln1()
+    
+    
+    def _write_layout_fields(self, structname, members):
+        """
+        Writes the _layout_fields used to build the StructLayouts of a class,
+        the number of values in its flattened form and its scalar fields.
+        Returns the list of (typename, dimensions) of the nested structs.
+        """
+        self.putln1('# The struct formats are compiled once per endianness and shared by')
+        self.putln1('# all the instances through _get_layout().')
+        self.putln1('_layouts = {}')
+        self.putln1('_layout_fields = [')
         struct_classes = []
+        for (attribname, typename, dimensions, comment) in members:
+            (formatstring, count) = self._layout_field(typename, dimensions)
+            if formatstring is None:
+                struct_classes.append((typename, dimensions))
+                self.putln3("('{}', {}, {}),".format(attribname, typename, count))
+            else:
+                self.putln3("('{}', '{}', {}),".format(attribname, formatstring, count))
+        self.putln2(']')
+        flat_count = 0
+        for (attribname, typename, dimensions, comment) in members:
+            flat_count = _add_expr(flat_count, self._flat_value_count(typename, dimensions))
+        self.flat_counts[structname] = flat_count
+        self.putln1('_flat_count = {}'.format(flat_count))
+        scalars = [attribname for (attribname, typename, dimensions, comment) in members
+                   if typename in self.type_map and not dimensions]
+        self.putln1('_scalar_fields = frozenset([{}])'.format(', '.join(repr(str(name)) for name in scalars)))
+        self.putln1()
+        return struct_classes
+    
+    
+    def _write_field_defaults(self, members):
+        """
+        Writes the part of __init__ which sets the fields to their defaults
+        or the values given in kwargs.
+        """
         for (attribname, typename, dimensions, comment) in members:
             if dimensions:
-                try:
-                    formatstring = self.type_map[typename]
+                if typename in self.type_map:
                     defaultstring = self.defaults_map[typename]
-                    if 's'==formatstring:
-                        formatstring = '{}{}'.format(dimensions[-1], formatstring)
+                    if 's'==self.type_map[typename]:
                         dimensions = dimensions[:-1]
-                except KeyError:
-                    formatstring = ''
-                    struct_classes.append((typename, dimensions))
+                else:
                     defaultstring = typename
                 tot_len = 1
                 for dim in dimensions:
                     tot_len = tot_len*dim
-                formatstring = formatstring*tot_len
-                self.putln2("self._struct_{0} = struct.Struct(str(endianness + '{1}'))".format(attribname, formatstring))
-                self.putln2("self.{} = utils.array_unflatten([{}() for idx in range(0,{})], {})".format(attribname, defaultstring, tot_len, repr(dimensions)))
+                if self.slots:
+                    self.putln2("_setattr(self, '{}', utils.array_unflatten([{}() for idx in range(0,{})], {}))".format(attribname, defaultstring, tot_len, repr(dimensions)))
+                else:
+                    self.putln2("self.{} = utils.array_unflatten([{}() for idx in range(0,{})], {})".format(attribname, defaultstring, tot_len, repr(dimensions)))
                 self.putln2("if '{}' in kwargs:".format(attribname))
                 self.putln2("    setattr(self, '{0}', kwargs.pop('{0}'))".format(attribname))
             else:
-                try:
-                    formatstring = self.type_map[typename]
-                    typename = self.defaults_map[typename]
-                    self.putln2("self._struct_{0} = struct.Struct(str(endianness + '{1}'))".format(attribname, formatstring))
-                except KeyError:
-                    formatstring = ''
-                    struct_classes.append((typename, None))
-                self.putln2("setattr(self, '{0}', kwargs.pop('{0}', {1}()))".format(attribname, typename))
-            fmt+= formatstring
-        
-        self.putln2("if kwargs: raise Exception('Unused args: ' + str(kwargs))")
-        self.putln2("self._endianness = endianness")
-        self.putln2("# Note that if there are nested structs, self._packing_struct is incomplete")
-        self.putln2("# and just used for calculating the packed size.")
-        self.putln2("self._packing_format = endianness + '{}'".format(fmt))
-        self.putln2("self._packing_struct = struct.Struct(str(self._packing_format))")
+                defaultstring = self.defaults_map.get(typename, typename)
+                if self.slots:
+                    self.putln2("_setattr(self, '{0}', kwargs.pop('{0}', {1}()))".format(attribname, defaultstring))
+                else:
+                    self.putln2("setattr(self, '{0}', kwargs.pop('{0}', {1}()))".format(attribname, defaultstring))
+    
+    
+    def _flat_value_count(self, typename, dimensions):
+        """
+        Returns the number of values a field adds to the flattened values of
+        a class, as an int or as an expression if it is a struct from
+        elsewhere.
+        """
+        (formatstring, count) = self._layout_field(typename, dimensions)
+        if formatstring is not None:
+            return count
+        nested_count = self.flat_counts.get(typename, '{}._flat_count'.format(typename))
+        return _mul_expr(nested_count, count)
+    
+    
+    def _write_codec(self, members, struct_classes):
+        """
+        Writes serialise() and deserialise_from() which pack/unpack the whole
+        struct, including any nested structs, with the single packing struct
+        of the layout. Also writes _flat_values() and _set_flat_values() which
+        a parent struct uses to gather and scatter the values of this struct.
+        """
+        values = []
+        for (attribname, typename, dimensions, comment) in members:
+            # One dimensional arrays are kept as lists so need no flattening.
+            one_dimensional = dimensions and len(dimensions) == 1
+            if typename in self.type_map:
+                if one_dimensional and 's' != self.type_map[typename]:
+                    values.append("self.{}".format(attribname))
+                elif dimensions:
+                    values.append("utils.array_flatten(self.{})".format(attribname))
+                else:
+                    values.append("[self.{}]".format(attribname))
+            else:
+                if one_dimensional:
+                    values.append("[value for element in self.{} for value in element._flat_values()]".format(attribname))
+                elif dimensions:
+                    values.append("[value for element in utils.array_flatten(self.{}) for value in element._flat_values()]".format(attribname))
+                else:
+                    values.append("self.{}._flat_values()".format(attribname))
+        values.append("[]")
         
-        self.putln2("self._packed_size = self._packing_struct.size")
+        self.putln1("def serialise(self):")
         if struct_classes:
-            for cls, dims in struct_classes:
-                cnt = 1
-                if dims is not None:
-                    for dim in dims:
-                        cnt *= dim
-                self.putln2("self._packed_size += {}().packed_size()*{}".format(cls, cnt))
+            self.putln2("return self._layout.packing_struct.pack(*self._flat_values())")
+        else:
+            self.putln2("return self._layout.packing_struct.pack( *(\\")
+            for value in values[:-1]:
+                self.putln3(value + " + \\")
+            self.putln3("[] ))")
+        self.putln2("")
         
-        self.putln2("self.freeze()")
+        self.putln1("def _flat_values(self):")
+        self.putln2("return \\")
+        for value in values[:-1]:
+            self.putln3(value + " + \\")
+        self.putln3("[]")
         self.putln2("")
         
         ###################################################################
         ###################################################################
-        self.putln1("def serialise(self):")
-        if len(struct_classes)==0:
-            self.putln2("return self._packing_struct.pack( *(\\")
-            for (attribname, typename, dimensions, comment) in members:
-                if dimensions:
-                    self.putln3("utils.array_flatten(self.{}) + \\".format(attribname))
-                else:
-                    self.putln3("[self.{}] + \\".format(attribname))
-            self.putln3("[] ))")
+        self.putln1("def deserialise_from(self, buf, offset):")
+        if struct_classes:
+            self.putln2("self._set_flat_values(self._layout.packing_struct.unpack_from(buf, offset), 0)")
         else:
-            self.putln2("data = []")
-            for (attribname, typename, dimensions, comment) in members:
-                try:
-                    struct_format = self.type_map[typename]
-                    if dimensions:
-                        self.putln2("data.append(self._struct_{0}.pack(*utils.array_flatten(self.{0})))".format(attribname))
-                    else:
-                        self.putln2("data.append(self._struct_{0}.pack(self.{0}))".format(attribname))
-                except KeyError:
-                    if dimensions:
-                        self.putln2("for element in utils.array_flatten(self.{}):".format(attribname) )
-                        self.putln3(    "data.append(element.serialise())")
-                    else:
-                        self.putln2("data.append(self.{0}.serialise())".format(attribname))
-            self.putln2("return b''.join(data)")
+            self.putln2("results = self._layout.packing_struct.unpack_from(buf, offset)")
+            self._write_set_values(members, '')
         self.putln2("")
         
-        ###################################################################
-        ###################################################################
-        self.putln1("def deserialise_from(self, buf, offset):")
-        if len(struct_classes)==0:
-            self.putln2("results = self._packing_struct.unpack_from(buf, offset)")
-            idx = 0;
-            for (attribname, typename, dimensions, comment) in members:
+        self.putln1("def _set_flat_values(self, results, idx):")
+        self._write_set_values(members, 'idx+')
+        self.putln2("")
+    
+    
+    def _write_set_values(self, members, base):
+        """
+        Writes the assignment of the fields from the flattened values in
+        results, starting from the index <base>.
+        """
+        if self.slots:
+            self.putln2("_setattr = object.__setattr__")
+        idx = 0
+        for (attribname, typename, dimensions, comment) in members:
+            count = self._flat_value_count(typename, dimensions)
+            if typename in self.type_map:
                 if dimensions:
                     if 's' == self.type_map[typename]:
                         dimensions = dimensions[:-1]
-                    arraysize = 1
-                    for dim in dimensions:
-                        arraysize *= dim
-                    self.putln2("self.{} = utils.array_unflatten(results[{}:{}],{})".format(attribname, idx, idx+arraysize, repr(dimensions)))
-                    idx+=arraysize
-                else:
-                    self.putln2("self.{} = results[{}]".format(attribname, idx))
-                    idx+=1
-        else:
-            for (attribname, typename, dimensions, comment) in members:
-                if typename in self.type_map:
-                    if dimensions:
-                        if 's' == self.type_map[typename]:
-                            dimensions = dimensions[:-1]
-                        self.putln2("self.{0} = utils.array_unflatten(self._struct_{0}.unpack_from(buf, offset),{1})".format(attribname, repr(dimensions)))
+                    # Arrays are updated in place rather than rebound to new lists.
+                    if not dimensions:
+                        self.putln2("self.{} = utils.array_unflatten(results[{}{}:{}{}],{})".format(
+                            attribname, base, idx, base, _add_expr(idx, count), repr(dimensions)))
+                    elif len(dimensions) == 1:
+                        self.putln2("self.{}[:] = results[{}{}:{}{}]".format(
+                            attribname, base, idx, base, _add_expr(idx, count)))
                     else:
-                        self.putln2("(self.{0},) = self._struct_{0}.unpack_from(buf, offset)".format(attribname))
-                    self.putln2("offset += self._struct_{0}.size".format(attribname))
+                        self.putln2("self._fill_array(self.{}, results, {}{}, {})".format(
+                            attribname, base, idx, repr(dimensions)))
+                elif self.slots:
+                    self.putln2("_setattr(self, '{}', results[{}{}])".format(attribname, base, idx))
                 else:
-                    if dimensions:
-                        self.putln2("for element in utils.array_flatten(self.{}):".format(attribname) )
-                        self.putln2("    element.deserialise_from(buf, offset)")
-                        self.putln2("    offset += element.packed_size()")
+                    self.putln2("self.{} = results[{}{}]".format(attribname, base, idx))
+            else:
+                nested_count = self.flat_counts.get(typename, '{}._flat_count'.format(typename))
+                if dimensions:
+                    if len(dimensions) == 1:
+                        self.putln2("for (i, element) in enumerate(self.{}):".format(attribname))
                     else:
-                        self.putln2("self.{0}.deserialise_from(buf, offset)".format(attribname))
-                        self.putln2("offset += self.{0}.packed_size()".format(attribname))
+                        self.putln2("for (i, element) in enumerate(utils.array_flatten(self.{})):".format(attribname))
+                    self.putln3("element._set_flat_values(results, {}{} + {})".format(base, idx, _mul_expr('i', nested_count)))
+                else:
+                    self.putln2("self.{}._set_flat_values(results, {}{})".format(attribname, base, idx))
+            idx = _add_expr(idx, count)
+    
+    
+    def _write_dict_codec(self, members, flat=True):
+        """
+        Writes to_dict() and _set_dict() which convert the class to and from
+        a dictionary of plain python values field by field. If <flat> also
+        writes _dict_from_flat() which builds the dictionary straight from
+        the flattened values of a record for decode_many(form='dicts').
+        """
+        self.putln1("def to_dict(self):")
+        self.putln2("return {")
+        for (attribname, typename, dimensions, comment) in members:
+            one_dimensional = dimensions and len(dimensions) == 1
+            if self._is_struct_type(typename):
+                if not dimensions:
+                    value = "self.{}.to_dict()"
+                elif one_dimensional:
+                    value = "[element.to_dict() for element in self.{}]"
+                else:
+                    value = "self._to_python(self.{})"
+            elif not dimensions:
+                value = "self.{}"
+            elif one_dimensional and not self._is_char_type(typename):
+                value = "self.{}[:]"
+            else:
+                value = "self._to_python(self.{})"
+            self.putln3("'{}': {},".format(attribname, value.format(attribname)))
+        self.putln3("}")
+        self.putln2("")
         
-        ###################################################################
-        ###################################################################
-        if self.tablesSupport:
-            self.printTablesSupport(members)
+        self.putln1("def _set_dict(self, values):")
+        if self.slots:
+            self.putln2("_setattr = object.__setattr__")
+        for (attribname, typename, dimensions, comment) in members:
+            self.putln2("if '{}' in values:".format(attribname))
+            if self._is_struct_type(typename) and not dimensions:
+                self.putln3("self.{0}._set_dict(values['{0}'])".format(attribname))
+            elif self._is_struct_type(typename) and len(dimensions) == 1:
+                self.putln3("for (element, value) in zip(self.{}, values['{}']):".format(attribname, attribname))
+                self.putln3("    element._set_dict(value)")
+            elif self.slots and not dimensions:
+                self.putln3("_setattr(self, '{0}', values['{0}'])".format(attribname))
+            else:
+                self.putln3("self.{0} = values['{0}']".format(attribname))
+        self.putln2("")
         
-        ###################################################################
-        ###################################################################
-        if final_comment:
-            self.putln(self._format_comment_block(final_comment, 1))
-        self.putln("\n")
+        if not flat:
+            return
+        self.putln1("@classmethod")
+        self.putln1("def _dict_from_flat(cls, results, idx):")
+        self.putln2("return {")
+        idx = 0
+        for (attribname, typename, dimensions, comment) in members:
+            count = self._flat_value_count(typename, dimensions)
+            values = "results[idx+{}:idx+{}]".format(idx, _add_expr(idx, count))
+            if self._is_struct_type(typename):
+                nested_count = self.flat_counts.get(typename, '{}._flat_count'.format(typename))
+                if not dimensions:
+                    value = "{}._dict_from_flat(results, idx+{})".format(typename, idx)
+                else:
+                    total = 1
+                    for dim in dimensions:
+                        total *= dim
+                    value = "[{}._dict_from_flat(results, idx+{} + {}) for i in range({})]".format(
+                        typename, idx, _mul_expr('i', nested_count), total)
+                    if len(dimensions) > 1:
+                        value = "utils.array_unflatten({}, {})".format(value, repr(tuple(dimensions)))
+            elif not dimensions:
+                value = "results[idx+{}]".format(idx)
+            elif len(dimensions) == 1 and not self._is_char_type(typename):
+                value = "list({})".format(values)
+            else:
+                if self._is_char_type(typename):
+                    dimensions = dimensions[:-1]
+                value = "cls._to_python(utils.array_unflatten({}, {}))".format(values, repr(dimensions))
+            self.putln3("'{}': {},".format(attribname, value))
+            idx = _add_expr(idx, count)
+        self.putln3("}")
+        self.putln2("")
+    
+    
+    def _layout_field(self, typename, dimensions):
+        """
+        Returns the (struct format of one element, element count) of a field
+        for the _layout_fields of a class. The format is None for nested structs.
+        """
+        count = 1
+        formatstring = self.type_map.get(typename)
+        if dimensions:
+            if 's' == formatstring:
+                formatstring = '{}s'.format(dimensions[-1])
+                dimensions = dimensions[:-1]
+            for dim in dimensions:
+                count *= dim
+        return formatstring, count
     
     
     def printTablesSupport(self, members):
         """
-        Writes out the make_table_descriptor function.
+        Writes out the make_table_descriptor function, which builds the
+        pytables description of the class on its first call only.
+        Arrays of nested structs get a nested column per element named
+        <field>_<index>.
         """
         self.putln()
-        self.putln1("def make_table_descriptor(self):")
+        self.putln1("@classmethod")
+        self.putln1("def make_table_descriptor(cls):")
+        self.putln1("    if cls._table_descriptor is not None:")
+        self.putln1("        return cls._table_descriptor")
         self.putln1("    import tables")
         self.putln1("    class TableRow(tables.IsDescription):")
-        self.putln1("        time = tables.Float32Col(pos=1)")
+        self.putln1("        time = tables.Float64Col(pos=1)")
         for i, (attribname, typename, dimensions, comment) in enumerate(members):
-            try:
+            dimensions = tuple(dimensions or ())
+            if typename in self.hdf5_map:
                 hdf5type = self.hdf5_map[typename]
+                args = ['pos={}'.format(i+2)]
+                if 'StringCol' == hdf5type:
+                    # The last dimension of a char array is the string length.
+                    args.insert(0, str(dimensions[-1] if dimensions else 1))
+                    dimensions = dimensions[:-1]
                 if dimensions:
-                    self.putln3("{} = tables.{}(pos={}, shape={})".format(attribname, hdf5type, i+2, repr(dimensions)))
-                else:
-                    self.putln3("{} = tables.{}(pos={})".format(attribname, hdf5type, i+2))
-            except KeyError:
-                self.putln3("{0} = self.{0}.make_table_descriptor()".format(attribname))
+                    args.append('shape={}'.format(repr(dimensions)))
+                self.putln3("{} = tables.{}({})".format(attribname, hdf5type, ', '.join(args)))
+            elif dimensions:
+                for index in itertools.product(*[range(dim) for dim in dimensions]):
+                    self.putln3("{}_{} = {}.make_table_descriptor()".format(
+                        attribname, '_'.join(str(idx) for idx in index), typename))
+            else:
+                self.putln3("{} = {}.make_table_descriptor()".format(attribname, typename))
+        self.putln2("cls._table_descriptor = TableRow")
         self.putln2("return TableRow")
         self.putln3()
+
+
+def _add_expr(a, b):
+    """
+    Adds two ints or python expressions.
+    """
+    if isinstance(a, int) and isinstance(b, int):
+        return a + b
+    if a == 0:
+        return b
+    if b == 0:
+        return a
+    return '{} + {}'.format(_operand(a), _operand(b))
+
+
+def _mul_expr(a, b):
+    """
+    Multiplies two ints or python expressions.
+    """
+    if isinstance(a, int) and isinstance(b, int):
+        return a * b
+    if b == 1:
+        return a
+    return '{}*{}'.format(_operand(a), _operand(b))
+
+
+def _operand(a):
+    """
+    Returns an int or python expression as an operand of a larger expression,
+    parenthesising anything but a name or attribute.
+    """
+    if isinstance(a, int) or re.match(r'^[\w.]+$', a):
+        return str(a)
+    return '({})'.format(a)
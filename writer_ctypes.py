@@ -103,6 +103,16 @@ class WriterCTypes(Writer):
             self.putln("from h2pyex.ctypesstruct import CTypesStruct")
             self.has_dependencies = True
     
+    def _is_struct_type(self, typename):
+        """
+        Overrides base class.
+        The struct names are added to the type map as they are written.
+        """
+        return not self.type_map.get(typename, '').startswith('ctypes.')
+    
+    def _is_char_type(self, typename):
+        return 'ctypes.c_char' == self.type_map.get(typename)
+    
     def write_struct_class(self, structname, structcomment, members, final_comment=''):
         self._check_dependencies()
         self.putln("class {}(CTypesStruct, {}):".format(structname, ENDIANNESS_MAP[self.default_endianness]))
@@ -125,6 +135,7 @@ class WriterCTypes(Writer):
         
         #self.putln2("self.freeze()")
         self.putln2("")
+        self._write_dict_codec(members, flat=False)
         
         ###################################################################
         ###################################################################
@@ -0,0 +1,154 @@
+"""
+Writes numpy structured dtypes for the structs in c header files.
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import struct
+
+from .writer import *
+
+
+STRUCT_FORMAT_2_DTYPE = {
+    '?': 'b1',
+    's': 'S',
+    
+    'b': 'i1',
+    'B': 'u1',
+    'h': 'i2',
+    'H': 'u2',
+    'i': 'i4',
+    'I': 'u4',
+    'q': 'i8',
+    'Q': 'u8',
+    
+    'f': 'f4',
+    'd': 'f8'
+}
+
+
+DTYPE_BYTE_ORDER = {
+    ENDIANNESS_NETWORK : '>',
+    ENDIANNESS_BIG : '>',
+    ENDIANNESS_LITTLE : '<',
+    ENDIANNESS_NATIVE : '='
+    }
+
+
+class WriterNumpy(Writer):
+    """
+    A modified version of Writer which creates a numpy structured dtype named
+    <struct>_dtype for each struct instead of a class, eg. a capture of
+    records can be decoded with numpy.frombuffer(buf, dtype=Sample_t_dtype).
+    
+    The fields are laid out with the same packing rules as the ctypes
+    structures written by WriterCTypes.
+    """
+    def __init__(self, **kwargs):
+        super(WriterNumpy, self).__init__(type_map=TYPE_2_STRUCT_FORMAT, **kwargs)
+        # The (itemsize, alignment) of each struct written.
+        self.struct_sizes = {}
+    
+    def _check_dependencies(self):
+        if not self.has_dependencies:
+            self.putln("import numpy")
+            self.putln()
+            self.has_dependencies = True
+    
+    def write_typedef(self, defname, typename, comment, lineno):
+        """
+        Writes a typedef as the dtype <defname>_dtype.
+        """
+        if typename in self.struct_sizes:
+            self.struct_sizes[defname] = self.struct_sizes[typename]
+            dtype = '{}_dtype'.format(typename)
+        else:
+            try:
+                actualtype = self.type_map[typename]
+            except KeyError:
+                raise UnsupportedDataTypeException("For {} on line {}.".format(typename, lineno))
+            self.type_map[defname] = actualtype
+            dtype = 'numpy.dtype({})'.format(self._scalar_dtype(actualtype))
+        self._check_dependencies()
+        self._put_comment(comment)
+        self.putln("{}_dtype = {}".format(defname, dtype))
+    
+    def write_struct_class(self, structname, comment, members, final_comment=''):
+        """
+        Writes the dtype of a structure.
+        """
+        self._check_dependencies()
+        names = []
+        formats = []
+        offsets = []
+        offset = 0
+        struct_alignment = 1
+        for (attribname, typename, dimensions, comment_) in members:
+            (dtype, size, alignment) = self._field_dtype(structname, typename, dimensions)
+            if self.packing:
+                alignment = min(alignment, self.packing)
+            offset = _align(offset, alignment)
+            struct_alignment = max(struct_alignment, alignment)
+            names.append("'{}'".format(attribname))
+            formats.append(dtype)
+            offsets.append(offset)
+            offset += size
+        itemsize = _align(offset, struct_alignment)
+        self.struct_sizes[structname] = (itemsize, struct_alignment)
+        
+        self._put_comment((comment + '\n' + final_comment).strip())
+        self.putln("{}_dtype = numpy.dtype({{".format(structname))
+        self.putln2("'names': [{}],".format(', '.join(names)))
+        self.putln2("'formats': [{}],".format(', '.join(formats)))
+        self.putln2("'offsets': [{}],".format(', '.join(str(o) for o in offsets)))
+        self.putln2("'itemsize': {},".format(itemsize))
+        self.putln1("})")
+        self.putln()
+    
+    def _scalar_dtype(self, formatstring, length=1):
+        """
+        Returns the dtype string for a struct format character.
+        """
+        if 's' == formatstring:
+            return "'S{}'".format(length)
+        return "'{}{}'".format(DTYPE_BYTE_ORDER[self.default_endianness], STRUCT_FORMAT_2_DTYPE[formatstring])
+    
+    def _field_dtype(self, structname, typename, dimensions):
+        """
+        Returns the (dtype expression, size, alignment) of a field.
+        """
+        dimensions = list(dimensions or ())
+        if typename in self.type_map:
+            formatstring = self.type_map[typename]
+            if 's' == formatstring:
+                length = dimensions.pop() if dimensions else 1
+                dtype = self._scalar_dtype(formatstring, length)
+                (size, alignment) = (length, 1)
+            else:
+                dtype = self._scalar_dtype(formatstring)
+                size = struct.calcsize(str('=' + formatstring))
+                alignment = _native_alignment(formatstring)
+        elif typename in self.struct_sizes:
+            dtype = '{}_dtype'.format(typename)
+            (size, alignment) = self.struct_sizes[typename]
+        else:
+            raise UnsupportedDataTypeException("For {} in {}.".format(typename, structname))
+        for dim in dimensions:
+            size *= dim
+        if dimensions:
+            dtype = '({}, {})'.format(dtype, repr(tuple(dimensions)))
+        return (dtype, size, alignment)
+
+
+def _native_alignment(formatstring):
+    """
+    Returns the alignment of a struct format character in a native c struct.
+    """
+    return struct.calcsize(str('c' + formatstring)) - struct.calcsize(str(formatstring))
+
+
+def _align(offset, alignment):
+    return (offset + alignment - 1)//alignment*alignment